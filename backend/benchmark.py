@@ -0,0 +1,518 @@
+"""
+Zero Waste AI - Benchmark Suite
+
+Generates seeded synthetic datasets and times the matching, redistribution and
+routing paths on them, reporting wall time and peak traced memory as JSON:
+
+    python -m backend.benchmark --scenario small --output bench.json
+    python -m backend.benchmark --items 1000000 --ngos 5000 --points 1000
+    python -m backend.benchmark --scenario medium --baseline bench.json
+
+`Redistributor.get_redistribution_plan` and the per-item `routing.optimize_routes`
+run on samples whose sizes are set with `--plan-items` / `--route-items`; every
+benchmark records the input sizes it ran on.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend import logistics, routing
+from backend.engine import CATEGORY_CONSTRAINTS, RedistributionEngine
+from backend.logs import configure_logging
+from backend.redistribution import Redistributor
+from backend.registry import NGORegistry
+from backend.storage import COLUMNAR_SUFFIX, write_columnar
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Dataset sizes (items, NGOs, delivery points) of the named scenarios
+SCENARIOS = {
+    'small': (10_000, 20, 10),
+    'medium': (100_000, 500, 100),
+    'large': (1_000_000, 5_000, 1_000),
+    'xlarge': (10_000_000, 50_000, 5_000)
+}
+
+BENCHMARKS = (
+    'engine_load',
+    'get_redistribution_candidates',
+    'find_best_matches',
+    'get_redistribution_plan',
+    'routing.optimize_routes',
+    'logistics.optimize_route'
+)
+
+# Synthetic cities (lat, lon); points are scattered up to CITY_SPREAD_DEG around them
+CITIES = {
+    'Delhi': (28.7041, 77.1025),
+    'Mumbai': (19.0760, 72.8777),
+    'Bangalore': (12.9716, 77.5946),
+    'Kolkata': (22.5726, 88.3639),
+    'Chennai': (13.0827, 80.2707),
+    'Hyderabad': (17.3850, 78.4867),
+    'Pune': (18.5204, 73.8567),
+    'Ahmedabad': (23.0225, 72.5714),
+    'Jaipur': (26.9124, 75.7873),
+    'Lucknow': (26.8467, 80.9462)
+}
+CITY_SPREAD_DEG = 0.3
+
+# (product, category, storage type, shelf life range in days), mirroring ml/data_generation.py
+PRODUCTS = [
+    ("Apple", "Fruit", "Refrigerated", (20, 30)),
+    ("Banana", "Fruit", "Ambient", (3, 7)),
+    ("Milk", "Dairy", "Refrigerated", (10, 15)),
+    ("Bread", "Bakery", "Ambient", (3, 5)),
+    ("Chicken", "Meat", "Refrigerated", (5, 10)),
+    ("Fish", "Seafood", "Frozen", (30, 60)),
+    ("Carrots", "Vegetable", "Refrigerated", (15, 30)),
+    ("Ice Cream", "FrozenDessert", "Frozen", (180, 365)),
+    ("Canned Beans", "Pantry", "Ambient", (365, 730)),
+    ("Eggs", "Dairy", "Refrigerated", (21, 30))
+]
+
+# Share of items per target warning level and the fraction of shelf life they have used
+WARNING_LEVEL_MIX = {
+    'good': (0.60, (0.0, 0.3)),
+    'monitor': (0.25, (0.31, 0.6)),
+    'warning': (0.10, (0.61, 0.8)),
+    'critical': (0.05, (0.81, 0.95))
+}
+
+@dataclass
+class Dataset:
+    """A generated benchmark dataset."""
+    inventory: pd.DataFrame
+    ngos: pd.DataFrame
+    depot: logistics.DeliveryPoint
+    delivery_points: List[logistics.DeliveryPoint]
+
+def _scatter(rng: np.random.Generator, n: int):
+    """Returns (location, latitude, longitude) arrays of `n` points scattered around the cities."""
+    names = np.array(list(CITIES), dtype=object)
+    centres = np.array(list(CITIES.values()))
+    city = rng.integers(len(names), size=n)
+    offsets = rng.uniform(-CITY_SPREAD_DEG, CITY_SPREAD_DEG, size=(n, 2))
+    coords = np.round(centres[city] + offsets, 4)
+    return names[city], coords[:, 0], coords[:, 1]
+
+def generate_inventory(n_items: int, seed: int = 0, today: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Generates `n_items` inventory rows with the columns of `data/mock_inventory.csv`.
+
+    Stock and expiry dates are spread around `today` following `WARNING_LEVEL_MIX`.
+    """
+    rng = np.random.default_rng(seed)
+    today = np.datetime64((today or datetime.now()).date(), 'D')
+
+    product = rng.integers(len(PRODUCTS), size=n_items)
+    shelf_ranges = np.array([p[3] for p in PRODUCTS])[product]
+    shelf_life = rng.integers(shelf_ranges[:, 0], shelf_ranges[:, 1] + 1)
+
+    shares, fraction_ranges = zip(*WARNING_LEVEL_MIX.values())
+    level = rng.choice(len(shares), size=n_items, p=shares)
+    fraction_ranges = np.array(fraction_ranges)[level]
+    used = (shelf_life * rng.uniform(fraction_ranges[:, 0], fraction_ranges[:, 1])).astype(np.int64)
+
+    stock_date = today - used.astype('timedelta64[D]')
+    expiry_date = stock_date + shelf_life.astype('timedelta64[D]')
+    location, latitude, longitude = _scatter(rng, n_items)
+    store = rng.integers(1, 4, size=n_items)
+
+    return pd.DataFrame({
+        'product_id': np.char.add('PROD-', np.arange(1001, 1001 + n_items).astype(str)),
+        'product_name': np.array([p[0] for p in PRODUCTS], dtype=object)[product],
+        'category': np.array([p[1] for p in PRODUCTS], dtype=object)[product],
+        'stock_date': stock_date.astype('datetime64[ns]'),
+        'expiry_date': expiry_date.astype('datetime64[ns]'),
+        'storage_type': np.array([p[2] for p in PRODUCTS], dtype=object)[product],
+        'store_id': [f"{name[:3].upper()}-{number:02d}" for name, number in zip(location, store)],
+        'location': location,
+        'latitude': latitude,
+        'longitude': longitude,
+        'temperature_c': np.round(rng.normal(12, 10, size=n_items), 1),
+        'humidity_percent': np.clip(np.round(rng.normal(70, 15, size=n_items)), 0, 100),
+        'spoilage': (rng.random(n_items) < 0.2).astype(np.int64)
+    })
+
+def generate_ngos(n_ngos: int, seed: int = 0) -> pd.DataFrame:
+    """Generates `n_ngos` NGO rows with the columns of `data/mock_ngos.csv`."""
+    rng = np.random.default_rng(seed + 1)
+    categories = np.array(list(CATEGORY_CONSTRAINTS))
+    location, latitude, longitude = _scatter(rng, n_ngos)
+
+    # Each NGO accepts 2-6 categories, like the generated mock data
+    accepted = [
+        '|'.join(categories[rng.permutation(len(categories))[:k]])
+        for k in rng.integers(2, 7, size=n_ngos)
+    ]
+    return pd.DataFrame({
+        'ngo_id': np.char.add('NGO-', np.arange(101, 101 + n_ngos).astype(str)),
+        'ngo_name': np.char.add('Benchmark Foundation ', np.arange(1, n_ngos + 1).astype(str)),
+        'location': location,
+        'latitude': latitude,
+        'longitude': longitude,
+        'capacity_kg': rng.integers(50, 500, size=n_ngos),
+        'accepted_categories': accepted
+    })
+
+def generate_delivery_points(n_points: int, seed: int = 0):
+    """Generates a depot and `n_points` delivery points around it for `logistics.optimize_route`."""
+    rng = np.random.default_rng(seed + 2)
+    depot_lat, depot_lon = CITIES['Delhi']
+    depot = logistics.DeliveryPoint(
+        id="DEPOT-01", name="Central Warehouse", latitude=depot_lat, longitude=depot_lon,
+        demand_kg=0, time_window=(8, 20), priority=1
+    )
+    latitudes = depot_lat + rng.uniform(-0.1, 0.1, size=n_points)
+    longitudes = depot_lon + rng.uniform(-0.1, 0.1, size=n_points)
+    demands = rng.uniform(50, 200, size=n_points)
+    priorities = rng.integers(1, 6, size=n_points)
+    points = [
+        logistics.DeliveryPoint(
+            id=f"NGO-{i + 1}", name=f"NGO Location {i + 1}",
+            latitude=float(latitudes[i]), longitude=float(longitudes[i]),
+            demand_kg=float(demands[i]), time_window=(9, 17), priority=int(priorities[i])
+        )
+        for i in range(n_points)
+    ]
+    return depot, points
+
+def generate_dataset(n_items: int, n_ngos: int, n_points: int, seed: int = 0) -> Dataset:
+    """Generates a full, reproducible benchmark dataset."""
+    depot, points = generate_delivery_points(n_points, seed)
+    return Dataset(
+        inventory=generate_inventory(n_items, seed),
+        ngos=generate_ngos(n_ngos, seed),
+        depot=depot,
+        delivery_points=points
+    )
+
+def measure(
+    fn: Callable[[], Any],
+    repeat: int = 3,
+    setup: Optional[Callable[[], Any]] = None,
+    trace_memory: bool = True
+) -> Dict[str, Any]:
+    """
+    Times `fn` over `repeat` runs and traces its peak memory in one extra run.
+
+    Timed runs are not traced, as `tracemalloc` slows allocation-heavy code down.
+    `setup` runs untimed before every run.
+
+    Returns:
+        dict: Wall times in seconds (min/mean/max and every run) and the peak
+            traced allocation in MiB (None without `trace_memory`)
+    """
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        started = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - started)
+
+    peak_mib = None
+    if trace_memory:
+        if setup is not None:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_mib = round(peak / 2**20, 3)
+
+    return {
+        "wall_s": {
+            "min": round(min(runs), 6),
+            "mean": round(sum(runs) / len(runs), 6),
+            "max": round(max(runs), 6),
+            "runs": [round(run, 6) for run in runs]
+        },
+        "peak_memory_mib": peak_mib
+    }
+
+def _write_tables(dataset: Dataset, plan_items: int, workdir: str) -> Dict[str, str]:
+    """Writes the dataset as columnar tables and returns their paths."""
+    paths = {
+        name: os.path.join(workdir, name + COLUMNAR_SUFFIX)
+        for name in ('inventory', 'ngos', 'plan_inventory')
+    }
+    write_columnar(dataset.inventory, paths['inventory'])
+    write_columnar(dataset.ngos, paths['ngos'])
+    write_columnar(dataset.inventory.iloc[:plan_items], paths['plan_inventory'])
+    return paths
+
+def _run_engine_benchmarks(
+    engine: RedistributionEngine,
+    selected: List[str],
+    run: Callable[..., Dict[str, Any]],
+    args,
+    n_items: int,
+    n_ngos: int,
+    results: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Runs the benchmarks of a loaded engine into `results`; the engine is released on return.
+
+    Returns:
+        list: The candidate records matched by find_best_matches, reused by the routing benchmark
+    """
+    loaded_inventory = engine.inventory_df
+
+    if 'get_redistribution_candidates' in selected:
+        # Reset the snapshot so every run scores the inventory cold
+        results['get_redistribution_candidates'] = {
+            "inputs": {"items": n_items, "warning_level": args.warning_level},
+            **run(
+                lambda: engine.get_redistribution_candidates(args.warning_level),
+                setup=lambda: engine.set_inventory(loaded_inventory)
+            )
+        }
+
+    sample: List[Dict[str, Any]] = []
+    if 'find_best_matches' in selected or 'routing.optimize_routes' in selected:
+        candidates, _ = engine.get_redistribution_candidates(args.warning_level)
+        sample = candidates.sample(
+            min(args.match_items, len(candidates)), random_state=args.seed
+        ).to_dict('records') if len(candidates) else []
+
+    if 'find_best_matches' in selected:
+        def match_all():
+            for item in sample:
+                engine.find_best_matches(item, top_k=args.top_k)
+        result = run(match_all)
+        result["per_call_ms"] = round(result["wall_s"]["min"] * 1000 / len(sample), 4) if sample else None
+        results['find_best_matches'] = {
+            "inputs": {"items": len(sample), "ngos": n_ngos, "top_k": args.top_k}, **result
+        }
+    return sample
+
+def _measure_plan(paths: Dict[str, str], run: Callable[..., Dict[str, Any]]) -> Dict[str, Any]:
+    """Times `get_redistribution_plan` on the plan sample, restoring its inventory before every run."""
+    redistributor = Redistributor(paths['plan_inventory'], paths['ngos'])
+    plan_inventory = redistributor.inventory_df.copy()
+
+    def reset_plan():
+        redistributor.inventory_df = plan_inventory.copy()
+    return run(redistributor.get_redistribution_plan, setup=reset_plan)
+
+def run_scenario(
+    name: str,
+    n_items: int,
+    n_ngos: int,
+    n_points: int,
+    args,
+    only: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    Generates one dataset and runs the benchmarks on it.
+
+    Args:
+        name (str): Scenario name recorded in the report.
+        n_items, n_ngos, n_points (int): Dataset sizes.
+        args: Parsed command line options (seed, repeat, sample sizes, memory tracing).
+        only (list, optional): Names from `BENCHMARKS` to run. Defaults to all.
+
+    Returns:
+        dict: Dataset sizes, generation time and one `measure` result per benchmark
+    """
+    selected = [b for b in BENCHMARKS if only is None or b in only]
+
+    def run(fn, setup=None):
+        return measure(fn, args.repeat, setup, not args.no_memory)
+
+    results: Dict[str, Any] = {}
+
+    started = time.perf_counter()
+    dataset = generate_dataset(n_items, n_ngos, n_points, args.seed)
+    generate_s = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory(prefix='zerowaste-bench-') as workdir:
+        plan_items = min(args.plan_items, n_items)
+        paths = _write_tables(dataset, plan_items, workdir)
+        # A private registry per engine, so engine_load includes building the NGO index
+        make_engine = lambda: RedistributionEngine(
+            paths['inventory'], paths['ngos'], match_cache_size=0, ngo_registry=NGORegistry(paths['ngos'])
+        )
+
+        if 'engine_load' in selected:
+            results['engine_load'] = {"inputs": {"items": n_items, "ngos": n_ngos}, **run(make_engine)}
+        sample = _run_engine_benchmarks(make_engine(), selected, run, args, n_items, n_ngos, results)
+
+        if 'get_redistribution_plan' in selected:
+            results['get_redistribution_plan'] = {
+                "inputs": {"items": plan_items, "ngos": n_ngos},
+                **_measure_plan(paths, run)
+            }
+
+        if 'routing.optimize_routes' in selected:
+            route_items = sample[:args.route_items]
+            route_ngos = [
+                {'latitude': point.latitude, 'longitude': point.longitude}
+                for point in dataset.delivery_points
+            ]
+            results['routing.optimize_routes'] = {
+                "inputs": {"items": len(route_items), "ngos": len(route_ngos), "max_vehicles": args.vehicles},
+                **run(lambda: routing.optimize_routes(route_items, route_ngos, max_vehicles=args.vehicles))
+            }
+
+        if 'logistics.optimize_route' in selected:
+            def route_all_vehicles():
+                for vehicle_type in logistics.VEHICLE_TYPES:
+                    logistics.optimize_route(dataset.depot, dataset.delivery_points, vehicle_type)
+            results['logistics.optimize_route'] = {
+                "inputs": {"points": n_points, "vehicle_types": len(logistics.VEHICLE_TYPES)},
+                **run(route_all_vehicles)
+            }
+
+    return {
+        "name": name,
+        "items": n_items,
+        "ngos": n_ngos,
+        "points": n_points,
+        "generate_s": round(generate_s, 6),
+        "benchmarks": results
+    }
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment_info() -> Dict[str, Any]:
+    """Returns the code version and platform details recorded with every report."""
+    return {
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    Compares the minimum wall times of two reports, per scenario and benchmark.
+
+    Args:
+        baseline (dict): A previous report.
+        current (dict): The new report.
+        tolerance (float): Slowdown ratio above which a benchmark counts as regressed.
+
+    Returns:
+        list: One entry per benchmark present in both reports, with the time ratio
+    """
+    previous = {
+        (scenario["name"], name): result
+        for scenario in baseline.get("scenarios", [])
+        for name, result in scenario["benchmarks"].items()
+    }
+    comparison = []
+    for scenario in current["scenarios"]:
+        for name, result in scenario["benchmarks"].items():
+            before = previous.get((scenario["name"], name))
+            if before is None or before["inputs"] != result["inputs"]:
+                continue
+            ratio = result["wall_s"]["min"] / before["wall_s"]["min"] if before["wall_s"]["min"] else None
+            comparison.append({
+                "scenario": scenario["name"],
+                "benchmark": name,
+                "baseline_s": before["wall_s"]["min"],
+                "current_s": result["wall_s"]["min"],
+                "ratio": round(ratio, 3) if ratio is not None else None,
+                "regressed": ratio is not None and ratio > tolerance
+            })
+    return comparison
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Zero Waste AI on seeded synthetic data.")
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help="Named dataset size (repeatable). Defaults to 'small'.")
+    parser.add_argument('--items', type=int, help="Custom scenario: inventory rows")
+    parser.add_argument('--ngos', type=int, default=20, help="Custom scenario: NGOs")
+    parser.add_argument('--points', type=int, default=10, help="Custom scenario: delivery points")
+    parser.add_argument('--only', action='append', choices=BENCHMARKS, help="Run only these benchmarks")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the traced peak-memory run")
+    parser.add_argument('--warning-level', default='monitor', help="Candidate level for the engine benchmarks")
+    parser.add_argument('--match-items', type=int, default=1000, help="Items matched by find_best_matches")
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--plan-items', type=int, default=100_000,
+                        help="Inventory rows given to Redistributor.get_redistribution_plan")
+    parser.add_argument('--route-items', type=int, default=20, help="Items given to routing.optimize_routes")
+    parser.add_argument('--vehicles', type=int, default=3, help="max_vehicles for routing.optimize_routes")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    parser.add_argument('--baseline', help="Previous report to compare minimum wall times against")
+    parser.add_argument('--tolerance', type=float, default=1.2,
+                        help="Slowdown ratio reported as a regression (exit status 1)")
+    args = parser.parse_args(argv)
+
+    configure_logging(logging.WARNING)
+    scenarios = [(name, *SCENARIOS[name]) for name in args.scenario or []]
+    if args.items is not None:
+        scenarios.append(('custom', args.items, args.ngos, args.points))
+    if not scenarios:
+        scenarios.append(('small', *SCENARIOS['small']))
+
+    report: Dict[str, Any] = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment_info(),
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ('scenario', 'items', 'ngos', 'points', 'output', 'baseline', 'tolerance')
+        },
+        "scenarios": [
+            run_scenario(name, n_items, n_ngos, n_points, args, args.only)
+            for name, n_items, n_ngos, n_points in scenarios
+        ]
+    }
+    if resource is not None:
+        # Process-wide high-water mark (KiB on Linux, bytes on macOS)
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        report["max_rss_mib"] = round(max_rss / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+
+    regressed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare_reports(json.load(f), report, args.tolerance)
+        regressed = any(entry["regressed"] for entry in report["comparison"])
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if regressed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Zero Waste AI - Match Result Cache
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+class MatchCache:
+    """
+    Bounded LRU cache with a TTL for per-item match results.
+
+    Every entry records the NGO table version and the item's freshness bucket it was
+    computed for. A lookup with a different version or bucket drops the entry and
+    counts as a miss, so results never outlive the NGO snapshot or the warning level
+    they were scored with. The least recently used entry is evicted beyond `maxsize`.
+    Safe for concurrent use.
+    """
+
+    def __init__(self, maxsize: int, ttl_s: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, version: int, bucket: Hashable) -> Optional[Any]:
+        """Returns the cached value for `key` if it is still valid, otherwise None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, entry_version, entry_bucket, expires_at = entry
+            if entry_version != version or entry_bucket != bucket:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any, version: int, bucket: Hashable) -> None:
+        """Stores a value computed for NGO `version` and freshness `bucket`."""
+        expires_at = time.monotonic() + self.ttl_s if self.ttl_s is not None else None
+        with self._lock:
+            self._entries[key] = (value, version, bucket, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the size, hit/miss counts and hit rate of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "expirations": self.expirations
+            }
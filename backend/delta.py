@@ -0,0 +1,109 @@
+"""
+Zero Waste AI - Row-Level Table Deltas
+"""
+
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+@dataclass
+class TableDelta:
+    """
+    Row-level differences between two versions of a table keyed by a unique ID column.
+
+    Surviving rows keep their order from the old table and inserted rows are appended
+    in the order they appear in the new table.
+
+    Attributes:
+        kept_old: Positions in the old table of the rows present in both versions.
+        kept_new: Positions of the same rows in the new table.
+        updated: Positions (into the kept rows) of rows whose values changed.
+        inserted_new: Positions in the new table of rows not in the old table.
+        deleted_old: Positions in the old table of rows missing from the new table.
+    """
+    kept_old: np.ndarray
+    kept_new: np.ndarray
+    updated: np.ndarray
+    inserted_new: np.ndarray
+    deleted_old: np.ndarray
+
+    @property
+    def merged_order(self) -> np.ndarray:
+        """Positions in the new table giving the surviving rows followed by the inserted rows."""
+        return np.r_[self.kept_new, self.inserted_new].astype(np.intp)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (len(self.updated) or len(self.inserted_new) or len(self.deleted_old))
+
+    def counts(self) -> dict:
+        """Returns the number of inserted, updated and deleted rows."""
+        return {
+            "inserted": len(self.inserted_new),
+            "updated": len(self.updated),
+            "deleted": len(self.deleted_old)
+        }
+
+def _values_differ(old_values: np.ndarray, new_values: np.ndarray) -> np.ndarray:
+    """Elementwise inequality that treats two missing values as equal."""
+    old_values = np.asarray(old_values, dtype=object)
+    new_values = np.asarray(new_values, dtype=object)
+    both_missing = pd.isna(old_values) & pd.isna(new_values)
+    return (old_values != new_values) & ~both_missing
+
+def compute_table_delta(
+    old_df: pd.DataFrame,
+    new_df: pd.DataFrame,
+    key: str,
+    columns: Optional[Sequence[str]] = None
+) -> Optional[TableDelta]:
+    """
+    Computes the inserts, updates and deletes turning `old_df` into `new_df`.
+
+    Args:
+        old_df: The table currently loaded.
+        new_df: The table just read from the source.
+        key: The ID column rows are matched on (e.g. `product_id`, `ngo_id`).
+        columns: Columns compared to detect updates. Defaults to the columns of `new_df`.
+
+    Returns:
+        The delta, or None if the tables cannot be diffed row by row (missing key
+        column, duplicate keys or different columns) and must be reloaded in full.
+    """
+    columns = list(new_df.columns if columns is None else columns)
+    if key not in old_df or key not in new_df or not set(columns).issubset(old_df.columns):
+        return None
+
+    old_index = pd.Index(old_df[key].to_numpy(dtype=object))
+    new_keys = new_df[key].to_numpy(dtype=object)
+    if not old_index.is_unique or not pd.Index(new_keys).is_unique:
+        return None
+
+    new_to_old = old_index.get_indexer(new_keys)
+    present = new_to_old >= 0
+
+    # Surviving rows in old-table order
+    kept_new = np.flatnonzero(present)
+    kept_old = new_to_old[kept_new]
+    order = np.argsort(kept_old, kind='stable')
+    kept_old, kept_new = kept_old[order], kept_new[order]
+
+    changed = np.zeros(len(kept_old), dtype=bool)
+    for column in columns:
+        changed |= _values_differ(
+            old_df[column].to_numpy()[kept_old],
+            new_df[column].to_numpy()[kept_new]
+        )
+
+    deleted = np.ones(len(old_df), dtype=bool)
+    deleted[kept_old] = False
+
+    return TableDelta(
+        kept_old=kept_old.astype(np.intp),
+        kept_new=kept_new.astype(np.intp),
+        updated=np.flatnonzero(changed),
+        inserted_new=np.flatnonzero(~present),
+        deleted_old=np.flatnonzero(deleted)
+    )
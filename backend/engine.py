@@ -1,7 +1,25 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, timedelta
+from backend.assignment import DEFAULT_EPSILON, DEFAULT_TIME_BUDGET_S, solve_capacitated_assignment
+from backend.cache import MatchCache
+from backend.delta import compute_table_delta
+from backend.logs import configure_logging, item_log_batch, item_logger, log_item
+from backend.metrics import Instrumentation, ShardedCounter
+from backend.registry import NGORegistry, get_ngo_registry
+from backend.storage import (
+    iter_table_chunks,
+    parse_date_columns,
+    parse_date_values,
+    read_table,
+    table_digest,
+    table_fingerprint
+)
 from backend.utils import calculate_distance, estimate_co2_savings
 import logging
+import threading
+from collections import Counter
 
 # --- CONFIGURATION ---
 INVENTORY_FILE = 'data/mock_inventory.csv'
@@ -76,30 +94,90 @@ CATEGORY_PRIORITIES = {
     "Pantry": 4          # Low priority (long shelf life)
 }
 
+# Freshness multipliers applied per category priority level
+PRIORITY_FRESHNESS_MULTIPLIERS = {
+    1: 0.9,  # High-priority perishables lose freshness faster
+    4: 1.1   # Low-priority non-perishables lose freshness slower
+}
+
 MATCHING_WEIGHTS = {
     "distance": 0.4,     # Closer NGOs preferred
     "capacity": 0.3,     # NGOs with more capacity preferred
     "category_focus": 0.3 # NGOs specializing in fewer categories preferred
 }
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+# Number of items queried and scored per block in batch matching
+BATCH_MATCH_CHUNK_SIZE = 2048
+
+# Default number of inventory rows read per chunk in streaming mode
+STREAM_CHUNK_SIZE = 100_000
+
+# Warning levels ordered from most to least urgent
+WARNING_PRIORITIES = {
+    'critical': 0,
+    'warning': 1,
+    'monitor': 2,
+    'good': 3
+}
+
+# Item load used for NGO capacity planning when the inventory has no weight column
+ITEM_WEIGHT_COLUMN = 'quantity_kg'
+DEFAULT_ITEM_WEIGHT_KG = 10.0
+
+# Columns freshness is computed from, and the columns the engine derives and caches on `inventory_df`
+FRESHNESS_INPUT_COLUMNS = ('stock_date', 'expiry_date', 'category')
+FRESHNESS_COLUMNS = ('freshness', 'warning_level', 'days_remaining')
+
+# Per-item match results kept by `find_best_matches` (0 disables the cache), and their lifetime
+MATCH_CACHE_SIZE = 10_000
+MATCH_CACHE_TTL_S = 3600.0
+
+# ID column inventory rows are keyed on when reloading row-level deltas (NGOs: see `backend.registry`)
+INVENTORY_KEY = 'product_id'
+
+# Logging is configured by the entry points (see `backend.logs.configure_logging`)
 logger = logging.getLogger(__name__)
 
 # --- CORE FUNCTIONS ---
 
-def calculate_freshness(stock_date_str, expiry_date_str, category=None):
+def _as_of_date(as_of=None):
+    """Normalizes an as-of date/datetime (default: today) to a `date`."""
+    if as_of is None:
+        return datetime.now().date()
+    if isinstance(as_of, str):
+        return datetime.fromisoformat(as_of).date()
+    if isinstance(as_of, datetime):
+        return as_of.date()
+    return as_of
+
+# Ordinal of 1970-01-01, for converting epoch days to dates
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _to_date(value):
+    """
+    Converts an ISO date string, datetime, pandas Timestamp, datetime64 or epoch-day
+    integer to a `date`.
+    """
+    if isinstance(value, str):
+        return datetime.fromisoformat(value).date()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, np.datetime64):
+        return date.fromordinal(EPOCH_ORDINAL + int(value.astype('datetime64[D]').astype(np.int64)))
+    if isinstance(value, (int, np.integer)):
+        return date.fromordinal(EPOCH_ORDINAL + int(value))
+    return value
+
+def calculate_freshness(stock_date_str, expiry_date_str, category=None, as_of=None):
     """
     Calculates the freshness of an item as a percentage (0-100) with category-specific adjustments.
 
     Args:
-        stock_date_str (str): The date the item was stocked (ISO format).
-        expiry_date_str (str): The date the item expires (ISO format).
+        stock_date_str (str, datetime, datetime64 or int): The date the item was stocked
+            (ISO format, parsed, or days since the Unix epoch).
+        expiry_date_str (str, datetime, datetime64 or int): The date the item expires.
         category (str, optional): The product category for specific adjustments.
+        as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
 
     Returns:
         tuple: (freshness_score, warning_level, days_remaining)
@@ -107,9 +185,9 @@ def calculate_freshness(stock_date_str, expiry_date_str, category=None):
             - warning_level: str ('critical', 'warning', 'monitor', or 'good')
             - days_remaining: int, number of days until expiry
     """
-    stock_date = datetime.fromisoformat(stock_date_str).date()
-    expiry_date = datetime.fromisoformat(expiry_date_str).date()
-    current_date = datetime.now().date()
+    stock_date = _to_date(stock_date_str)
+    expiry_date = _to_date(expiry_date_str)
+    current_date = _as_of_date(as_of)
 
     if current_date >= expiry_date:
         return 0.0, 'critical', 0
@@ -126,10 +204,8 @@ def calculate_freshness(stock_date_str, expiry_date_str, category=None):
     # Category-specific adjustments
     if category:
         priority = CATEGORY_PRIORITIES.get(category, 3)
-        if priority == 1:  # High-priority perishables
-            freshness_score *= 0.9  # Reduce freshness faster
-        elif priority == 4:  # Low-priority non-perishables
-            freshness_score *= 1.1  # Reduce freshness slower
+        if priority in PRIORITY_FRESHNESS_MULTIPLIERS:
+            freshness_score *= PRIORITY_FRESHNESS_MULTIPLIERS[priority]
     
     # Ensure score stays within bounds
     freshness_score = max(0, min(freshness_score, 100))
@@ -266,52 +342,857 @@ def calculate_freshness(stock_date_str, expiry_date_str, category=None):
     logger.info(f"Found {len(matches)} potential matches for {item['product_name']}")
     return matches, stats
 
+def _to_epoch_days(dates):
+    """
+    Converts dates to integer days since the Unix epoch.
+
+    Pre-parsed datetime64 columns (as loaded by `read_table`) are converted without
+    parsing; ISO strings and datetimes are parsed first, keeping the local wall date
+    of timezone-aware values like `datetime.fromisoformat(...).date()`.
+    """
+    values = dates.to_numpy() if isinstance(dates, pd.Series) else np.asarray(dates)
+    if np.issubdtype(values.dtype, np.integer):
+        return values.astype(np.int64)
+    if not np.issubdtype(values.dtype, np.datetime64):
+        values = parse_date_values(values).to_numpy(dtype='datetime64[ns]')
+    missing = np.isnat(values)
+    if missing.any():
+        raise ValueError(f"{int(missing.sum())} rows have a missing stock or expiry date")
+    return values.astype('datetime64[D]').astype(np.int64)
+
+def _category_freshness_multipliers(categories):
+    """Returns the per-row freshness multiplier implied by each row's category priority."""
+    multipliers = {
+        category: PRIORITY_FRESHNESS_MULTIPLIERS.get(priority, 1.0)
+        for category, priority in CATEGORY_PRIORITIES.items()
+    }
+    categories = pd.Series(np.asarray(categories, dtype=object), copy=False)
+    return categories.map(multipliers).fillna(1.0).to_numpy(dtype=np.float64)
+
+def _freshness_from_days(stock_days, expiry_days, multipliers, current_day):
+    """
+    Computes freshness from epoch-day arrays; the shared core of the vectorized paths.
+
+    Args:
+        stock_days (np.ndarray): Stock dates as days since the Unix epoch.
+        expiry_days (np.ndarray): Expiry dates as days since the Unix epoch.
+        multipliers (np.ndarray or float): Per-row category freshness multipliers.
+        current_day (int): The as-of date as days since the Unix epoch.
+
+    Returns:
+        tuple: (freshness_scores, warning_levels, days_remaining)
+    """
+    total_shelf_life = expiry_days - stock_days
+    days_remaining = expiry_days - current_day
+    expired = (days_remaining <= 0) | (total_shelf_life <= 0)
+
+    # Base freshness calculation (expired rows are overwritten below)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        freshness = (days_remaining / total_shelf_life) * 100
+
+    # Category-specific adjustments
+    freshness = freshness * multipliers
+
+    # Ensure scores stay within bounds
+    freshness = np.clip(freshness, 0, 100)
+    freshness[expired] = 0.0
+    days_remaining[expired] = 0
+
+    # Determine warning levels
+    warning_levels = np.select(
+        [
+            freshness <= FRESHNESS_THRESHOLDS['critical'],
+            freshness <= FRESHNESS_THRESHOLDS['warning'],
+            freshness <= FRESHNESS_THRESHOLDS['monitor']
+        ],
+        ['critical', 'warning', 'monitor'],
+        default='good'
+    ).astype(object)
+
+    return freshness, warning_levels, days_remaining
+
+def calculate_freshness_vectorized(stock_dates, expiry_dates, categories=None, as_of=None):
+    """
+    Vectorized counterpart of `calculate_freshness` for whole inventory columns.
+
+    Produces exactly the same scores, warning levels and days remaining as calling
+    `calculate_freshness` row by row, but parses each date column once and evaluates
+    the category adjustments and `FRESHNESS_THRESHOLDS` bucketing with NumPy.
+
+    Args:
+        stock_dates (array-like): Stock dates (datetime64, epoch days, ISO strings or datetimes).
+        expiry_dates (array-like): Expiry dates (datetime64, epoch days, ISO strings or datetimes).
+        categories (array-like, optional): Product categories for specific adjustments.
+        as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
+
+    Returns:
+        tuple: (freshness_scores, warning_levels, days_remaining)
+            - freshness_scores: float64 array from 0 to 100
+            - warning_levels: object array of 'critical', 'warning', 'monitor' or 'good'
+            - days_remaining: int64 array, number of days until expiry
+    """
+    multipliers = 1.0 if categories is None else _category_freshness_multipliers(categories)
+    return _freshness_from_days(
+        _to_epoch_days(stock_dates),
+        _to_epoch_days(expiry_dates),
+        multipliers,
+        _epoch_day(as_of)
+    )
+
+def _epoch_day(as_of=None):
+    """Returns an as-of date (default: today) as days since the Unix epoch."""
+    return int(np.datetime64(_as_of_date(as_of), 'D').astype(np.int64))
+
+@dataclass
+class MatchSet:
+    """
+    Ranked NGO matches for one item, kept as NGO row positions plus score arrays.
+
+    Matches are ordered best first. Nothing per NGO is allocated until `to_dicts` is called,
+    which returns the same dictionaries as `find_best_matches`.
+    """
+    ngo_rows: np.ndarray
+    distances_km: np.ndarray
+    match_scores: np.ndarray
+    distance_scores: np.ndarray
+    capacity_scores: np.ndarray
+    category_focus_scores: np.ndarray
+    ngo_records: list = field(default_factory=list, repr=False)
+
+    @classmethod
+    def empty(cls, ngo_records=None):
+        """Returns a MatchSet without matches."""
+        return cls(*(np.empty(0, dtype=np.intp if i == 0 else np.float64) for i in range(6)),
+                   ngo_records=ngo_records if ngo_records is not None else [])
+
+    def __len__(self):
+        return len(self.ngo_rows)
+
+    def to_dicts(self):
+        """
+        Materializes the matches as dictionaries of NGO details plus rounded scores.
+
+        Returns:
+            list: One dict per match, best first
+        """
+        matches = []
+        for i, ngo_row in enumerate(self.ngo_rows):
+            dist = float(self.distances_km[i])
+            ngo_match = dict(self.ngo_records[ngo_row])
+            ngo_match.update({
+                'distance_km': round(dist, 2),
+                'co2_savings_kg': round(estimate_co2_savings(dist), 2),
+                'match_score': round(float(self.match_scores[i]), 4),
+                'distance_score': round(float(self.distance_scores[i]), 4),
+                'capacity_score': round(float(self.capacity_scores[i]), 4),
+                'category_focus_score': round(float(self.category_focus_scores[i]), 4)
+            })
+            matches.append(ngo_match)
+        return matches
+
+def _round_like_python(values, decimals):
+    """
+    Rounds an array like Python's `round`, which `MatchSet.to_dicts` uses.
+
+    `np.round` scales by 10**decimals before rounding, which can tip a value lying
+    next to a tie the other way, so those few values are rounded in Python instead.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, decimals)
+    scaled = values * 10.0 ** decimals
+    for i in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6):
+        rounded[i] = round(float(values[i]), decimals)
+    return rounded
+
+def _rank_matches(match_scores, top_k=None):
+    """
+    Returns the positions of the `top_k` best scores, best first.
+
+    Scores are ranked after rounding to 4 decimals with ties kept in position order,
+    like a stable sort on the rounded scores, but only the top of the list is sorted.
+    """
+    rounded = np.round(match_scores, 4)
+    positions = np.arange(len(rounded))
+    if top_k is not None and top_k < len(rounded):
+        if top_k <= 0:
+            return positions[:0]
+        # Keep everything tied with the k-th best score so ties resolve by position
+        kth_best = -np.partition(-rounded, top_k - 1)[top_k - 1]
+        positions = np.flatnonzero(rounded >= kth_best)
+    order = positions[np.lexsort((positions, -rounded[positions]))]
+    return order[:top_k] if top_k is not None else order
+
+def _order_pairs(pair_items, pair_ngos, match_scores):
+    """
+    Returns the order that groups scored item/NGO pairs by item, best rounded score first
+    and ties in NGO row order, matching the ranking of `find_best_matches`.
+    """
+    return np.lexsort((pair_ngos, -np.round(match_scores, 4), pair_items))
+
+def _build_block_results(
+    pair_items, pair_ngos, dist, distance_scores, match_scores, n_items,
+    ngo_capacity, ngo_capacity_scores, ngo_category_focus_scores,
+    freshness, warning_levels, days_remaining, top_k, as_records, ngo_records
+):
+    """
+    Builds the ranked matches and statistics of a block of items.
+
+    Only needs arrays, so sharded workers build the same results as the batch path.
+
+    Args:
+        pair_items, pair_ngos, dist, distance_scores, match_scores (np.ndarray): Scored
+            item/NGO pairs in `_order_pairs` order, with pair_items as positions into the block.
+        n_items (int): Number of items in the block.
+        ngo_capacity, ngo_capacity_scores, ngo_category_focus_scores (np.ndarray): NGO arrays
+            of the snapshot the pairs were scored against, by NGO row.
+        freshness, warning_levels, days_remaining (np.ndarray): Evaluation of the block's items.
+        top_k (int, optional): Number of matches to keep per item. None keeps all.
+        as_records (bool): Build a `MatchSet` per item instead of a list of dicts.
+        ngo_records (list): NGO records by row, for the match dicts and `MatchSet.ngo_records`.
+
+    Returns:
+        list: One (matches, stats) tuple per item of the block
+    """
+    match_counts = np.bincount(pair_items, minlength=n_items)
+    group_starts = np.cumsum(match_counts) - match_counts
+    kept_counts = np.minimum(match_counts, top_k) if top_k is not None else match_counts
+
+    # Calculate matching statistics over every NGO in range
+    total_capacities = np.bincount(pair_items, weights=ngo_capacity[pair_ngos], minlength=n_items)
+    # Pairs are in ranked order, so each sum adds the rounded match values in list order
+    distance_sums = np.bincount(pair_items, weights=_round_like_python(dist, 2), minlength=n_items)
+    co2_sums = np.bincount(pair_items, weights=_round_like_python(estimate_co2_savings(dist), 2), minlength=n_items)
+
+    capacity_scores = ngo_capacity_scores[pair_ngos]
+    category_focus_scores = ngo_category_focus_scores[pair_ngos]
+
+    block_results = []
+    for r in range(n_items):
+        # Each item's ranked pairs are contiguous, so its matches are array views
+        kept = slice(group_starts[r], group_starts[r] + kept_counts[r])
+        matches = MatchSet(
+            ngo_rows=pair_ngos[kept],
+            distances_km=dist[kept],
+            match_scores=match_scores[kept],
+            distance_scores=distance_scores[kept],
+            capacity_scores=capacity_scores[kept],
+            category_focus_scores=category_focus_scores[kept],
+            ngo_records=ngo_records
+        )
+        count = int(match_counts[r])
+        block_results.append((matches if as_records else matches.to_dicts(), {
+            "status": "matches_found",
+            "total_matches": count,
+            "total_capacity_kg": float(total_capacities[r]),
+            "avg_distance_km": float(distance_sums[r]) / count if count else 0,
+            "total_potential_co2_savings": float(co2_sums[r]),
+            "recommendation": "proceed" if count > 0 else "expand_search",
+            "item_freshness": round(float(freshness[r]), 2),
+            "warning_level": warning_levels[r],
+            "days_remaining": int(days_remaining[r]),
+            "urgency": "high" if warning_levels[r] in ['critical', 'warning'] else "medium"
+        }))
+    return block_results
+
+# --- INVENTORY SNAPSHOTS ---
+
+# Levels tracked by the crossing index: warning levels, plus the day an item stops being redistributable
+CROSSING_LEVELS = ('monitor', 'warning', 'critical', 'ineligible')
+
+# Crossing day of items that are at every level from the start (no shelf life)
+ALWAYS_CROSSED = np.iinfo(np.int64).min
+
+def _first_day_where(stock_days, expiry_days, multipliers, estimate, condition):
+    """
+    Refines an estimated first day on which `condition(freshness)` holds to the exact day.
+
+    Freshness never increases with the date, so the day is moved until the condition
+    fails the day before and holds on the day itself, using the same float arithmetic
+    as `_freshness_from_days`.
+    """
+    def holds(days):
+        freshness, _, _ = _freshness_from_days(stock_days, expiry_days, multipliers, days)
+        return condition(freshness)
+
+    day = estimate.copy()
+    for _ in range(8):
+        early = ~holds(day)
+        late = holds(day - 1)
+        if not early.any() and not late.any():
+            break
+        day += early.astype(np.int64) - late.astype(np.int64)
+    return day
+
+@dataclass
+class FreshnessCrossingIndex:
+    """
+    Per-item dates on which freshness crosses each threshold, sorted for binary search.
+
+    Freshness only depends on the stock date, expiry date and category, and never
+    increases, so each item enters the monitor, warning and critical levels (and
+    stops meeting its category's `min_freshness` / `min_days`) on one fixed day.
+    `days[level]` holds that epoch day per inventory row, and `orders[level]` the rows
+    sorted by it, so "items at level L or worse on day D" is a prefix of `orders[L]`
+    found by binary search, at any date, without rescoring the inventory.
+    """
+    days: dict
+    orders: dict = field(repr=False)
+    sorted_days: dict = field(repr=False)
+
+    @classmethod
+    def build(cls, stock_days, expiry_days, categories):
+        """
+        Computes the crossing days of every item.
+
+        Args:
+            stock_days (np.ndarray): Stock dates as days since the Unix epoch.
+            expiry_days (np.ndarray): Expiry dates as days since the Unix epoch.
+            categories (np.ndarray): Product categories.
+        """
+        multipliers = _category_freshness_multipliers(categories)
+        shelf_life = (expiry_days - stock_days).astype(np.float64)
+        no_shelf_life = shelf_life <= 0
+
+        def first_day(threshold, condition):
+            # freshness <= threshold once (expiry - day) <= threshold * shelf_life / (100 * multiplier)
+            with np.errstate(invalid='ignore'):
+                estimate = expiry_days - np.floor(threshold * shelf_life / (100 * multipliers)).astype(np.int64)
+            estimate[no_shelf_life] = 0
+            day = _first_day_where(stock_days, expiry_days, multipliers, estimate, condition)
+            day[no_shelf_life] = ALWAYS_CROSSED
+            return day
+
+        days = {
+            level: first_day(FRESHNESS_THRESHOLDS[level], lambda freshness, t=FRESHNESS_THRESHOLDS[level]: freshness <= t)
+            for level in ('monitor', 'warning', 'critical')
+        }
+
+        # Items stop being redistributable below min_freshness or min_days, whichever comes first
+        constraints = pd.Series(np.asarray(categories, dtype=object), copy=False).map(CATEGORY_CONSTRAINTS)
+        constraints = [c if isinstance(c, dict) else DEFAULT_CONSTRAINTS for c in constraints]
+        min_freshness = np.array([c['min_freshness'] for c in constraints], dtype=np.float64)
+        min_days = np.array([c['min_days'] for c in constraints], dtype=np.int64)
+        below_freshness = np.empty(len(stock_days), dtype=np.int64)
+        for value in np.unique(min_freshness):
+            rows = np.flatnonzero(min_freshness == value)
+            below_freshness[rows] = first_day(value, lambda freshness, t=value: freshness < t)[rows]
+        days['ineligible'] = np.minimum(below_freshness, expiry_days - min_days + 1)
+
+        orders = {level: np.argsort(day, kind='stable') for level, day in days.items()}
+        sorted_days = {level: days[level][orders[level]] for level in days}
+        return cls(days=days, orders=orders, sorted_days=sorted_days)
+
+    def rows_at(self, level, day):
+        """Returns the rows at `level` or worse on `day` (for 'ineligible': no longer redistributable)."""
+        return self.orders[level][:np.searchsorted(self.sorted_days[level], day, side='right')]
+
+    def rows_crossing(self, level, after_day, until_day):
+        """Returns the rows reaching `level` after `after_day` and on or before `until_day`, earliest first."""
+        sorted_days = self.sorted_days[level]
+        start = np.searchsorted(sorted_days, after_day, side='right')
+        end = np.searchsorted(sorted_days, until_day, side='right')
+        return self.orders[level][start:end]
+
+@dataclass
+class InventorySnapshot:
+    """
+    Snapshot of the inventory with its product index and cached freshness state.
+
+    `df` carries the derived freshness columns once refreshed. Refreshes and reloads
+    build a new snapshot sharing the unchanged columns instead of writing into `df`,
+    so concurrent readers never see half-updated rows. `candidate_cache` memoizes
+    results computed from this snapshot only, and `crossings` holds its
+    `FreshnessCrossingIndex` once built.
+    """
+    df: pd.DataFrame
+    product_positions: dict = field(repr=False)
+    freshness_day: int = None
+    freshness_inputs: list = field(default=None, repr=False)
+    stock_days: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64), repr=False)
+    expiry_days: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64), repr=False)
+    multipliers: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64), repr=False)
+    pending: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.intp), repr=False)
+    candidate_cache: dict = field(default_factory=dict, repr=False)
+    crossings: FreshnessCrossingIndex = field(default=None, repr=False)
+
+    @classmethod
+    def build(cls, inventory_df):
+        """
+        Builds a snapshot with the product_id -> row position index over `inventory_df`.
+
+        The first row wins for duplicate IDs, matching the previous mask-and-`iloc[0]` lookup.
+        """
+        product_ids = (
+            inventory_df['product_id'].to_numpy()
+            if 'product_id' in inventory_df else np.empty(0, dtype=object)
+        )
+        product_positions = {}
+        for position, product_id in enumerate(product_ids):
+            product_positions.setdefault(product_id, position)
+        return cls(df=inventory_df, product_positions=product_positions)
+
+    def _has_freshness_state(self):
+        """Checks whether cached freshness state exists for every row of `df`."""
+        return (
+            self.freshness_inputs is not None
+            and len(self.stock_days) == len(self.df)
+            and set(FRESHNESS_COLUMNS).issubset(self.df.columns)
+        )
+
+    def _dirty_rows(self, inputs):
+        """Rows whose freshness inputs changed since the last refresh, or None to rescore all."""
+        if not self._has_freshness_state():
+            return None
+        changed = np.zeros(len(self.df), dtype=bool)
+        changed[self.pending] = True  # Rows inserted by a reload
+        for values, cached in zip(inputs, self.freshness_inputs):
+            changed |= values != cached
+        return np.flatnonzero(changed)
+
+    def _freshness_inputs(self):
+        return [self.df[column].to_numpy() for column in FRESHNESS_INPUT_COLUMNS]
+
+    def is_current(self, current_day):
+        """Checks whether the freshness columns are up to date for `current_day`."""
+        if self.freshness_day != current_day:
+            return False
+        dirty = self._dirty_rows(self._freshness_inputs())
+        return dirty is not None and len(dirty) == 0
+
+    def refreshed(self, current_day):
+        """
+        Returns a snapshot whose `freshness`, `warning_level` and `days_remaining` columns
+        are current for `current_day`, or `self` if they already are.
+
+        Dates are parsed only for rows whose stock date, expiry date or category changed
+        since the last refresh, and only those rows are rescored. When the as-of date
+        rolls over, every row is rescored from the cached epoch days without re-parsing.
+        """
+        df = self.df
+        inputs = self._freshness_inputs()
+        dirty = self._dirty_rows(inputs)
+        rebuild = dirty is None
+        if rebuild:
+            dirty = np.arange(len(df))
+        if len(dirty) == 0 and current_day == self.freshness_day:
+            return self
+
+        if rebuild:
+            stock_days = np.zeros(len(df), dtype=np.int64)
+            expiry_days = np.zeros(len(df), dtype=np.int64)
+            multipliers = np.ones(len(df), dtype=np.float64)
+        else:
+            stock_days = self.stock_days.copy()
+            expiry_days = self.expiry_days.copy()
+            multipliers = self.multipliers.copy()
+
+        # Re-parse only the rows whose inputs changed
+        freshness_inputs = self.freshness_inputs
+        if len(dirty):
+            stock_days[dirty] = _to_epoch_days(inputs[0][dirty])
+            expiry_days[dirty] = _to_epoch_days(inputs[1][dirty])
+            multipliers[dirty] = _category_freshness_multipliers(inputs[2][dirty])
+            freshness_inputs = [values.copy() for values in inputs]
+
+        if rebuild or current_day != self.freshness_day:
+            freshness, warning_levels, days_remaining = _freshness_from_days(
+                stock_days, expiry_days, multipliers, current_day
+            )
+        else:
+            freshness = df['freshness'].to_numpy(dtype=np.float64, copy=True)
+            warning_levels = df['warning_level'].to_numpy(dtype=object, copy=True)
+            days_remaining = df['days_remaining'].to_numpy(dtype=np.int64, copy=True)
+            freshness[dirty], warning_levels[dirty], days_remaining[dirty] = _freshness_from_days(
+                stock_days[dirty], expiry_days[dirty], multipliers[dirty], current_day
+            )
+
+        # Replace whole columns on a shallow copy; the previous snapshot's frame is untouched
+        refreshed_df = df.copy(deep=False)
+        refreshed_df['freshness'] = freshness
+        refreshed_df['warning_level'] = warning_levels
+        refreshed_df['days_remaining'] = days_remaining
+
+        return replace(
+            self,
+            df=refreshed_df,
+            freshness_day=current_day,
+            freshness_inputs=freshness_inputs,
+            stock_days=stock_days,
+            expiry_days=expiry_days,
+            multipliers=multipliers,
+            pending=np.empty(0, dtype=np.intp),
+            candidate_cache={},
+            # Crossing days do not depend on the date, only on changed rows
+            crossings=self.crossings if not rebuild and len(dirty) == 0 else None
+        )
+
+    def crossing_index(self):
+        """Returns the snapshot's `FreshnessCrossingIndex`, building it on first use."""
+        if self.crossings is None:
+            df = self.df
+            self.crossings = FreshnessCrossingIndex.build(
+                _to_epoch_days(df['stock_date']),
+                _to_epoch_days(df['expiry_date']),
+                df['category'].to_numpy()
+            )
+        return self.crossings
+
+    def with_delta(self, new_inventory, delta):
+        """
+        Returns a new snapshot with a row-level inventory delta applied.
+
+        Surviving rows keep their parsed dates and freshness columns; updated rows are
+        caught by the input comparison of the next refresh and inserted rows are marked
+        pending, so only changed rows are re-parsed and rescored.
+        """
+        kept = delta.kept_old
+        n_kept = len(kept)
+        inventory_df = new_inventory.iloc[delta.merged_order].reset_index(drop=True)
+        inserted = np.arange(n_kept, len(inventory_df))
+
+        # Deletes shift row positions; otherwise only the inserted rows need indexing
+        product_ids = inventory_df['product_id'].to_numpy()
+        if len(delta.deleted_old):
+            product_positions = dict(zip(product_ids, range(len(product_ids))))
+        else:
+            product_positions = dict(self.product_positions)
+            for position in inserted:
+                product_positions[product_ids[position]] = int(position)
+
+        if not self._has_freshness_state():
+            return InventorySnapshot(df=inventory_df, product_positions=product_positions)
+
+        old_to_new = np.full(len(self.df), -1, dtype=np.intp)
+        old_to_new[kept] = np.arange(n_kept)
+        pending = old_to_new[self.pending]
+
+        new_inputs = [inventory_df[column].to_numpy() for column in FRESHNESS_INPUT_COLUMNS]
+        for column, fill in zip(FRESHNESS_COLUMNS, (np.nan, None, 0)):
+            previous = self.df[column].to_numpy()
+            values = np.empty(len(inventory_df), dtype=previous.dtype)
+            values[:n_kept] = previous[kept]
+            values[n_kept:] = fill
+            inventory_df[column] = values
+
+        return InventorySnapshot(
+            df=inventory_df,
+            product_positions=product_positions,
+            freshness_day=self.freshness_day,
+            freshness_inputs=[
+                np.concatenate([cached[kept], values[inserted]])
+                for cached, values in zip(self.freshness_inputs, new_inputs)
+            ],
+            stock_days=np.r_[self.stock_days[kept], np.zeros(len(inserted), dtype=np.int64)],
+            expiry_days=np.r_[self.expiry_days[kept], np.zeros(len(inserted), dtype=np.int64)],
+            multipliers=np.r_[self.multipliers[kept], np.ones(len(inserted))],
+            pending=np.r_[pending[pending >= 0], inserted].astype(np.intp)
+        )
+
 # --- MAIN CLASS (ENGINE) ---
 
 class RedistributionEngine:
-    def __init__(self):
-        """Initializes the engine by loading the datasets and setting up monitoring."""
+    def __init__(
+        self,
+        inventory_file=None,
+        ngo_file=None,
+        chunksize=None,
+        instrument=False,
+        match_cache_size=MATCH_CACHE_SIZE,
+        match_cache_ttl_s=MATCH_CACHE_TTL_S,
+        ngo_registry=None
+    ):
+        """
+        Initializes the engine by loading the datasets and setting up monitoring.
+
+        The engine may be shared between threads. Readers work on immutable inventory
+        and NGO snapshots, which writers (freshness refreshes, `reload`, `set_inventory`)
+        replace atomically under a lock, and monitoring counters are kept per thread.
+        NGO snapshots come from the process-wide `NGORegistry` of `ngo_file`, shared
+        with every other engine, `Redistributor` and dashboard using that table.
+
+        Args:
+            inventory_file (str, optional): Inventory CSV or `.zwcol` table. Defaults to `INVENTORY_FILE`.
+            ngo_file (str, optional): NGO CSV or `.zwcol` table. Defaults to `NGO_FILE`.
+            chunksize (int, optional): Enables streaming mode. The inventory is not loaded
+                up front; `iter_redistribution_candidates` reads it `chunksize` rows at a time.
+            instrument (bool): Record per-stage timings and cache counters (see `metrics`).
+                Can be toggled later through `instrumentation.enabled`.
+            match_cache_size (int): Entries kept by the `find_best_matches` result cache; 0 disables it.
+            match_cache_ttl_s (float, optional): Lifetime of cached match results. None keeps
+                them until evicted or invalidated.
+            ngo_registry (NGORegistry, optional): Use this registry instead of the shared
+                one of `ngo_file`.
+        """
         logger.info("Initializing Redistribution Engine...")
-        self.stats = {
-            "total_items_processed": 0,
-            "successful_matches": 0,
+        self.inventory_file = inventory_file or INVENTORY_FILE
+        self.ngo_file = ngo_file or NGO_FILE
+        self.chunksize = chunksize
+        self._lock = threading.RLock()  # Serializes writers; readers never take it
+        self._stats = ShardedCounter()
+        self._stats_categories = {}
+        self.instrumentation = Instrumentation(enabled=instrument)
+        self.match_cache = MatchCache(match_cache_size, match_cache_ttl_s) if match_cache_size else None
+
+        # Change stamps of the loaded sources, used by `reload`
+        self._source_fingerprints = {}
+        self._source_digests = {}
+
+        # The NGO and inventory tables fail independently: a missing inventory must
+        # not detach the engine from a shared registry that loaded fine
+        loaded = True
+        with self.instrumentation.stage('load'):
+            try:
+                self._ngo_registry = ngo_registry or get_ngo_registry(self.ngo_file)
+            except FileNotFoundError as e:
+                logger.error("Error loading data: %s", e)
+                self._ngo_registry = NGORegistry(ngos_df=pd.DataFrame())
+                loaded = False
+            try:
+                if chunksize is None:
+                    self._source_fingerprints['inventory'] = table_fingerprint(self.inventory_file)
+                    inventory_df = read_table(self.inventory_file)
+                else:
+                    inventory_df = pd.DataFrame()
+            except FileNotFoundError as e:
+                logger.error("Error loading data: %s", e)
+                self._source_fingerprints.pop('inventory', None)
+                inventory_df = pd.DataFrame()
+                loaded = False
+        if loaded:
+            logger.info("Datasets loaded successfully.")
+        else:
+            logger.error("Please ensure mock data has been generated by running `ml/data_generation.py`")
+
+        self._inventory = InventorySnapshot.build(inventory_df)
+        self._initialize_monitoring()
+
+    @property
+    def inventory_df(self):
+        """The current inventory, with freshness columns once they have been computed."""
+        return self._inventory.df
+
+    @inventory_df.setter
+    def inventory_df(self, inventory_df):
+        self.set_inventory(inventory_df)
+
+    @property
+    def ngo_registry(self):
+        """The `NGORegistry` the engine reads NGO snapshots from."""
+        return self._ngo_registry
+
+    @property
+    def _ngo_index(self):
+        return self._ngo_registry.index
+
+    @property
+    def ngos_df(self):
+        """The current NGO table."""
+        return self._ngo_index.ngos_df
+
+    @ngos_df.setter
+    def ngos_df(self, ngos_df):
+        # Engine-local, like before the registry was shared: move to a private registry
+        # rather than replacing the table for every consumer (use `ngo_registry.replace`
+        # for that). The version keeps increasing so cached matches are invalidated.
+        with self._lock:
+            self._ngo_registry = NGORegistry(ngos_df=ngos_df, version=self._ngo_registry.version + 1)
+
+    @property
+    def stats(self):
+        """Monitoring statistics, merged from the per-thread counters on each read."""
+        totals = self._stats.totals()
+        return {
+            "total_items_processed": totals.get("total_items_processed", 0),
+            "successful_matches": totals.get("successful_matches", 0),
             "items_by_warning_level": {
-                "critical": 0,
-                "warning": 0,
-                "monitor": 0,
-                "good": 0
+                level: totals.get(("items_by_warning_level", level), 0) for level in WARNING_PRIORITIES
             },
-            "items_by_category": {}
+            "items_by_category": {
+                category: {
+                    key: totals.get((key, category), 0)
+                    for key in ("total", "needs_redistribution", "successfully_matched")
+                }
+                for category in list(self._stats_categories)
+            }
         }
-        
+
+    def metrics(self):
+        """
+        Returns the per-stage timings and cache counters recorded by the instrumentation.
+
+        Stages are 'load', 'freshness', 'candidate_filter', 'category_filter', 'distance',
+        'scoring', 'sort' and 'serialization'; each reports its calls, rows processed,
+        total seconds and mean milliseconds. Nothing is recorded unless the engine was
+        created with `instrument=True` or `instrumentation.enabled` was set.
+
+        Returns:
+            dict: 'enabled', 'stages' and 'counters'
+        """
+        return self.instrumentation.snapshot()
+
+    def match_cache_stats(self):
+        """Returns the size and hit/miss statistics of the match result cache (None if disabled)."""
+        return self.match_cache.stats() if self.match_cache is not None else None
+
+    def export_metrics(self, path):
+        """Writes the metrics to `path` in the Prometheus text format."""
+        self.instrumentation.write_prometheus(path)
+
+    def set_inventory(self, inventory_df):
+        """
+        Replaces the inventory and rebuilds the derived per-item indexes.
+
+        Date columns given as ISO strings are parsed once here.
+
+        Args:
+            inventory_df (pd.DataFrame): The new inventory.
+        """
+        inventory_df = parse_date_columns(inventory_df.reset_index(drop=True))
+        with self._lock:
+            self._inventory = InventorySnapshot.build(inventory_df)
+        self._initialize_monitoring()
+
+    def find_ngos_within_radius(self, category, latitude, longitude, radius_km):
+        """
+        Finds the NGOs accepting a category within `radius_km` of a location.
+
+        Args:
+            category (str): The product category.
+            latitude (float): Latitude of the location.
+            longitude (float): Longitude of the location.
+            radius_km (float): Search radius in kilometers.
+
+        Returns:
+            tuple: (ngo_rows, distances_km), ordered by NGO row position
+        """
+        return self._ngo_index.find_within_radius(category, latitude, longitude, radius_km)
+
+    def get_compatible_ngo_rows(self, category):
+        """
+        Returns the positions (in `ngos_df`) of the NGOs accepting a category.
+
+        Args:
+            category (str): The product category.
+
+        Returns:
+            np.ndarray: Sorted NGO row positions; empty if no NGO accepts the category.
+        """
+        return self._ngo_index.compatible_rows(category)
+
+    def _initialize_monitoring(self, categories=None):
+        """Registers inventory categories so the monitoring stats list them from the start."""
+        if categories is None:
+            inventory_df = self.inventory_df
+            categories = [] if inventory_df.empty else inventory_df['category'].unique()
+        for category in categories:
+            self._stats_categories.setdefault(category, None)
+
+    def _refresh_freshness(self, as_of=None):
+        """
+        Returns an inventory snapshot whose `freshness`, `warning_level` and `days_remaining`
+        columns are up to date for the as-of date (see `InventorySnapshot.refreshed`).
+
+        Checking an up-to-date snapshot takes no lock; when rows or the date changed, the
+        refreshed snapshot is built and swapped in under the writer lock.
+
+        Args:
+            as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
+
+        Returns:
+            InventorySnapshot: The refreshed snapshot
+        """
+        current_day = _epoch_day(as_of)
+        snapshot = self._inventory
+        if snapshot.is_current(current_day):
+            self.instrumentation.count('freshness_cache_hits')
+            return snapshot
+        self.instrumentation.count('freshness_cache_misses')
+        with self._lock, self.instrumentation.stage('freshness', len(self._inventory.df)):
+            snapshot = self._inventory.refreshed(current_day)
+            self._inventory = snapshot
+        return snapshot
+
+    def reload(self, force=False):
+        """
+        Picks up changes to the inventory and NGO sources without rebuilding the engine.
+
+        A source is re-read only when its mtime or size changed and its content hash
+        differs from the last load. Changes are applied as row-level inserts, updates
+        and deletes keyed by `product_id` / `ngo_id`: the NGO category index, spatial
+        trees, product index and cached freshness columns are patched for the affected
+        rows only, and the new snapshots are swapped in atomically. Surviving rows keep
+        their order and inserted rows are appended. Sources that cannot be diffed
+        (duplicate IDs, changed columns or storage format) are reloaded in full.
+        NGO changes go through the shared `NGORegistry`, so they reach every consumer.
+
+        Args:
+            force (bool): Re-read and diff both sources even if they look unchanged.
+
+        Returns:
+            dict: For 'ngos' and 'inventory', the status ('unchanged', 'delta', 'full',
+                'missing' or 'streaming') and the number of inserted, updated and deleted rows
+        """
+        with self._lock:
+            result = {"ngos": self._ngo_registry.reload(force)}
+            if self.chunksize is None:
+                result["inventory"] = self._reload_inventory(force)
+            else:
+                # Streaming mode re-reads the inventory on every pass
+                result["inventory"] = {"status": "streaming"}
+        return result
+
+    def _reload_inventory(self, force=False):
+        """Reloads the inventory source if it changed; see `reload`."""
+        path = self.inventory_file
+        previous = self._source_fingerprints.get('inventory')
         try:
-            self.inventory_df = pd.read_csv(INVENTORY_FILE)
-            self.ngos_df = pd.read_csv(NGO_FILE)
-            self._initialize_monitoring()
-            logger.info("Datasets loaded successfully.")
+            fingerprint = table_fingerprint(path)
+            if not force and fingerprint == previous:
+                return {"status": "unchanged"}
+            digest = table_digest(path)
+            if not force and digest == self._source_digests.get('inventory'):
+                # Touched but not edited
+                self._source_fingerprints['inventory'] = fingerprint
+                return {"status": "unchanged"}
+            with self.instrumentation.stage('load'):
+                new_df = read_table(path)
         except FileNotFoundError as e:
-            logger.error(f"Error loading data: {e}")
-            logger.error("Please ensure mock data has been generated by running `ml/data_generation.py`")
-            self.inventory_df = pd.DataFrame()
-            self.ngos_df = pd.DataFrame()
-
-    def _initialize_monitoring(self):
-        """Sets up initial monitoring statistics."""
-        if not self.inventory_df.empty:
-            # Initialize category statistics
-            for category in self.inventory_df['category'].unique():
-                self.stats["items_by_category"][category] = {
-                    "total": 0,
-                    "needs_redistribution": 0,
-                    "successfully_matched": 0
-                }
+            logger.error("Error reloading inventory: %s", e)
+            return {"status": "missing"}
+
+        current_df = self.inventory_df
+        source_columns = [column for column in current_df.columns if column not in FRESHNESS_COLUMNS]
+        delta = None
+        if (previous is not None and previous['path'] == fingerprint['path']
+                and set(source_columns) == set(new_df.columns)):
+            delta = compute_table_delta(current_df, new_df, INVENTORY_KEY)
+
+        if delta is None:
+            self.set_inventory(new_df)
+            result = {"status": "full", "rows": len(new_df)}
+        else:
+            if not delta.is_empty:
+                self._inventory = self._inventory.with_delta(new_df, delta)
+                self._initialize_monitoring(pd.unique(new_df['category'].to_numpy()[delta.inserted_new]))
+            result = {"status": "delta", **delta.counts()}
+
+        self._source_fingerprints['inventory'] = fingerprint
+        self._source_digests['inventory'] = digest
+        logger.info("Reloaded inventory: %s", result)
+        return result
 
-    def get_redistribution_candidates(self, warning_level='warning'):
+    def get_redistribution_candidates(self, warning_level='warning', as_of=None):
         """
         Identifies items needing redistribution based on warning level.
+
+        Freshness columns are refreshed incrementally, and the result is cached per
+        warning level on the inventory snapshot it was computed from. Queries for a date
+        other than today are answered from the snapshot's `FreshnessCrossingIndex`: only
+        the selected rows are scored, and the shared freshness columns stay on today.
         
         Args:
             warning_level (str): Minimum warning level to consider ('critical', 'warning', or 'monitor')
+            as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
         
         Returns:
             tuple: (candidates_df, summary)
@@ -321,45 +1202,165 @@ class RedistributionEngine:
         if self.inventory_df.empty:
             return pd.DataFrame(), {"status": "no_data"}
 
-        # Calculate freshness and warning levels for all items
-        self.inventory_df[['freshness', 'warning_level', 'days_remaining']] = self.inventory_df.apply(
-            lambda row: calculate_freshness(row['stock_date'], row['expiry_date'], row['category']),
-            axis=1,
-            result_type='expand'
-        )
+        if as_of is not None and _epoch_day(as_of) != _epoch_day():
+            return self._candidates_from_crossings(self._inventory, warning_level, _epoch_day(as_of))
 
-        # Map warning levels to numerical values for filtering
-        warning_priorities = {
-            'critical': 0,
-            'warning': 1,
-            'monitor': 2,
-            'good': 3
-        }
-        
-        threshold_priority = warning_priorities[warning_level]
+        # Bring freshness and warning levels up to date for changed rows only
+        snapshot = self._refresh_freshness(as_of)
+
+        cached = snapshot.candidate_cache.get(warning_level)
+        if cached is not None:
+            self.instrumentation.count('candidate_cache_hits')
+            return cached[0].copy(), dict(cached[1])
+        self.instrumentation.count('candidate_cache_misses')
+
+        candidates = self._select_candidates(snapshot.df, warning_level)
+        summary = self._summarize_candidates(candidates)
+
+        snapshot.candidate_cache[warning_level] = (candidates, summary)
+        return candidates.copy(), dict(summary)
+
+    def _candidates_from_crossings(self, snapshot, warning_level, day):
+        """Selects candidates for `day` by binary search on the crossing index and scores only them."""
+        cached = snapshot.candidate_cache.get((warning_level, day))
+        if cached is not None:
+            self.instrumentation.count('candidate_cache_hits')
+            return cached[0].copy(), dict(cached[1])
+        self.instrumentation.count('candidate_cache_misses')
+
+        with self.instrumentation.stage('candidate_filter', len(snapshot.df)):
+            if warning_level == 'good':
+                rows = np.arange(len(snapshot.df))
+            else:
+                # Inventory order, so ties sort as they do on the full refresh path
+                rows = np.sort(snapshot.crossing_index().rows_at(warning_level, day))
+        candidates = self._score_rows(snapshot, rows, day)
+        candidates = self._select_candidates(candidates, warning_level)
+        summary = self._summarize_candidates(candidates)
+
+        snapshot.candidate_cache[(warning_level, day)] = (candidates, summary)
+        return candidates.copy(), dict(summary)
+
+    def _score_rows(self, snapshot, rows, day):
+        """Returns the given inventory rows with freshness columns computed for `day`."""
+        items_df = snapshot.df.iloc[rows].copy()
+        with self.instrumentation.stage('freshness', len(rows)):
+            freshness, warning_levels, days_remaining = _freshness_from_days(
+                _to_epoch_days(items_df['stock_date']),
+                _to_epoch_days(items_df['expiry_date']),
+                _category_freshness_multipliers(items_df['category'].to_numpy()),
+                day
+            )
+        items_df['freshness'] = freshness
+        items_df['warning_level'] = warning_levels
+        items_df['days_remaining'] = days_remaining
+        return items_df
+
+    def crossing_index(self):
+        """
+        Returns the `FreshnessCrossingIndex` of the current inventory, built on first use
+        and kept until inventory rows change.
+        """
+        return self._inventory.crossing_index()
+
+    def get_upcoming_crossings(self, level='critical', days=3, as_of=None):
+        """
+        Finds the items that will reach a level within the next `days` days.
+
+        For example `get_upcoming_crossings('critical', days=3)` lists the items turning
+        critical in the next 3 days, and level 'ineligible' the items that will stop
+        meeting their category's `min_freshness` / `min_days`. Rows come from a binary
+        search on the crossing index.
+
+        Args:
+            level (str): 'monitor', 'warning', 'critical' or 'ineligible'.
+            days (int): Length of the look-ahead window in days.
+            as_of (date or datetime, optional): Start of the window (exclusive). Defaults to today.
+
+        Returns:
+            pd.DataFrame: The items with freshness columns as of `as_of` and a `crossing_date`
+                column, ordered by crossing date
+        """
+        if level not in CROSSING_LEVELS:
+            raise ValueError(f"Unknown crossing level: {level!r}")
+        snapshot = self._inventory
+        if snapshot.df.empty:
+            return pd.DataFrame()
+
+        day = _epoch_day(as_of)
+        crossings = snapshot.crossing_index()
+        rows = crossings.rows_crossing(level, day, day + days)
+        upcoming = self._score_rows(snapshot, rows, day)
+        upcoming['crossing_date'] = crossings.days[level][rows].astype('datetime64[D]')
+        return upcoming
+
+    def _select_candidates(self, inventory_df, warning_level):
+        """Filters items at `warning_level` or worse and sorts them by urgency, then freshness."""
+        threshold_priority = WARNING_PRIORITIES[warning_level]
         
         # Filter and sort candidates
-        candidates = self.inventory_df[
-            self.inventory_df['warning_level'].map(warning_priorities) <= threshold_priority
-        ].copy()
+        with self.instrumentation.stage('candidate_filter', len(inventory_df)):
+            candidates = inventory_df[
+                inventory_df['warning_level'].map(WARNING_PRIORITIES) <= threshold_priority
+            ].copy()
         
-        candidates = candidates.sort_values(
-            by=['warning_level', 'freshness'],
-            key=lambda x: x.map(warning_priorities) if x.name == 'warning_level' else x,
-            ascending=[True, True]
-        )
+        with self.instrumentation.stage('sort', len(candidates)):
+            return candidates.sort_values(
+                by=['warning_level', 'freshness'],
+                key=lambda x: x.map(WARNING_PRIORITIES) if x.name == 'warning_level' else x,
+                ascending=[True, True]
+            )
 
-        # Generate summary statistics
-        summary = {
+    def _summarize_candidates(self, candidates):
+        """Generates summary statistics for a set of candidates."""
+        return {
             "total_candidates": len(candidates),
-            "by_warning_level": candidates['warning_level'].value_counts().to_dict(),
-            "by_category": candidates['category'].value_counts().to_dict(),
-            "avg_days_remaining": candidates['days_remaining'].mean(),
+            # Count observed values only: columnar tables load categoricals, whose
+            # value_counts would also list categories without candidates
+            "by_warning_level": {
+                level: int(count) for level, count in candidates['warning_level'].astype(object).value_counts().items()
+            },
+            "by_category": {
+                category: int(count) for category, count in candidates['category'].astype(object).value_counts().items()
+            },
+            "avg_days_remaining": float(candidates['days_remaining'].mean()),
             "urgent_items": len(candidates[candidates['warning_level'] == 'critical']),
             "recommendation": self._generate_redistribution_recommendation(candidates)
         }
 
-        return candidates, summary
+    def iter_redistribution_candidates(self, warning_level='warning', as_of=None, chunksize=None):
+        """
+        Streams redistribution candidates from the inventory table chunk by chunk.
+
+        Each chunk is read, scored with the vectorized freshness path and filtered
+        independently, so peak memory depends on the chunk size rather than the
+        inventory size. Candidates are sorted within each chunk only.
+
+        Args:
+            warning_level (str): Minimum warning level to consider ('critical', 'warning', or 'monitor')
+            as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
+            chunksize (int, optional): Rows per chunk. Defaults to the engine's `chunksize`
+                or `STREAM_CHUNK_SIZE`.
+
+        Yields:
+            pd.DataFrame: The candidates found in each chunk (chunks without candidates are skipped)
+        """
+        chunksize = chunksize or self.chunksize or STREAM_CHUNK_SIZE
+        for chunk in iter_table_chunks(self.inventory_file, chunksize):
+            with self.instrumentation.stage('freshness', len(chunk)):
+                freshness, warning_levels, days_remaining = calculate_freshness_vectorized(
+                    chunk['stock_date'],
+                    chunk['expiry_date'],
+                    chunk['category'],
+                    as_of=as_of
+                )
+            chunk['freshness'] = freshness
+            chunk['warning_level'] = warning_levels
+            chunk['days_remaining'] = days_remaining
+
+            candidates = self._select_candidates(chunk, warning_level)
+            if not candidates.empty:
+                yield candidates
 
     def _generate_redistribution_recommendation(self, candidates_df):
         """Generates strategic recommendations based on candidate analysis."""
@@ -376,12 +1377,13 @@ class RedistributionEngine:
         else:
             return "Monitor items and plan ahead for redistribution"
 
-    def run_engine_for_item(self, product_id):
+    def run_engine_for_item(self, product_id, as_of=None):
         """
         Runs comprehensive redistribution analysis for a single product.
         
         Args:
             product_id (str): The ID of the product to process.
+            as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
             
         Returns:
             dict: Complete analysis including:
@@ -390,21 +1392,26 @@ class RedistributionEngine:
                 - stats: Matching statistics and recommendations
                 - historic_data: Any relevant historical data
         """
-        try:
-            item = self.inventory_df[self.inventory_df['product_id'] == product_id].iloc[0]
-        except (IndexError, KeyError):
-            logger.error(f"Product ID {product_id} not found in inventory")
+        snapshot = self._inventory
+        position = snapshot.product_positions.get(product_id)
+        if position is None:
+            logger.error("Product ID %s not found in inventory", product_id)
             return {"status": "error", "message": "Product not found"}
+        item = snapshot.df.iloc[position]
         
         # Get freshness analysis
         freshness_score, warning_level, days_remaining = calculate_freshness(
             item['stock_date'], 
             item['expiry_date'],
-            item['category']
+            item['category'],
+            as_of=as_of
         )
         
         if warning_level == 'good':
-            logger.info(f"Item {product_id} has adequate freshness ({freshness_score:.2f}%)")
+            log_item(
+                'no_action_needed', "Item %s has adequate freshness (%.2f%%)", product_id, freshness_score,
+                product_id=product_id
+            )
             return {
                 "status": "no_action_needed",
                 "item_details": item.to_dict(),
@@ -416,19 +1423,10 @@ class RedistributionEngine:
             }
         
         # Find and analyze matches
-        matches, match_stats = self.find_best_matches(item)
+        matches, match_stats = self.find_best_matches(item, as_of=as_of)
         
         # Update monitoring stats
-        self.stats["total_items_processed"] += 1
-        self.stats["items_by_warning_level"][warning_level] += 1
-        self.stats["successful_matches"] += 1 if matches else 0
-        
-        category_stats = self.stats["items_by_category"].get(item['category'], {"total": 0, "needs_redistribution": 0, "successfully_matched": 0})
-        category_stats["total"] += 1
-        category_stats["needs_redistribution"] += 1
-        if matches:
-            category_stats["successfully_matched"] += 1
-        self.stats["items_by_category"][item['category']] = category_stats
+        self._record_item_processed(item['category'], warning_level, bool(matches))
 
         return {
             "status": "success",
@@ -442,37 +1440,158 @@ class RedistributionEngine:
             }
         }
 
-    def find_best_matches(self, item):
+    def run_engine_for_items(self, product_ids, top_k=None, as_of=None):
+        """
+        Runs the redistribution analysis for many products at once.
+
+        Items are looked up through the product index, their freshness is computed in one
+        vectorized pass and all items needing action are matched with `find_best_matches_batch`.
+
+        Args:
+            product_ids (iterable): The IDs of the products to process.
+            top_k (int, optional): Number of matches to return per item. None returns all.
+            as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
+
+        Returns:
+            dict: product_id -> result, each in the same format as `run_engine_for_item`
+        """
+        results = {}
+        positions = []
+        snapshot = self._inventory
+        with item_log_batch("Products not found in inventory"):
+            for product_id in product_ids:
+                position = snapshot.product_positions.get(product_id)
+                if position is None:
+                    log_item(
+                        'not_found', "Product ID %s not found in inventory", product_id,
+                        level=logging.ERROR, product_id=product_id
+                    )
+                    results[product_id] = {"status": "error", "message": "Product not found"}
+                elif product_id not in results:
+                    results[product_id] = None
+                    positions.append(position)
+
+        if not positions:
+            return results
+
+        items_df = snapshot.df.iloc[positions].reset_index(drop=True)
+        item_records = items_df.to_dict('records')
+        with self.instrumentation.stage('freshness', len(items_df)):
+            freshness, warning_levels, days_remaining = calculate_freshness_vectorized(
+                items_df['stock_date'],
+                items_df['expiry_date'],
+                items_df['category'],
+                as_of=as_of
+            )
+        needs_action = warning_levels != 'good'
+        batch_results = self.find_best_matches_batch(items_df[needs_action], top_k=top_k, as_of=as_of)
+
+        for i, item in enumerate(item_records):
+            analysis = {
+                "freshness_score": float(freshness[i]),
+                "warning_level": warning_levels[i],
+                "days_remaining": int(days_remaining[i])
+            }
+            if not needs_action[i]:
+                results[item['product_id']] = {
+                    "status": "no_action_needed",
+                    "item_details": item,
+                    "analysis": analysis
+                }
+                continue
+
+            matches, match_stats = batch_results[item['product_id']]
+            self._record_item_processed(item['category'], warning_levels[i], bool(matches))
+            results[item['product_id']] = {
+                "status": "success",
+                "item_details": item,
+                "matches": matches,
+                "stats": match_stats,
+                "monitoring": analysis
+            }
+
+        return results
+
+    def get_items(self, product_ids):
+        """
+        Looks up inventory rows by product ID through the product index.
+
+        Args:
+            product_ids (iterable): The IDs of the products to look up.
+
+        Returns:
+            tuple: (items_df, missing)
+                - items_df: DataFrame of the found items, in request order and without duplicates
+                - missing: list of the IDs not found in the inventory
+        """
+        snapshot = self._inventory
+        positions, missing, seen = [], [], set()
+        for product_id in product_ids:
+            if product_id in seen:
+                continue
+            seen.add(product_id)
+            position = snapshot.product_positions.get(product_id)
+            if position is None:
+                missing.append(product_id)
+            else:
+                positions.append(position)
+        return snapshot.df.iloc[positions].reset_index(drop=True), missing
+
+    def _record_item_processed(self, category, warning_level, matched):
+        """Updates the monitoring stats for an item that went through matching (lock-free)."""
+        self._stats_categories.setdefault(category, None)
+        self._stats.increment("total_items_processed")
+        self._stats.increment(("items_by_warning_level", warning_level))
+        if matched:
+            self._stats.increment("successful_matches")
+        self._stats.increment(("total", category))
+        self._stats.increment(("needs_redistribution", category))
+        if matched:
+            self._stats.increment(("successfully_matched", category))
+
+    def find_best_matches(self, item, as_of=None, top_k=None, as_records=False):
         """
         Finds the best NGO matches for a given item using a sophisticated matching algorithm.
 
         Args:
             item (pd.Series or dict): A pandas Series object or dictionary representing the item to redistribute.
+            as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
+            top_k (int, optional): Number of matches to return. None returns all; statistics
+                always cover every match.
+            as_records (bool): Return a `MatchSet` instead of a list of dicts.
 
         Returns:
             tuple: (matches, stats)
-                - matches: list of matched NGOs with scores and details
+                - matches: list of matched NGOs with scores and details (or a `MatchSet`)
                 - stats: dict containing matching statistics and recommendations
         """
-        logger.info(f"Finding matches for {item['product_name']} (ID: {item['product_id']})")
+        if item_logger.isEnabledFor(logging.DEBUG):
+            item_logger.debug("Finding matches for %s (ID: %s)", item['product_name'], item['product_id'])
+        ngo = self._ngo_index
+        instrumentation = self.instrumentation
+        no_matches = MatchSet.empty(ngo.records) if as_records else []
         
         # Get category-specific constraints
         constraints = CATEGORY_CONSTRAINTS.get(item['category'], DEFAULT_CONSTRAINTS)
         
         # Check if item meets minimum redistribution criteria
-        freshness_score, warning_level, days_remaining = calculate_freshness(
-            item['stock_date'], 
-            item['expiry_date'],
-            item['category']
-        )
+        with instrumentation.stage('freshness', 1):
+            freshness_score, warning_level, days_remaining = calculate_freshness(
+                item['stock_date'], 
+                item['expiry_date'],
+                item['category'],
+                as_of=as_of
+            )
         
         if (freshness_score < constraints['min_freshness'] or 
             days_remaining < constraints['min_days']):
-            logger.warning(
-                f"Item {item['product_id']} does not meet minimum criteria for redistribution: "
-                f"freshness={freshness_score:.1f}%, days_remaining={days_remaining}"
+            log_item(
+                'not_redistributable',
+                "Item %s does not meet minimum criteria for redistribution: freshness=%.1f%%, days_remaining=%s",
+                item['product_id'], freshness_score, days_remaining,
+                level=logging.WARNING, product_id=item['product_id']
             )
-            return [], {
+            return no_matches, {
                 "status": "not_redistributable",
                 "reason": "below_minimum_criteria",
                 "details": {
@@ -483,77 +1602,85 @@ class RedistributionEngine:
                 }
             }
         
-        # 1. Filter NGOs that accept the item's category
-        compatible_ngos = self.ngos_df[self.ngos_df['accepted_categories'].str.contains(item['category'])]
+        # Results depend on the item's location, category and urgency and on the NGO table,
+        # so a cached result is reused until the NGO version or the warning level changes
+        cache_key = None
+        if self.match_cache is not None:
+            cache_key = (
+                item['product_id'], item['category'], float(item['latitude']), float(item['longitude']),
+                _epoch_day(as_of), top_k
+            )
+            cached = self.match_cache.get(cache_key, ngo.version, warning_level)
+            instrumentation.count('match_cache_hits' if cached is not None else 'match_cache_misses')
+            if cached is not None:
+                matches, stats = cached
+                stats = dict(stats, item_freshness=round(freshness_score, 2), days_remaining=days_remaining)
+                log_item(
+                    'matches_found', "Found %d potential matches for %s (cached)",
+                    stats['total_matches'], item['product_name'],
+                    product_id=item['product_id'], matches=stats['total_matches'], cached=True
+                )
+                if as_records:
+                    return matches, stats
+                with instrumentation.stage('serialization', len(matches)):
+                    return matches.to_dicts(), stats
 
-        if compatible_ngos.empty:
-            logger.warning(f"No compatible NGOs found for category: {item['category']}")
-            return [], {"status": "no_matches", "reason": "category_incompatible"}
+        # 1. Look up NGOs that accept the item's category
+        with instrumentation.stage('category_filter', 1):
+            compatible = len(ngo.compatible_rows(item['category'])) > 0
+        if not compatible:
+            log_item(
+                'category_incompatible', "No compatible NGOs found for category: %s", item['category'],
+                level=logging.WARNING, product_id=item['product_id']
+            )
+            return no_matches, {"status": "no_matches", "reason": "category_incompatible"}
 
-        # 2. Calculate comprehensive matching scores
-        matches = []
-        total_capacity = 0
+        # 2. Query the spatial index for compatible NGOs within the category's max distance
         max_distance = constraints['max_distance_km']
-        
-        for _, ngo in compatible_ngos.iterrows():
-            # Calculate base metrics
-            dist = calculate_distance(
-                item['latitude'], item['longitude'],
-                ngo['latitude'], ngo['longitude']
+        with instrumentation.stage('distance', 1):
+            ngo_rows, distances = ngo.find_within_radius(
+                item['category'], item['latitude'], item['longitude'], max_distance
             )
-            
-            # Skip NGOs that are too far away
-            if dist > max_distance:
-                continue
-                
-            co2_saved = estimate_co2_savings(dist)
-            
-            # Calculate specialized scores
-            # Distance score now considers category-specific max distance
-            distance_score = 1 - (dist / max_distance)
-            
-            # Improved capacity scoring
-            # Consider both absolute capacity and available capacity percentage
-            min_required_capacity = 10  # Minimum kg capacity needed
-            capacity_score = min(1.0, (ngo['capacity_kg'] - min_required_capacity) / 200)
-            
-            # Calculate category focus score with diminishing returns
-            category_count = len(ngo['accepted_categories'].split('|'))
-            category_focus_score = 1 / (1 + 0.2 * category_count)  # Steeper penalty for too many categories
-            
-            # Additional scoring factors
+
+        # 3. Calculate comprehensive matching scores
+        with instrumentation.stage('scoring', len(ngo_rows)):
+            # Distance score considers the category-specific max distance
+            distance_scores = 1 - (distances / max_distance)
+            capacity_scores = ngo.capacity_scores[ngo_rows]
+            category_focus_scores = ngo.category_focus_scores[ngo_rows]
             urgency_multiplier = 1.2 if warning_level == 'critical' else 1.0
-            
-            # Weighted combination of scores with urgency multiplier
-            match_score = urgency_multiplier * (
-                MATCHING_WEIGHTS['distance'] * distance_score +
-                MATCHING_WEIGHTS['capacity'] * capacity_score +
-                MATCHING_WEIGHTS['category_focus'] * category_focus_score
+            match_scores = urgency_multiplier * (
+                MATCHING_WEIGHTS['distance'] * distance_scores +
+                MATCHING_WEIGHTS['capacity'] * capacity_scores +
+                MATCHING_WEIGHTS['category_focus'] * category_focus_scores
             )
 
-            ngo_match = ngo.to_dict()
-            ngo_match.update({
-                'distance_km': round(dist, 2),
-                'co2_savings_kg': round(co2_saved, 2),
-                'match_score': round(match_score, 4),
-                'distance_score': round(distance_score, 4),
-                'capacity_score': round(capacity_score, 4),
-                'category_focus_score': round(category_focus_score, 4)
-            })
-            matches.append(ngo_match)
-            total_capacity += ngo['capacity_kg']
-
-        # 3. Sort matches by score in descending order
-        matches.sort(key=lambda x: x['match_score'], reverse=True)
+        # 4. Select the best matches without sorting the whole list
+        with instrumentation.stage('sort', len(ngo_rows)):
+            best = _rank_matches(match_scores, top_k)
+        matches = MatchSet(
+            ngo_rows=ngo_rows[best],
+            distances_km=distances[best],
+            match_scores=match_scores[best],
+            distance_scores=distance_scores[best],
+            capacity_scores=capacity_scores[best],
+            category_focus_scores=category_focus_scores[best],
+            ngo_records=ngo.records
+        )
 
-        # 4. Calculate matching statistics
+        # 5. Calculate matching statistics over every match, summing the rounded
+        # values in ranked order like the match dicts
+        total_matches = len(ngo_rows)
+        ranked = best if top_k is None else _rank_matches(match_scores)
         stats = {
             "status": "matches_found",
-            "total_matches": len(matches),
-            "total_capacity_kg": total_capacity,
-            "avg_distance_km": sum(m['distance_km'] for m in matches) / len(matches) if matches else 0,
-            "total_potential_co2_savings": sum(m['co2_savings_kg'] for m in matches),
-            "recommendation": "proceed" if len(matches) > 0 else "expand_search"
+            "total_matches": total_matches,
+            "total_capacity_kg": float(ngo.capacity[ngo_rows].sum()),
+            "avg_distance_km": sum(_round_like_python(distances[ranked], 2).tolist()) / total_matches if total_matches else 0,
+            "total_potential_co2_savings": sum(
+                _round_like_python(estimate_co2_savings(distances[ranked]), 2).tolist()
+            ),
+            "recommendation": "proceed" if total_matches > 0 else "expand_search"
         }
 
         # Add time-sensitivity based recommendations
@@ -564,12 +1691,342 @@ class RedistributionEngine:
             "urgency": "high" if warning_level in ['critical', 'warning'] else "medium"
         })
 
-        logger.info(f"Found {len(matches)} potential matches for {item['product_name']}")
-        return matches, stats
+        if cache_key is not None:
+            self.match_cache.put(cache_key, (matches, dict(stats)), ngo.version, warning_level)
+
+        log_item(
+            'matches_found', "Found %d potential matches for %s", total_matches, item['product_name'],
+            product_id=item['product_id'], matches=total_matches
+        )
+        if as_records:
+            return matches, stats
+        with instrumentation.stage('serialization', len(matches)):
+            return matches.to_dicts(), stats
+
+    def _evaluate_items(self, items_df, as_of=None):
+        """
+        Computes freshness, category constraints and redistribution eligibility for many items.
+
+        Args:
+            items_df (pd.DataFrame): Items with the inventory columns and a RangeIndex.
+            as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
+
+        Returns:
+            dict: Per-item arrays keyed by name
+        """
+        categories = items_df['category'].to_numpy()
+        with self.instrumentation.stage('freshness', len(items_df)):
+            freshness, warning_levels, days_remaining = calculate_freshness_vectorized(
+                items_df['stock_date'],
+                items_df['expiry_date'],
+                items_df['category'],
+                as_of=as_of
+            )
+
+        # Category-specific constraints per item
+        constraints = [CATEGORY_CONSTRAINTS.get(category, DEFAULT_CONSTRAINTS) for category in categories]
+        max_distances = np.array([c['max_distance_km'] for c in constraints], dtype=np.float64)
+        min_freshness = np.array([c['min_freshness'] for c in constraints], dtype=np.float64)
+        min_days = np.array([c['min_days'] for c in constraints], dtype=np.int64)
+
+        return {
+            "categories": categories,
+            "freshness": freshness,
+            "warning_levels": warning_levels,
+            "days_remaining": days_remaining,
+            "constraints": constraints,
+            "max_distances": max_distances,
+            "eligible": (freshness >= min_freshness) & (days_remaining >= min_days),
+            "urgency_multipliers": np.where(warning_levels == 'critical', 1.2, 1.0),
+            "latitudes": items_df['latitude'].to_numpy(dtype=np.float64),
+            "longitudes": items_df['longitude'].to_numpy(dtype=np.float64)
+        }
+
+    def _score_item_block(self, ngo, category, evaluation, rows):
+        """
+        Scores every in-range NGO for a block of items of one category.
+
+        Args:
+            ngo (NGOIndex): The NGO snapshot to match against.
+            category (str): The category shared by the items.
+            evaluation (dict): Output of `_evaluate_items`.
+            rows (np.ndarray): Item positions of the block.
+
+        Returns:
+            tuple: (pair_items, pair_ngos, distances, distance_scores, match_scores), where
+                pair_items are positions into `rows` and pair_ngos are NGO row positions
+        """
+        max_distances = evaluation['max_distances'][rows]
+
+        # Query the spatial index for every item in the block
+        with self.instrumentation.stage('distance', len(rows)):
+            pair_items, pair_ngos, dist = ngo.query_within_radius(
+                category, evaluation['latitudes'][rows], evaluation['longitudes'][rows], max_distances
+            )
+
+        # Calculate matching scores for every item/NGO pair
+        with self.instrumentation.stage('scoring', len(pair_items)):
+            distance_scores = 1 - (dist / max_distances[pair_items])
+            match_scores = evaluation['urgency_multipliers'][rows][pair_items] * (
+                MATCHING_WEIGHTS['distance'] * distance_scores +
+                MATCHING_WEIGHTS['capacity'] * ngo.capacity_scores[pair_ngos] +
+                MATCHING_WEIGHTS['category_focus'] * ngo.category_focus_scores[pair_ngos]
+            )
+        return pair_items, pair_ngos, dist, distance_scores, match_scores
+
+    def _record_unmatched_items(self, ngo, evaluation, product_ids, as_records, results):
+        """
+        Stores the result of every item that cannot be matched: items below their category's
+        minimum criteria and eligible items whose category no NGO accepts.
+        """
+        def no_matches():
+            return MatchSet.empty(ngo.records) if as_records else []
+
+        freshness = evaluation['freshness']
+        days_remaining = evaluation['days_remaining']
+        eligible = evaluation['eligible']
+        for i in np.flatnonzero(~eligible):
+            constraints = evaluation['constraints'][i]
+            results[product_ids[i]] = (no_matches(), {
+                "status": "not_redistributable",
+                "reason": "below_minimum_criteria",
+                "details": {
+                    "freshness": float(freshness[i]),
+                    "days_remaining": int(days_remaining[i]),
+                    "min_freshness_required": constraints['min_freshness'],
+                    "min_days_required": constraints['min_days']
+                }
+            })
+
+        categories = evaluation['categories']
+        for category in pd.unique(categories[eligible]):
+            if len(ngo.compatible_rows(category)) == 0:
+                for i in np.flatnonzero(eligible & (categories == category)):
+                    results[product_ids[i]] = (no_matches(), {"status": "no_matches", "reason": "category_incompatible"})
+
+    def _collect_block_matches(
+        self, ngo, evaluation, rows, product_ids,
+        pair_items, pair_ngos, dist, distance_scores, match_scores, top_k, as_records, results
+    ):
+        """
+        Stores the ranked matches and statistics of a block of items.
+
+        Args:
+            ngo (NGOIndex): The NGO snapshot the pairs were scored against.
+            evaluation (dict): Output of `_evaluate_items`.
+            rows (np.ndarray): Item positions of the block.
+            product_ids (np.ndarray): Product ID of every evaluated item.
+            pair_items, pair_ngos, dist, distance_scores, match_scores (np.ndarray): Scored
+                item/NGO pairs in `_order_pairs` order, with pair_items as positions into `rows`.
+            top_k (int, optional): Number of matches to keep per item. None keeps all.
+            as_records (bool): Store a `MatchSet` per item instead of a list of dicts.
+            results (dict): product_id -> (matches, stats), updated in place.
+        """
+        block_results = _build_block_results(
+            pair_items, pair_ngos, dist, distance_scores, match_scores, len(rows),
+            ngo.capacity, ngo.capacity_scores, ngo.category_focus_scores,
+            evaluation['freshness'][rows], evaluation['warning_levels'][rows], evaluation['days_remaining'][rows],
+            top_k, as_records, ngo.records
+        )
+        for i, result in zip(rows, block_results):
+            results[product_ids[i]] = result
+
+    def find_best_matches_batch(
+        self, items_df, top_k=3, chunk_size=BATCH_MATCH_CHUNK_SIZE, as_of=None, as_records=False
+    ):
+        """
+        Finds the best NGO matches for many items at once.
+
+        Scores are identical to `find_best_matches`, but the spatial index is queried
+        for a whole block of items (one category at a time, `chunk_size` items per block)
+        and distance, capacity, category-focus and urgency scores are computed as arrays
+        over the resulting item/NGO pairs instead of looping over NGOs in Python.
+
+        Args:
+            items_df (pd.DataFrame): Items to redistribute, with the inventory columns.
+            top_k (int, optional): Number of matches to return per item. None returns all.
+            chunk_size (int): Maximum number of items per block.
+            as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
+            as_records (bool): Return a `MatchSet` per item instead of a list of dicts.
+
+        Returns:
+            dict: product_id -> (matches, stats), in the same format as `find_best_matches`
+        """
+        results = {}
+        if items_df.empty:
+            return results
+
+        ngo = self._ngo_index
+        items_df = items_df.reset_index(drop=True)
+        product_ids = items_df['product_id'].to_numpy()
+        evaluation = self._evaluate_items(items_df, as_of)
+        categories = evaluation['categories']
+        eligible = evaluation['eligible']
+
+        instrumentation = self.instrumentation
+        with instrumentation.stage('category_filter', len(items_df)):
+            self._record_unmatched_items(ngo, evaluation, product_ids, as_records, results)
+
+        for category in pd.unique(categories[eligible]):
+            # 1. Skip categories no NGO accepts (recorded as category_incompatible above)
+            if len(ngo.compatible_rows(category)) == 0:
+                continue
+
+            with instrumentation.stage('category_filter'):
+                item_rows = np.flatnonzero(eligible & (categories == category))
+            for start in range(0, len(item_rows), chunk_size):
+                rows = item_rows[start:start + chunk_size]
+
+                # 2. Score every in-range NGO for every item in the block
+                pair_items, pair_ngos, dist, distance_scores, match_scores = self._score_item_block(
+                    ngo, category, evaluation, rows
+                )
+
+                # 3. Rank pairs per item by rounded score, keeping NGO order for ties
+                with instrumentation.stage('sort', len(pair_items)):
+                    order = _order_pairs(pair_items, pair_ngos, match_scores)
+                    pairs = (pair_items[order], pair_ngos[order], dist[order], distance_scores[order], match_scores[order])
+
+                # 4. Collect each item's matches and statistics
+                with instrumentation.stage('serialization', len(rows)):
+                    self._collect_block_matches(
+                        ngo, evaluation, rows, product_ids, *pairs, top_k, as_records, results
+                    )
+
+        self._log_batch_outcomes("Batch matched", results, len(ngo.ngos_df))
+        return results
+
+    def _log_batch_outcomes(self, name, results, ngo_count):
+        """Logs one summary line per batch, plus every item when per-item tracing is on."""
+        if item_logger.isEnabledFor(logging.DEBUG):
+            for product_id, (_, stats) in results.items():
+                item_logger.debug(
+                    "%s %s: %s", name, product_id, stats['status'],
+                    extra={"fields": {"outcome": stats['status'], "product_id": product_id}}
+                )
+        if logger.isEnabledFor(logging.INFO):
+            outcomes = Counter(stats['status'] for _, stats in results.values())
+            logger.info(
+                "%s %d items against %d NGOs (%s)", name, len(results), ngo_count,
+                ', '.join(f"{outcome}={count}" for outcome, count in sorted(outcomes.items())),
+                extra={"fields": {"batch": name, "items": len(results), "outcomes": dict(outcomes)}}
+            )
+
+    def plan_global_assignment(
+        self,
+        warning_level='warning',
+        as_of=None,
+        time_budget_s=DEFAULT_TIME_BUDGET_S,
+        epsilon=DEFAULT_EPSILON,
+        chunk_size=BATCH_MATCH_CHUNK_SIZE
+    ):
+        """
+        Builds a single capacity-respecting redistribution plan for all candidates.
+
+        Unlike `find_best_matches`, which ranks NGOs for each item independently, this
+        assigns every candidate to at most one NGO so that no NGO receives more than its
+        `capacity_kg`, aiming for the highest total `match_score`. Feasible item/NGO pairs
+        come from the same category, distance and freshness rules, and the assignment is
+        solved with an auction over that sparse graph (see `backend.assignment`). The
+        total is optimal (within `epsilon` per item) only when all item loads are equal;
+        with different loads the better of the auction and a greedy plan is returned.
+        Item loads come from the `quantity_kg` column, or `DEFAULT_ITEM_WEIGHT_KG` if absent.
+
+        Args:
+            warning_level (str): Minimum warning level to consider ('critical', 'warning', or 'monitor')
+            as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
+            time_budget_s (float): Wall-clock budget for the auction before finishing greedily.
+            epsilon (float): Minimum auction bid increment.
+            chunk_size (int): Maximum number of items per spatial query block.
+
+        Returns:
+            tuple: (plan_df, summary)
+                - plan_df: DataFrame with one row per assigned item
+                - summary: Dict with totals and solver details
+
+        Raises:
+            ValueError: If a candidate has a zero or negative `quantity_kg`.
+        """
+        ngo = self._ngo_index
+        candidates, _ = self.get_redistribution_candidates(warning_level, as_of=as_of)
+        if candidates.empty or ngo.ngos_df.empty:
+            return pd.DataFrame(), {"status": "no_data"}
+
+        candidates = candidates.reset_index(drop=True)
+        evaluation = self._evaluate_items(candidates, as_of)
+        categories = evaluation['categories']
+        eligible = evaluation['eligible']
+
+        # 1. Build the sparse item x NGO feasibility graph
+        edge_items, edge_ngos, edge_distances, edge_scores = [], [], [], []
+        for category in pd.unique(categories[eligible]):
+            item_rows = np.flatnonzero(eligible & (categories == category))
+            for start in range(0, len(item_rows), chunk_size):
+                rows = item_rows[start:start + chunk_size]
+                pair_items, pair_ngos, dist, _, match_scores = self._score_item_block(ngo, category, evaluation, rows)
+                edge_items.append(rows[pair_items])
+                edge_ngos.append(pair_ngos)
+                edge_distances.append(dist)
+                edge_scores.append(match_scores)
+
+        if edge_items:
+            edge_items = np.concatenate(edge_items)
+            edge_ngos = np.concatenate(edge_ngos)
+            edge_distances = np.concatenate(edge_distances)
+            edge_scores = np.concatenate(edge_scores)
+        else:
+            edge_items = edge_ngos = np.empty(0, dtype=np.intp)
+            edge_distances = edge_scores = np.empty(0)
+
+        # 2. Solve the capacity-constrained assignment
+        if ITEM_WEIGHT_COLUMN in candidates:
+            item_weights = candidates[ITEM_WEIGHT_COLUMN].fillna(DEFAULT_ITEM_WEIGHT_KG).to_numpy(dtype=np.float64)
+        else:
+            item_weights = np.full(len(candidates), DEFAULT_ITEM_WEIGHT_KG)
+        assigned_edge, solver_info = solve_capacitated_assignment(
+            edge_items, edge_ngos, edge_scores, item_weights, ngo.capacity,
+            epsilon=epsilon, time_budget_s=time_budget_s
+        )
+
+        # 3. Assemble the plan
+        assigned_items = np.flatnonzero(assigned_edge >= 0)
+        chosen = assigned_edge[assigned_items]
+        distances = edge_distances[chosen]
+        plan_df = candidates.loc[assigned_items, ['product_id', 'product_name', 'category', 'warning_level', 'freshness']]
+        plan_df = plan_df.reset_index(drop=True)
+        plan_df['ngo_id'] = ngo.ngos_df['ngo_id'].to_numpy()[edge_ngos[chosen]]
+        plan_df['ngo_name'] = ngo.ngos_df['ngo_name'].to_numpy()[edge_ngos[chosen]]
+        plan_df['distance_km'] = np.round(distances, 2)
+        plan_df['co2_savings_kg'] = np.round(estimate_co2_savings(distances), 2)
+        plan_df['match_score'] = np.round(edge_scores[chosen], 4)
+        plan_df['assigned_kg'] = item_weights[assigned_items]
+
+        load_by_ngo = np.bincount(
+            edge_ngos[chosen], weights=item_weights[assigned_items], minlength=len(ngo.ngos_df)
+        )
+        summary = {
+            "status": "planned",
+            "total_candidates": len(candidates),
+            "redistributable_candidates": int(eligible.sum()),
+            "assigned_items": len(assigned_items),
+            "unassigned_items": int(eligible.sum()) - len(assigned_items),
+            "total_match_score": float(edge_scores[chosen].sum()),
+            "total_co2_savings": float(plan_df['co2_savings_kg'].sum()),
+            "assigned_kg": float(item_weights[assigned_items].sum()),
+            "ngos_used": int((load_by_ngo > 0).sum()),
+            "solver": solver_info
+        }
+
+        logger.info(
+            "Global assignment placed %d of %d redistributable items across %d NGOs",
+            summary['assigned_items'], summary['redistributable_candidates'], summary['ngos_used']
+        )
+        return plan_df, summary
 
 # --- EXAMPLE USAGE ---
 
 if __name__ == '__main__':
+    configure_logging()
     engine = RedistributionEngine()
 
     # Example 1: Get all items that are candidates for redistribution
@@ -0,0 +1,90 @@
+"""
+Zero Waste AI - NGO Capacity Ledger
+"""
+
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Slack for float comparisons of reserved and available kilograms
+CAPACITY_EPSILON_KG = 1e-9
+
+class CapacityLedger:
+    """
+    Remaining NGO capacity and the item reservations made against it.
+
+    NGOs are addressed by row position in the NGO snapshot the ledger was built
+    from. Every reservation holds one item's load at one NGO, so releasing or
+    moving an item gives its capacity back exactly.
+    """
+
+    def __init__(self, ngo_ids: Sequence[Hashable], capacities: Sequence[float]):
+        self.ngo_ids = np.asarray(ngo_ids, dtype=object)
+        self.capacity = np.asarray(capacities, dtype=np.float64).copy()
+        self.reserved = np.zeros(len(self.capacity), dtype=np.float64)
+        self._rows = {ngo_id: row for row, ngo_id in enumerate(self.ngo_ids)}
+        self._reservations: Dict[Hashable, Tuple[int, float]] = {}
+        self._items_by_row: Dict[int, Dict[Hashable, float]] = {}
+
+    @property
+    def remaining(self) -> np.ndarray:
+        """Unreserved capacity per NGO row (negative when overbooked)."""
+        return self.capacity - self.reserved
+
+    def row_of(self, ngo_id: Hashable) -> Optional[int]:
+        return self._rows.get(ngo_id)
+
+    def can_reserve(self, row: int, kg: float) -> bool:
+        return self.capacity[row] - self.reserved[row] + CAPACITY_EPSILON_KG >= kg
+
+    def reserve(self, item_id: Hashable, row: int, kg: float) -> None:
+        """Reserves `kg` at NGO `row` for an item, replacing any reservation it held."""
+        self.release(item_id)
+        self.reserved[row] += kg
+        self._reservations[item_id] = (row, kg)
+        self._items_by_row.setdefault(row, {})[item_id] = kg
+
+    def release(self, item_id: Hashable) -> Optional[int]:
+        """Releases an item's reservation; returns the NGO row it was held at, if any."""
+        reservation = self._reservations.pop(item_id, None)
+        if reservation is None:
+            return None
+        row, kg = reservation
+        self.reserved[row] -= kg
+        items = self._items_by_row[row]
+        del items[item_id]
+        if not items:
+            del self._items_by_row[row]
+            self.reserved[row] = 0.0  # Drop accumulated float error
+        return row
+
+    def reservation(self, item_id: Hashable) -> Optional[Tuple[int, float]]:
+        """Returns the (NGO row, kg) reserved for an item, or None."""
+        return self._reservations.get(item_id)
+
+    def items_at(self, row: int) -> List[Hashable]:
+        """Items holding a reservation at NGO `row`, in reservation order."""
+        return list(self._items_by_row.get(row, ()))
+
+    def set_capacity(self, row: int, kg: float) -> None:
+        """Changes an NGO's capacity; existing reservations are kept even if they no longer fit."""
+        self.capacity[row] = kg
+
+    def overbooked_rows(self) -> np.ndarray:
+        """NGO rows whose reservations exceed their capacity."""
+        return np.flatnonzero(self.reserved > self.capacity + CAPACITY_EPSILON_KG)
+
+    def __len__(self) -> int:
+        return len(self._reservations)
+
+    def summary(self) -> Dict[str, Any]:
+        """Returns reserved totals and utilization over all NGOs."""
+        total_capacity = float(self.capacity.sum())
+        total_reserved = float(self.reserved.sum())
+        return {
+            'reservations': len(self._reservations),
+            'ngos_used': len(self._items_by_row),
+            'capacity_kg': round(total_capacity, 2),
+            'reserved_kg': round(total_reserved, 2),
+            'utilization': round(total_reserved / total_capacity, 4) if total_capacity else 0.0
+        }
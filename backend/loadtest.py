@@ -0,0 +1,185 @@
+"""
+Zero Waste AI - Matching Service Load Test
+
+Drives the matching service with concurrent keep-alive clients and reports
+p50/p99 latency and throughput. Without `--url` an in-process service is
+started on a free port:
+
+    python -m backend.loadtest --requests 5000 --concurrency 64
+    python -m backend.loadtest --url http://127.0.0.1:8080 --endpoint candidates
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from backend.engine import RedistributionEngine
+from backend.logs import configure_logging
+from backend.service import BATCH_WINDOW_MS, MAX_BATCH_SIZE, MatchingService
+
+ENDPOINTS = ('match', 'batch', 'candidates')
+
+class _Client:
+    """A minimal HTTP/1.1 keep-alive JSON client for one connection."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Tuple[int, bytes]:
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode() if payload is not None else b''
+        self._writer.write(
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+        )
+        await self._writer.drain()
+
+        status_line = await self._reader.readline()
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        data = await self._reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return int(status_line.split()[1]), data
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self._reader = None
+
+def _make_request(endpoint: str, product_ids: List[str], rng: random.Random, args) -> Tuple[str, str, Any]:
+    """Returns (method, path, payload) for one load-test request."""
+    as_of = {"as_of": args.as_of} if args.as_of else {}
+    if endpoint == 'match':
+        return 'POST', '/match', {"product_id": rng.choice(product_ids), "top_k": args.top_k, **as_of}
+    if endpoint == 'batch':
+        return 'POST', '/match/batch', {
+            "product_ids": rng.sample(product_ids, min(args.batch_size, len(product_ids))),
+            "top_k": args.top_k,
+            **as_of
+        }
+    query = f"/candidates?limit={args.top_k}" + (f"&as_of={args.as_of}" if args.as_of else '')
+    return 'GET', query, None
+
+async def run_load(host: str, port: int, product_ids: List[str], args) -> Dict[str, Any]:
+    """
+    Sends `args.requests` requests from `args.concurrency` clients and collects latencies.
+
+    Returns:
+        dict: Request counts, throughput and latency percentiles in milliseconds
+    """
+    rng = random.Random(args.seed)
+    requests = [_make_request(args.endpoint, product_ids, rng, args) for _ in range(args.requests)]
+    latencies = np.zeros(len(requests))
+    statuses: Dict[int, int] = {}
+    next_request = iter(range(len(requests)))
+
+    async def worker() -> None:
+        client = _Client(host, port)
+        try:
+            for i in next_request:
+                method, path, payload = requests[i]
+                started = time.perf_counter()
+                status, _ = await client.request(method, path, payload)
+                latencies[i] = time.perf_counter() - started
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            await client.close()
+
+    # Warm up freshness and caches outside the measured window
+    warmup = _Client(host, port)
+    for method, path, payload in requests[:min(10, len(requests))]:
+        await warmup.request(method, path, payload)
+    await warmup.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = latencies * 1000
+    return {
+        "endpoint": args.endpoint,
+        "requests": len(requests),
+        "concurrency": args.concurrency,
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(requests) / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(float(latencies_ms.mean()), 3),
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "max": round(float(latencies_ms.max()), 3)
+        }
+    }
+
+async def _main(args) -> Dict[str, Any]:
+    service = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+        client = _Client(host, port)
+        status, data = await client.request('GET', '/candidates?warning_level=monitor')
+        await client.close()
+        if status != 200:
+            raise SystemExit(f"Could not list candidates from {args.url}: HTTP {status}")
+        product_ids = [record['product_id'] for record in json.loads(data)['candidates']]
+    else:
+        engine = RedistributionEngine(args.inventory, args.ngos)
+        service = MatchingService(
+            engine, port=0, window_ms=args.window_ms, max_batch_size=args.max_batch_size
+        )
+        await service.start()
+        host, port = service.host, service.port
+        product_ids = engine.inventory_df['product_id'].tolist()
+
+    if not product_ids:
+        raise SystemExit("No products to request matches for")
+    try:
+        report = await run_load(host, port, product_ids, args)
+        if service is not None:
+            report["service"] = (await service._stats({}, b''))["service"]
+        return report
+    finally:
+        if service is not None:
+            await service.close()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load test the Zero Waste AI matching service.")
+    parser.add_argument('--url', help="Service to test; starts an in-process service if omitted")
+    parser.add_argument('--endpoint', choices=ENDPOINTS, default='match')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=50, help="Product IDs per /match/batch request")
+    parser.add_argument('--as-of', help="As-of date (YYYY-MM-DD) sent with every request")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--inventory', help="Inventory CSV or .zwcol table for the in-process service")
+    parser.add_argument('--ngos', help="NGO CSV or .zwcol table for the in-process service")
+    parser.add_argument('--window-ms', type=float, default=BATCH_WINDOW_MS)
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    configure_logging(logging.WARNING)
+    print(json.dumps(asyncio.run(_main(args)), indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Zero Waste AI - Logging
+
+Cheap logging for the matching hot paths:
+
+- Per-item messages go to the `backend.engine.items` logger. They are traced
+  in full only when that logger is at DEBUG (`configure_logging(trace_items=True)`),
+  otherwise one item in `ITEM_LOG_SAMPLE_EVERY` is logged at INFO.
+- Inside `item_log_batch`, per-item outcomes are only counted and one summary
+  line is logged per batch.
+- `configure_logging(json_path=...)` writes structured JSON lines from a
+  background thread through a `QueueHandler`, so the calling thread only
+  enqueues records.
+
+Messages use %-style arguments, so nothing is formatted for dropped records.
+"""
+
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+ITEM_LOGGER_NAME = 'backend.engine.items'
+
+# One in this many per-item messages is logged at INFO when tracing is off (0 disables sampling)
+ITEM_LOG_SAMPLE_EVERY = 1000
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+item_logger = logging.getLogger(ITEM_LOGGER_NAME)
+
+class JSONLineFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line.
+
+    Structured fields passed as `extra={'fields': {...}}` become top-level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class ItemLogSampler:
+    """Decides which per-item messages are logged when full tracing is off."""
+
+    def __init__(self, every: int = ITEM_LOG_SAMPLE_EVERY):
+        self.every = every
+        self._counter = itertools.count()  # next() is atomic under the GIL
+
+    def sample(self) -> bool:
+        return self.every > 0 and next(self._counter) % self.every == 0
+
+item_sampler = ItemLogSampler()
+
+class ItemLogBatch:
+    """Per-item outcome counts of one batch, logged as a single summary line (if any were counted)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.outcomes: Counter = Counter()
+
+    def add(self, outcome: str) -> None:
+        self.outcomes[outcome] += 1
+
+    def log_summary(self, logger: logging.Logger = item_logger) -> None:
+        if self.outcomes and logger.isEnabledFor(logging.INFO):
+            total = sum(self.outcomes.values())
+            logger.info(
+                "%s: %d items (%s)", self.name, total,
+                ', '.join(f"{outcome}={count}" for outcome, count in sorted(self.outcomes.items())),
+                extra={"fields": {"batch": self.name, "items": total, "outcomes": dict(self.outcomes)}}
+            )
+
+_active_batches = threading.local()
+
+@contextmanager
+def item_log_batch(name: str) -> Iterator[ItemLogBatch]:
+    """
+    Aggregates the per-item messages logged by this thread into one summary line.
+
+    Full per-item tracing (DEBUG on the item logger) still logs every item.
+    Batches nest; each item counts towards the innermost one.
+    """
+    batch = ItemLogBatch(name)
+    previous = getattr(_active_batches, 'batch', None)
+    _active_batches.batch = batch
+    try:
+        yield batch
+    finally:
+        _active_batches.batch = previous
+        batch.log_summary()
+
+def log_item(outcome: str, msg: str, *args, level: int = logging.INFO, **fields) -> None:
+    """
+    Logs a per-item message: traced at DEBUG, counted in the active batch, or sampled.
+
+    Args:
+        outcome (str): Short outcome name counted in batch summaries (e.g. 'matches_found').
+        msg (str): %-style message, only formatted if the record is emitted.
+        level (int): Level used when a sampled message is emitted.
+        **fields: Structured fields attached to the record.
+    """
+    if item_logger.isEnabledFor(logging.DEBUG):
+        trace_level = logging.DEBUG if level <= logging.INFO else level
+        item_logger.log(trace_level, msg, *args, extra={"fields": {"outcome": outcome, **fields}})
+        return
+    batch = getattr(_active_batches, 'batch', None)
+    if batch is not None:
+        batch.add(outcome)
+    elif item_sampler.sample() and item_logger.isEnabledFor(level):
+        item_logger.log(level, msg, *args, extra={"fields": {"outcome": outcome, "sampled": True, **fields}})
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records unformatted, so message formatting happens on the listener thread.
+
+    Only use it with immutable log arguments (as the engine's %-style calls are).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+# Handlers and listener installed by `configure_logging`
+_installed: Dict[str, Any] = {"handlers": [], "listener": None}
+
+def configure_logging(
+    level: int = logging.INFO,
+    json_path: Optional[str] = None,
+    trace_items: bool = False,
+    sample_every: Optional[int] = None
+) -> None:
+    """
+    Configures the root logger for the engine, service and dashboard entry points.
+
+    Args:
+        level (int): Root log level.
+        json_path (str, optional): Write structured JSON lines to this file from a
+            background thread instead of plain text to stderr.
+        trace_items (bool): Log every per-item message (sets the item logger to DEBUG).
+        sample_every (int, optional): Override `ITEM_LOG_SAMPLE_EVERY`.
+    """
+    root = logging.getLogger()
+    for handler in _installed["handlers"]:
+        root.removeHandler(handler)
+    if _installed["listener"] is not None:
+        _stop_listener()
+        _installed["listener"] = None
+
+    if json_path:
+        log_queue = queue.SimpleQueue()
+        file_handler = logging.FileHandler(json_path)
+        file_handler.setFormatter(JSONLineFormatter())
+        listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+        listener.start()
+        _installed["listener"] = listener
+        handler: logging.Handler = DeferredQueueHandler(log_queue)
+    else:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+
+    root.addHandler(handler)
+    root.setLevel(level)
+    _installed["handlers"] = [handler]
+
+    item_logger.setLevel(logging.DEBUG if trace_items else logging.NOTSET)
+    if sample_every is not None:
+        item_sampler.every = sample_every
+
+def _stop_listener() -> None:
+    """Flushes queued records and closes the JSON file handler."""
+    listener = _installed["listener"]
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
+atexit.register(_stop_listener)
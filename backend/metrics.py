@@ -0,0 +1,183 @@
+"""
+Zero Waste AI - Metrics
+"""
+
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+class ShardedCounter:
+    """
+    Counters that many threads can increment without a shared lock.
+
+    Each thread increments its own shard, a plain dict written by that thread only,
+    and `totals` merges the shards on read, so concurrent writers never contend.
+    Shards of threads that have finished are folded into a base total whenever the
+    shard list is locked, so short-lived threads (server handlers, dashboard reruns)
+    do not accumulate.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, Dict[Hashable, float]]] = []
+        self._base: Dict[Hashable, float] = {}  # Counts of finished threads
+        self._shards_lock = threading.Lock()  # Only taken when a thread creates its shard, and by readers
+
+    def _prune(self) -> None:
+        """Folds the shards of finished threads into the base total. Call with the lock held."""
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+                continue
+            # A finished thread can no longer write to its shard
+            for key, value in shard.items():
+                self._base[key] = self._base.get(key, 0) + value
+        self._shards = live
+
+    def _shard(self) -> Dict[Hashable, float]:
+        """Returns the calling thread's shard, creating it on first use."""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._prune()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+
+    def increment(self, key: Hashable, amount: float = 1) -> None:
+        """Adds `amount` to the counter `key`."""
+        shard = self._shard()
+        shard[key] = shard.get(key, 0) + amount
+
+    def totals(self) -> Dict[Hashable, float]:
+        """Returns the sum of every counter over all threads."""
+        with self._shards_lock:
+            self._prune()
+            totals = dict(self._base)
+            shards = [shard for _, shard in self._shards]
+        for shard in shards:
+            # dict() copies in one step under the GIL, so the owner thread can keep writing
+            for key, value in dict(shard).items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def reset(self) -> None:
+        """Clears every counter of every thread."""
+        with self._shards_lock:
+            self._base.clear()
+            for _, shard in self._shards:
+                shard.clear()
+
+# Stages of the engine hot paths, in pipeline order
+ENGINE_STAGES = (
+    'load', 'freshness', 'candidate_filter', 'category_filter', 'distance', 'scoring', 'sort', 'serialization'
+)
+
+# Shared by every disabled instrument, so a disabled stage costs one call and a no-op `with`
+_NULL_STAGE = nullcontext()
+
+class _StageTimer:
+    """Context manager adding its wall time (and item count) to a stage."""
+
+    __slots__ = ('_counters', '_stage', '_items', '_started')
+
+    def __init__(self, counters: ShardedCounter, stage: str, items: Optional[int]):
+        self._counters = counters
+        self._stage = stage
+        self._items = items
+
+    def __enter__(self) -> '_StageTimer':
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        counters = self._counters
+        counters.increment(('seconds', self._stage), time.perf_counter() - self._started)
+        counters.increment(('calls', self._stage))
+        if self._items is not None:
+            counters.increment(('items', self._stage), self._items)
+
+class Instrumentation:
+    """
+    Per-stage timings and event counters for the engine hot paths.
+
+    `stage` times a block of work and `count` bumps a named counter such as a cache
+    hit or miss. Both write to a `ShardedCounter`, so instrumented threads never
+    contend. When disabled, `stage` returns a shared no-op context and `count`
+    returns immediately, so instrumentation can stay in the hot paths.
+    """
+
+    def __init__(self, enabled: bool = False, prefix: str = 'zerowaste'):
+        self.enabled = enabled
+        self.prefix = prefix
+        self._counters = ShardedCounter()
+
+    def stage(self, name: str, items: Optional[int] = None):
+        """Returns a context manager timing one run of stage `name` over `items` rows."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _StageTimer(self._counters, name, items)
+
+    def count(self, name: str, amount: float = 1) -> None:
+        """Adds `amount` to the event counter `name`."""
+        if self.enabled:
+            self._counters.increment(('events', name), amount)
+
+    def reset(self) -> None:
+        self._counters.reset()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the recorded metrics.
+
+        Returns:
+            dict: 'enabled', 'stages' (stage -> calls, items, total_s, mean_ms) and
+                'counters' (event -> count)
+        """
+        totals = self._counters.totals()
+        recorded = {key[1] for key in totals if key[0] == 'calls'}
+        stages = {}
+        for stage in [name for name in ENGINE_STAGES if name in recorded] + sorted(recorded - set(ENGINE_STAGES)):
+            calls = int(totals.get(('calls', stage), 0))
+            seconds = totals.get(('seconds', stage), 0.0)
+            stages[stage] = {
+                "calls": calls,
+                "items": int(totals.get(('items', stage), 0)),
+                "total_s": seconds,
+                "mean_ms": seconds * 1000 / calls if calls else 0.0
+            }
+        counters = {key[1]: int(value) for key, value in sorted(totals.items(), key=str) if key[0] == 'events'}
+        return {"enabled": self.enabled, "stages": stages, "counters": counters}
+
+    def to_prometheus(self) -> str:
+        """Formats the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        prefix = self.prefix
+        lines = []
+        for metric, key, help_text in (
+            ('stage_seconds_total', 'total_s', 'Wall time spent in each engine stage.'),
+            ('stage_calls_total', 'calls', 'Number of times each engine stage ran.'),
+            ('stage_items_total', 'items', 'Rows processed by each engine stage.')
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for stage, values in snapshot['stages'].items():
+                lines.append(f'{prefix}_{metric}{{stage="{stage}"}} {values[key]}')
+        for name, value in snapshot['counters'].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """
+        Writes the metrics to a Prometheus text file (e.g. for the node exporter's
+        textfile collector), replacing it atomically.
+        """
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
@@ -2,131 +2,528 @@
 Zero Waste AI - Core Redistribution Logic
 """
 
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Any
+import logging
+import numpy as np
 import pandas as pd
+from dataclasses import dataclass
 from datetime import datetime
-from backend.utils import calculate_distance, estimate_co2_savings
+from backend.engine import DEFAULT_ITEM_WEIGHT_KG, ITEM_WEIGHT_COLUMN
+from backend.ledger import CAPACITY_EPSILON_KG, CapacityLedger
+from backend.registry import NGOIndex, NGORegistry, get_ngo_registry
+from backend.storage import DATE_COLUMNS, iter_table_chunks, parse_date_values, read_table
+from backend.utils import estimate_co2_savings, haversine_distance_matrix_radians
+
+# Default number of inventory rows read per chunk in streaming mode
+STREAM_CHUNK_SIZE = 100_000
+
+# Priority weight per category; other categories get DEFAULT_CATEGORY_WEIGHT
+CATEGORY_WEIGHTS = {
+    'Dairy': 1.0,
+    'Meat': 1.0,
+    'Seafood': 1.0,
+    'Bakery': 0.8,
+    'Fruit': 0.8,
+    'Vegetable': 0.8,
+    'FrozenDessert': 0.6,
+    'Pantry': 0.4
+}
+DEFAULT_CATEGORY_WEIGHT = 0.5
+
+# Weights of the expiry, category and storage-condition factors in the priority score
+PRIORITY_WEIGHTS = {
+    'expiry': 0.5,
+    'category': 0.3,
+    'condition': 0.2
+}
+
+# Items expiring within this many days get a non-zero expiry priority
+EXPIRY_HORIZON_DAYS = 30
+
+# Storage conditions above these limits raise an item's priority
+MAX_SAFE_TEMPERATURE_C = 25
+MAX_SAFE_HUMIDITY_PERCENT = 80
+POOR_CONDITION_PRIORITY = 0.5
+
+# Minimum priority score for an item to be planned
+HIGH_PRIORITY_THRESHOLD = 0.7
+
+NANOSECONDS_PER_DAY = 86_400 * 10**9
+
+# Default search radius of NGO matching, in km
+MAX_MATCH_DISTANCE_KM = 100.0
+
+# Weights of the distance, capacity and CO2 factors in an NGO match score
+MATCH_SCORE_WEIGHTS = {
+    'distance': 0.4,
+    'capacity': 0.3,
+    'co2': 0.3
+}
+
+# NGO capacity (kg) at which the capacity score saturates, and the CO2 savings (kg) normalizer
+FULL_CAPACITY_KG = 100
+CO2_NORMALIZER_KG = 10
+
+# Item-NGO pairs scored per block in batch matching (bounds the distance matrix size)
+MATCH_BLOCK_PAIRS = 4_000_000
+
+# Best NGOs kept per planned item; when all of them are full the item falls back to a full scan
+MATCH_SHORTLIST_SIZE = 8
+
+logger = logging.getLogger(__name__)
+
+# (NGO rows, distances, CO2 savings, match scores) of an item's best NGOs, best first
+Shortlist = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
+def category_priorities(categories: pd.Series) -> np.ndarray:
+    """Category factor of the priority score for every item."""
+    return (
+        categories.astype(object).map(CATEGORY_WEIGHTS)
+        .fillna(DEFAULT_CATEGORY_WEIGHT)
+        .to_numpy(dtype=np.float64)
+    )
+
+def condition_priorities(temperature_c: pd.Series, humidity_percent: pd.Series) -> np.ndarray:
+    """Storage-condition factor of the priority score for every item."""
+    poor_condition = (
+        (temperature_c.to_numpy(dtype=np.float64) > MAX_SAFE_TEMPERATURE_C) |
+        (humidity_percent.to_numpy(dtype=np.float64) > MAX_SAFE_HUMIDITY_PERCENT)
+    )
+    return np.where(poor_condition, POOR_CONDITION_PRIORITY, 0.0)
+
+def combine_priorities(
+    days_until_expiry: np.ndarray,
+    category_priority: np.ndarray,
+    condition_priority: np.ndarray
+) -> np.ndarray:
+    """
+    Priority scores from whole days until expiry and the category and condition
+    factors, evaluated in the same order as `Redistributor.calculate_item_priority`.
+    """
+    # fmax drops NaN like the scalar `max(0, nan)`
+    expiry_priority = np.fmax(0, 1 - (days_until_expiry / EXPIRY_HORIZON_DAYS))
+    priority_score = (
+        PRIORITY_WEIGHTS['expiry'] * expiry_priority +
+        PRIORITY_WEIGHTS['category'] * category_priority +
+        PRIORITY_WEIGHTS['condition'] * condition_priority
+    )
+    return np.minimum(1.0, priority_score)
+
+@dataclass
+class PlannedItem:
+    """A high-priority item of the current plan, with its NGO shortlist and reserved match."""
+    item_id: Hashable
+    product_name: str
+    category: str
+    priority_score: float
+    latitude: float
+    longitude: float
+    quantity_kg: float
+    shortlist: Shortlist
+    best_match: Optional[Dict[str, Any]] = None
+
+@dataclass
+class PlanState:
+    """The NGO snapshot, capacity ledger and planned items behind the last plan."""
+    ngo: NGOIndex
+    capacity_scores: np.ndarray
+    ledger: CapacityLedger
+    items: Dict[Hashable, PlannedItem]
 
 class Redistributor:
-    def __init__(self, inventory_file: str, ngo_file: str):
-        """Initialize the redistributor with data sources."""
-        self.inventory_df = pd.read_csv(inventory_file)
-        self.ngos_df = pd.read_csv(ngo_file)
+    def __init__(
+        self,
+        inventory_file: str,
+        ngo_file: str,
+        chunksize: Optional[int] = None,
+        ngo_registry: Optional[NGORegistry] = None
+    ):
+        """
+        Initialize the redistributor with data sources.
+
+        With `chunksize` set, the inventory is not loaded up front and
+        `iter_redistribution_plan` streams it `chunksize` rows at a time.
+        NGOs come from the process-wide `NGORegistry` of `ngo_file` (or
+        `ngo_registry`), shared with the engine and the dashboard.
+        """
+        self.inventory_file = inventory_file
+        self.chunksize = chunksize
+        if chunksize is None:
+            self.inventory_df = read_table(inventory_file)
+        else:
+            self.inventory_df = pd.DataFrame()
+        self.ngo_registry = ngo_registry or get_ngo_registry(ngo_file)
         self.current_date = datetime.now()
+
+        # capacity_kg overrides per ngo_id from `replan`, applied on top of every registry snapshot
+        self.ngo_capacity_overrides: Dict[Hashable, float] = {}
+
+        # Capacities and capacity scores of the NGO snapshot they were computed for
+        self._ngo_capacity: Tuple[Optional[NGOIndex], np.ndarray, np.ndarray] = (None, np.empty(0), np.empty(0))
+
+        # State of the last `get_redistribution_plan`, updated in place by `replan`
+        self._plan_state: Optional[PlanState] = None
+
+    @property
+    def ngos_df(self) -> pd.DataFrame:
+        """The current NGO table of the registry."""
+        return self.ngo_registry.ngos_df
         
     def calculate_item_priority(self, item: Dict[str, Any]) -> float:
         """Calculate priority score for an item based on multiple factors."""
-        # Base priority from expiry date
-        days_until_expiry = (
-            pd.to_datetime(item['expiry_date']) - self.current_date
-        ).days
+        # Base priority from expiry date (parsed at load; ISO strings are still accepted)
+        expiry_date = item['expiry_date']
+        if isinstance(expiry_date, str):
+            expiry_date = pd.to_datetime(expiry_date)
+        days_until_expiry = (expiry_date - self.current_date).days
         
-        expiry_priority = max(0, 1 - (days_until_expiry / 30))
+        expiry_priority = max(0, 1 - (days_until_expiry / EXPIRY_HORIZON_DAYS))
         
         # Priority based on category
-        category_weights = {
-            'Dairy': 1.0,
-            'Meat': 1.0,
-            'Seafood': 1.0,
-            'Bakery': 0.8,
-            'Fruit': 0.8,
-            'Vegetable': 0.8,
-            'FrozenDessert': 0.6,
-            'Pantry': 0.4
-        }
-        category_priority = category_weights.get(item['category'], 0.5)
+        category_priority = CATEGORY_WEIGHTS.get(item['category'], DEFAULT_CATEGORY_WEIGHT)
         
         # Environmental condition factor
         condition_priority = 0.0
-        if item['temperature_c'] > 25 or item['humidity_percent'] > 80:
-            condition_priority = 0.5
+        if (item['temperature_c'] > MAX_SAFE_TEMPERATURE_C or
+                item['humidity_percent'] > MAX_SAFE_HUMIDITY_PERCENT):
+            condition_priority = POOR_CONDITION_PRIORITY
         
         # Combine factors (weighted sum)
         priority_score = (
-            0.5 * expiry_priority +
-            0.3 * category_priority +
-            0.2 * condition_priority
+            PRIORITY_WEIGHTS['expiry'] * expiry_priority +
+            PRIORITY_WEIGHTS['category'] * category_priority +
+            PRIORITY_WEIGHTS['condition'] * condition_priority
         )
         
         return min(1.0, priority_score)
-    
+
+    def calculate_priorities(self, inventory_df: pd.DataFrame) -> np.ndarray:
+        """
+        Vectorized `calculate_item_priority` over a whole inventory.
+
+        Uses the same factors, weights and evaluation order as the scalar version,
+        so every score is identical to calling it row by row.
+        """
+        # Whole days until expiry, floored like `Timedelta.days`
+        expiry_ns = parse_date_values(inventory_df['expiry_date']).to_numpy(dtype='datetime64[ns]')
+        delta_ns = expiry_ns - np.datetime64(self.current_date, 'ns')
+        days_until_expiry = np.floor_divide(
+            delta_ns.astype(np.int64), NANOSECONDS_PER_DAY
+        ).astype(np.float64)
+        days_until_expiry[np.isnat(delta_ns)] = np.nan
+
+        return combine_priorities(
+            days_until_expiry,
+            category_priorities(inventory_df['category']),
+            condition_priorities(inventory_df['temperature_c'], inventory_df['humidity_percent'])
+        )
+
+    def _ngo_capacities(self) -> Tuple[NGOIndex, np.ndarray, np.ndarray]:
+        """
+        The current NGO snapshot with its capacities (overrides applied) and capacity
+        scores, recomputed when the registry or the overrides change.
+        """
+        ngo, capacity, capacity_scores = self._ngo_capacity
+        if ngo is not self.ngo_registry.index:
+            ngo = self.ngo_registry.index
+            capacity = ngo.capacity.astype(np.float64)
+            if self.ngo_capacity_overrides:
+                ngo_ids = np.array([record['ngo_id'] for record in ngo.records], dtype=object)
+                for ngo_id, capacity_kg in self.ngo_capacity_overrides.items():
+                    capacity[ngo_ids == ngo_id] = capacity_kg
+            capacity_scores = np.minimum(1.0, capacity / FULL_CAPACITY_KG)
+            self._ngo_capacity = (ngo, capacity, capacity_scores)
+        return ngo, capacity, capacity_scores
+
+    def _ngo_snapshot(self) -> Tuple[NGOIndex, np.ndarray]:
+        """The current NGO snapshot and its capacity scores."""
+        ngo, _, capacity_scores = self._ngo_capacities()
+        return ngo, capacity_scores
+
+    def set_ngo_capacities(self, ngo_capacities: Dict[Hashable, float]) -> None:
+        """Overrides `capacity_kg` per `ngo_id` for every later plan, until the override is changed again."""
+        self.ngo_capacity_overrides.update(ngo_capacities)
+        self._ngo_capacity = (None, np.empty(0), np.empty(0))
+
+    def _score_ngo_pairs(
+        self,
+        ngo: NGOIndex,
+        capacity_scores: np.ndarray,
+        lat_rad: np.ndarray,
+        lon_rad: np.ndarray,
+        rows: np.ndarray,
+        max_distance: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Distances, CO2 savings and match scores between items and the NGOs at `rows`.
+
+        Item coordinates are in radians, like the registry's NGO arrays.
+
+        Returns:
+            Three (items, NGOs) matrices. Pairs beyond `max_distance` are scored
+            like any other; callers mask them out.
+        """
+        distance = haversine_distance_matrix_radians(lat_rad, lon_rad, ngo.lat_rad[rows], ngo.lon_rad[rows])
+        co2_savings = estimate_co2_savings(distance)
+        match_score = (
+            MATCH_SCORE_WEIGHTS['distance'] * (1 - distance / max_distance) +
+            MATCH_SCORE_WEIGHTS['capacity'] * capacity_scores[rows] +
+            MATCH_SCORE_WEIGHTS['co2'] * co2_savings / CO2_NORMALIZER_KG  # Normalize CO2 savings
+        )
+        return distance, co2_savings, match_score
+
+    def _match_record(
+        self,
+        ngo: NGOIndex,
+        ngo_row: int,
+        distance: float,
+        co2_savings: float,
+        match_score: float
+    ) -> Dict[str, Any]:
+        record = ngo.records[ngo_row]
+        return {
+            'ngo_id': record['ngo_id'],
+            'ngo_name': record['ngo_name'],
+            'distance_km': round(float(distance), 2),
+            'co2_savings_kg': round(float(co2_savings), 2),
+            'match_score': round(float(match_score), 3)
+        }
+
     def find_compatible_ngos(
         self, 
         item: Dict[str, Any], 
-        max_distance: float = 100.0
+        max_distance: float = MAX_MATCH_DISTANCE_KM
     ) -> List[Dict[str, Any]]:
         """Find NGOs that can accept the item within constraints."""
-        compatible_ngos = []
-        
-        for _, ngo in self.ngos_df.iterrows():
-            # Check category compatibility
-            if item['category'] not in ngo['accepted_categories'].split('|'):
-                continue
-            
-            # Calculate distance
-            distance = calculate_distance(
-                item['latitude'], item['longitude'],
-                ngo['latitude'], ngo['longitude']
-            )
-            
-            if distance > max_distance:
-                continue
-            
-            # Calculate match score
-            co2_savings = estimate_co2_savings(distance)
-            capacity_score = min(1.0, ngo['capacity_kg'] / 100)
-            
-            match_score = (
-                0.4 * (1 - distance / max_distance) +
-                0.3 * capacity_score +
-                0.3 * co2_savings / 10  # Normalize CO2 savings
+        ngo, capacity_scores = self._ngo_snapshot()
+        rows = ngo.compatible_rows(item['category'])
+        distance, co2_savings, match_score = (
+            values[0] for values in self._score_ngo_pairs(
+                ngo,
+                capacity_scores,
+                np.radians([item['latitude']]),
+                np.radians([item['longitude']]),
+                rows,
+                max_distance
             )
-            
-            compatible_ngos.append({
-                'ngo_id': ngo['ngo_id'],
-                'ngo_name': ngo['ngo_name'],
-                'distance_km': round(distance, 2),
-                'co2_savings_kg': round(co2_savings, 2),
-                'match_score': round(match_score, 3)
-            })
+        )
+
+        compatible_ngos = [
+            self._match_record(ngo, rows[col], distance[col], co2_savings[col], match_score[col])
+            for col in np.flatnonzero(distance <= max_distance)
+        ]
         
         # Sort by match score
         compatible_ngos.sort(key=lambda x: x['match_score'], reverse=True)
         
         return compatible_ngos
-    
-    def get_redistribution_plan(self) -> Tuple[pd.DataFrame, Dict[str, Any]]:
-        """Generate a comprehensive redistribution plan."""
-        # Add priority scores to inventory
-        self.inventory_df['priority_score'] = self.inventory_df.apply(
-            self.calculate_item_priority,
-            axis=1
+
+    def rank_ngo_matches(
+        self,
+        items_df: pd.DataFrame,
+        top_k: int = MATCH_SHORTLIST_SIZE,
+        max_distance: float = MAX_MATCH_DISTANCE_KM,
+        ngo: Optional[NGOIndex] = None,
+        capacity_scores: Optional[np.ndarray] = None
+    ) -> Shortlist:
+        """
+        Ranks the compatible NGOs within `max_distance` of every row of `items_df`.
+
+        Items are grouped by category and scored against the compatible NGOs in
+        blocks of at most `MATCH_BLOCK_PAIRS` pairs. NGOs are ordered by rounded
+        match score, ties in NGO row order like the stable sort of `find_compatible_ngos`.
+
+        Returns:
+            tuple: (ngo_rows, distances, co2_savings, match_scores), each of shape
+                (len(items_df), top_k), best first; rows are -1 past an item's last NGO
+        """
+        if ngo is None:
+            ngo, capacity_scores = self._ngo_snapshot()
+        n_items = len(items_df)
+        ngo_rows = np.full((n_items, top_k), -1, dtype=np.intp)
+        distances, co2, scores = (np.full((n_items, top_k), np.nan) for _ in range(3))
+        categories = items_df['category'].to_numpy(dtype=object)
+        lat_rad = np.radians(items_df['latitude'].to_numpy(dtype=np.float64))
+        lon_rad = np.radians(items_df['longitude'].to_numpy(dtype=np.float64))
+
+        for category in pd.unique(categories):
+            rows = ngo.compatible_rows(category)
+            if not len(rows):
+                continue
+            positions = np.flatnonzero(categories == category)
+            block_size = max(1, MATCH_BLOCK_PAIRS // len(rows))
+            k = min(top_k, len(rows))
+            for start in range(0, len(positions), block_size):
+                block = positions[start:start + block_size]
+                distance, co2_savings, match_score = self._score_ngo_pairs(
+                    ngo, capacity_scores, lat_rad[block], lon_rad[block], rows, max_distance
+                )
+                ranked = np.where(distance <= max_distance, np.round(match_score, 3), -np.inf)
+                ranked[np.isnan(ranked)] = -np.inf  # Unscorable pairs (missing capacity) rank last
+                if k == 1:
+                    cols = ranked.argmax(axis=1)[:, None]
+                else:
+                    # Keep every NGO above the k-th best score and the first tied ones at it,
+                    # so ties at the cut-off go to the lowest NGO rows like the other ties
+                    kth = -np.partition(-ranked, k - 1, axis=1)[:, k - 1:k]
+                    above = ranked > kth
+                    tied = ranked == kth
+                    needed = k - above.sum(axis=1, keepdims=True)
+                    selected = above | (tied & (np.cumsum(tied, axis=1) <= needed))
+                    cols = np.nonzero(selected)[1].reshape(len(block), k)
+                    order = np.lexsort((cols, -np.take_along_axis(ranked, cols, axis=1)))
+                    cols = np.take_along_axis(cols, order, axis=1)
+
+                feasible = np.take_along_axis(ranked, cols, axis=1) > -np.inf
+                ngo_rows[block, :k] = np.where(feasible, rows[cols], -1)
+                for target, values in ((distances, distance), (co2, co2_savings), (scores, match_score)):
+                    target[block, :k] = np.where(feasible, np.take_along_axis(values, cols, axis=1), np.nan)
+
+        return ngo_rows, distances, co2, scores
+
+    def find_best_ngo_matches(
+        self,
+        items_df: pd.DataFrame,
+        max_distance: float = MAX_MATCH_DISTANCE_KM
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Batch version of `find_compatible_ngos(item)[0]` for every row of `items_df`,
+        ignoring NGO capacity.
+
+        Returns:
+            list: The best match per row, or None where no NGO is compatible
+        """
+        ngo, capacity_scores = self._ngo_snapshot()
+        ngo_rows, distances, co2, scores = self.rank_ngo_matches(
+            items_df, top_k=1, max_distance=max_distance, ngo=ngo, capacity_scores=capacity_scores
+        )
+        return [
+            self._match_record(ngo, row, distances[i, 0], co2[i, 0], scores[i, 0]) if row >= 0 else None
+            for i, row in enumerate(ngo_rows[:, 0])
+        ]
+
+    @staticmethod
+    def _item_weights(items_df: pd.DataFrame) -> np.ndarray:
+        """Item loads in kg from `quantity_kg`, or `DEFAULT_ITEM_WEIGHT_KG` if absent."""
+        if ITEM_WEIGHT_COLUMN in items_df:
+            return items_df[ITEM_WEIGHT_COLUMN].fillna(DEFAULT_ITEM_WEIGHT_KG).to_numpy(dtype=np.float64)
+        return np.full(len(items_df), DEFAULT_ITEM_WEIGHT_KG)
+
+    def _new_plan_state(self) -> PlanState:
+        """An empty plan against the current NGO snapshot, with every NGO's full capacity available."""
+        ngo, capacity, capacity_scores = self._ngo_capacities()
+        ngo_ids = [record['ngo_id'] for record in ngo.records]
+        return PlanState(ngo, capacity_scores, CapacityLedger(ngo_ids, capacity), items={})
+
+    def _add_planned_items(self, state: PlanState, items_df: pd.DataFrame) -> List[PlannedItem]:
+        """Shortlists NGOs for high-priority `items_df` rows and registers them in `state`."""
+        ngo_rows, distances, co2, scores = self.rank_ngo_matches(
+            items_df, ngo=state.ngo, capacity_scores=state.capacity_scores
         )
+        planned = [
+            PlannedItem(
+                item_id, product_name, category, priority_score, latitude, longitude, quantity_kg,
+                shortlist=(ngo_rows[i], distances[i], co2[i], scores[i])
+            )
+            for i, (item_id, product_name, category, priority_score, latitude, longitude, quantity_kg)
+            in enumerate(zip(
+                items_df['product_id'].tolist(),
+                items_df['product_name'].tolist(),
+                items_df['category'].tolist(),
+                items_df['priority_score'].tolist(),
+                items_df['latitude'].tolist(),
+                items_df['longitude'].tolist(),
+                self._item_weights(items_df).tolist()
+            ))
+        ]
+        for item in planned:
+            state.items[item.item_id] = item
+        return planned
+
+    def _reserve_best(self, state: PlanState, item: PlannedItem) -> Optional[Dict[str, Any]]:
+        """
+        Reserves capacity at the best NGO with room for the item and records the match.
+
+        The shortlist is tried first; only when every shortlisted NGO is full are all
+        compatible NGOs rescored against the remaining capacity.
+        """
+        ledger = state.ledger
+        ngo_rows, distances, co2, scores = item.shortlist
+        row, match = -1, None
+        for k, candidate in enumerate(ngo_rows):
+            if candidate < 0:
+                break
+            if ledger.can_reserve(candidate, item.quantity_kg):
+                row = candidate
+                match = self._match_record(state.ngo, row, distances[k], co2[k], scores[k])
+                break
+        else:
+            if len(ngo_rows) and ngo_rows[-1] >= 0:
+                row, match = self._scan_with_capacity(state, item)
+
+        item.best_match = match
+        if match is not None:
+            ledger.reserve(item.item_id, row, item.quantity_kg)
+        return match
+
+    def _scan_with_capacity(self, state: PlanState, item: PlannedItem) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Best NGO row and match among all compatible NGOs that still have room for the item."""
+        rows = state.ngo.compatible_rows(item.category)
+        distance, co2_savings, match_score = (
+            values[0] for values in self._score_ngo_pairs(
+                state.ngo, state.capacity_scores,
+                np.radians([item.latitude]), np.radians([item.longitude]),
+                rows, MAX_MATCH_DISTANCE_KM
+            )
+        )
+        feasible = (
+            (distance <= MAX_MATCH_DISTANCE_KM) &
+            (state.ledger.remaining[rows] + CAPACITY_EPSILON_KG >= item.quantity_kg)
+        )
+        if not feasible.any():
+            return -1, None
+        col = np.where(feasible, np.round(match_score, 3), -np.inf).argmax()
+        return rows[col], self._match_record(state.ngo, rows[col], distance[col], co2_savings[col], match_score[col])
+
+    def _prioritize(self, inventory_df: pd.DataFrame) -> pd.DataFrame:
+        """Adds priority scores to `inventory_df` and returns its high-priority rows, most urgent first."""
+        # Add priority scores to inventory
+        inventory_df['priority_score'] = self.calculate_priorities(inventory_df)
         
         # Sort by priority
-        prioritized_items = self.inventory_df.sort_values(
+        prioritized_items = inventory_df.sort_values(
             'priority_score', 
             ascending=False
         )
-        
-        # Generate matches for high-priority items
-        high_priority_items = prioritized_items[
-            prioritized_items['priority_score'] >= 0.7
+        return prioritized_items[
+            prioritized_items['priority_score'] >= HIGH_PRIORITY_THRESHOLD
         ]
-        
-        redistribution_plan = []
-        for _, item in high_priority_items.iterrows():
-            matches = self.find_compatible_ngos(item)
-            if matches:
-                redistribution_plan.append({
-                    'item_id': item['product_id'],
-                    'product_name': item['product_name'],
-                    'category': item['category'],
-                    'priority_score': item['priority_score'],
-                    'best_match': matches[0]
-                })
-        
-        # Create summary statistics
+
+    @staticmethod
+    def _plan_entry(item: PlannedItem) -> Dict[str, Any]:
+        return {
+            'item_id': item.item_id,
+            'product_name': item.product_name,
+            'category': item.category,
+            'priority_score': item.priority_score,
+            'quantity_kg': item.quantity_kg,
+            'best_match': item.best_match
+        }
+
+    def _plan_items(self, inventory_df: pd.DataFrame, state: PlanState) -> List[Dict[str, Any]]:
+        """
+        Score items, then assign the high-priority ones, most urgent first, to the
+        best NGO that still has capacity for them.
+        """
+        planned = self._add_planned_items(state, self._prioritize(inventory_df))
+        return [self._plan_entry(item) for item in planned if self._reserve_best(state, item) is not None]
+
+    def _summarize_plan(
+        self,
+        redistribution_plan: List[Dict[str, Any]],
+        state: Optional[PlanState] = None
+    ) -> Dict[str, Any]:
+        """Create summary statistics for a redistribution plan."""
         summary = {
             'total_items_to_redistribute': len(redistribution_plan),
             'total_co2_savings': sum(
@@ -138,5 +535,182 @@ class Redistributor:
                 for item in redistribution_plan
             ) / len(redistribution_plan) if redistribution_plan else 0
         }
-        
+        if state is not None:
+            # Items with a compatible NGO in range, but none with capacity left
+            summary['items_without_capacity'] = sum(
+                1 for item in state.items.values()
+                if item.best_match is None and item.shortlist[0][0] >= 0
+            )
+            summary['capacity'] = state.ledger.summary()
+        return summary
+
+    def get_redistribution_plan(self) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Generate a comprehensive redistribution plan.
+
+        Items are assigned in priority order and every assignment reserves the item's
+        load in a `CapacityLedger`, so no NGO receives more than its `capacity_kg`.
+        The plan state is kept for incremental updates through `replan`.
+        """
+        state = self._new_plan_state()
+        redistribution_plan = self._plan_items(self.inventory_df, state)
+        self._plan_state = state
+        return pd.DataFrame(redistribution_plan), self._summarize_plan(redistribution_plan, state)
+
+    def _apply_stock_changes(
+        self,
+        updated_items: Optional[pd.DataFrame],
+        removed_item_ids: Optional[Iterable[Hashable]]
+    ) -> None:
+        """Replaces changed rows and drops removed rows of `inventory_df`."""
+        changed = set(removed_item_ids or ())
+        if updated_items is not None:
+            changed |= set(updated_items['product_id'])
+        stale = self.inventory_df['product_id'].isin(changed).to_numpy()
+        self.inventory_df = pd.concat(
+            [self.inventory_df[~stale]] + ([updated_items] if updated_items is not None else []),
+            ignore_index=True
+        )
+
+    def replan(
+        self,
+        updated_items: Optional[pd.DataFrame] = None,
+        removed_item_ids: Optional[Iterable[Hashable]] = None,
+        ngo_capacities: Optional[Dict[Hashable, float]] = None
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Updates the last plan for changed stock or NGO capacity, re-running assignment
+        only for the affected items.
+
+        Affected items are the updated ones, those evicted from an NGO whose capacity
+        dropped below its reservations (lowest priority first), and, whenever capacity
+        was freed, the high-priority items still waiting for an NGO. Other reservations
+        are kept as they are, so an item is never moved to make room for another; call
+        `get_redistribution_plan` to re-optimize from scratch. Falls back to a full
+        plan when there is none yet or the NGO registry changed since.
+
+        Args:
+            updated_items (pd.DataFrame, optional): New or changed inventory rows, keyed by `product_id`.
+            removed_item_ids (iterable, optional): Products that left the inventory (sold, dispatched, expired).
+            ngo_capacities (dict, optional): New `capacity_kg` per `ngo_id`, kept for
+                later plans like `set_ngo_capacities`.
+
+        Returns:
+            tuple: (plan_df, summary), like `get_redistribution_plan`; the summary also
+                counts the `replanned_items`
+        """
+        if updated_items is not None:
+            updated_items = updated_items.reset_index(drop=True)
+            for name in DATE_COLUMNS:
+                if name in updated_items:
+                    # Parse like dates loaded from the inventory, so the concat below keeps datetime64
+                    updated_items[name] = parse_date_values(updated_items[name])
+        if ngo_capacities:
+            known_ids = set(self.ngo_registry.ngos_df['ngo_id'])
+            for ngo_id in ngo_capacities:
+                if ngo_id not in known_ids:
+                    logger.warning("Unknown NGO %s in capacity update", ngo_id)
+            self.set_ngo_capacities(ngo_capacities)
+
+        state = self._plan_state
+        if state is None or state.ngo is not self.ngo_registry.index:
+            logger.info("No plan for the current NGO snapshot; building a full plan")
+            if updated_items is not None or removed_item_ids is not None:
+                self._apply_stock_changes(updated_items, removed_item_ids)
+            return self.get_redistribution_plan()
+
+        ledger = state.ledger
+        removed = set(removed_item_ids or ())
+        updated_ids = set()
+        high_priority_items = None
+        capacity_freed = False
+
+        # Apply capacity overrides first, so new shortlists see the new capacity scores
+        _, capacity, capacity_scores = self._ngo_capacities()
+        changed_rows = np.flatnonzero(capacity != ledger.capacity)
+        capacity_freed |= bool((capacity[changed_rows] > ledger.capacity[changed_rows]).any())
+        for row in changed_rows:
+            ledger.set_capacity(row, capacity[row])
+        rescored = state.capacity_scores is not capacity_scores and len(changed_rows) > 0
+        state.capacity_scores = capacity_scores
+
+        if updated_items is not None:
+            updated_ids = set(updated_items['product_id'])
+            high_priority_items = self._prioritize(updated_items)
+
+        # Drop the old rows, plan entries and reservations of changed and removed items
+        changed = updated_ids | removed
+        if changed:
+            self._apply_stock_changes(updated_items, removed)
+            for item_id in changed:
+                capacity_freed |= ledger.release(item_id) is not None
+                state.items.pop(item_id, None)
+
+        new_items = set()
+        affected: Dict[Hashable, PlannedItem] = {}
+        if high_priority_items is not None and len(high_priority_items):
+            for item in self._add_planned_items(state, high_priority_items):
+                affected[item.item_id] = item
+                new_items.add(item.item_id)
+
+        # Evict the lowest-priority reservations of NGOs that no longer fit them
+        for row in ledger.overbooked_rows():
+            holders = sorted(ledger.items_at(row), key=lambda item_id: state.items[item_id].priority_score)
+            for item_id in holders:
+                if ledger.can_reserve(row, 0.0):
+                    break
+                ledger.release(item_id)
+                state.items[item_id].best_match = None
+                affected[item_id] = state.items[item_id]
+
+        if capacity_freed:
+            for item in state.items.values():
+                if item.best_match is None and item.shortlist[0][0] >= 0:
+                    affected[item.item_id] = item
+
+        # Shortlists ranked before a capacity change used the old capacity scores
+        stale_shortlists = [item for item in affected.values() if rescored and item.item_id not in new_items]
+        if stale_shortlists:
+            ngo_rows, distances, co2, scores = self.rank_ngo_matches(
+                pd.DataFrame({
+                    'category': [item.category for item in stale_shortlists],
+                    'latitude': [item.latitude for item in stale_shortlists],
+                    'longitude': [item.longitude for item in stale_shortlists]
+                }),
+                ngo=state.ngo, capacity_scores=state.capacity_scores
+            )
+            for i, item in enumerate(stale_shortlists):
+                item.shortlist = (ngo_rows[i], distances[i], co2[i], scores[i])
+
+        for item in sorted(affected.values(), key=lambda item: -item.priority_score):
+            self._reserve_best(state, item)
+
+        # Current plan, most urgent first
+        redistribution_plan = [
+            self._plan_entry(item)
+            for item in sorted(state.items.values(), key=lambda item: -item.priority_score)
+            if item.best_match is not None
+        ]
+        summary = self._summarize_plan(redistribution_plan, state)
+        summary['replanned_items'] = len(affected)
         return pd.DataFrame(redistribution_plan), summary
+
+    def iter_redistribution_plan(
+        self,
+        chunksize: Optional[int] = None
+    ) -> Iterator[Tuple[pd.DataFrame, Dict[str, Any]]]:
+        """
+        Stream the redistribution plan from the inventory table chunk by chunk.
+
+        Priorities and matches are computed per chunk, so peak memory depends on
+        the chunk size rather than the inventory size. NGO capacity is reserved in
+        one ledger across all chunks. Chunks without planned items are skipped.
+        """
+        chunksize = chunksize or self.chunksize or STREAM_CHUNK_SIZE
+        state = self._new_plan_state()
+        for chunk in iter_table_chunks(self.inventory_file, chunksize):
+            redistribution_plan = self._plan_items(chunk, state)
+            # Only the ledger carries over between chunks
+            state.items.clear()
+            if redistribution_plan:
+                yield pd.DataFrame(redistribution_plan), self._summarize_plan(redistribution_plan)
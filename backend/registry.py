@@ -0,0 +1,370 @@
+"""
+Zero Waste AI - NGO Registry
+
+The NGO table and the indexes derived from it (category bitmasks, per-category
+BallTrees, radian coordinates, capacities), loaded once per process and shared
+by `RedistributionEngine`, `Redistributor` and the dashboard. Every change to
+the table produces a new immutable `NGOIndex` snapshot with a higher version,
+which caches key their entries on.
+"""
+
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree
+
+from backend.delta import compute_table_delta
+from backend.storage import read_table, table_digest, table_fingerprint
+from backend.utils import EARTH_RADIUS_KM, haversine_distances_radians
+
+# Default NGO table
+NGO_FILE = 'data/mock_ngos.csv'
+
+# ID column NGO rows are keyed on when reloading row-level deltas
+NGO_KEY = 'ngo_id'
+
+logger = logging.getLogger(__name__)
+
+def _accepted_categories(ngos_df, rows=None):
+    """Returns the raw `accepted_categories` values of all NGOs (or of `rows`)."""
+    if 'accepted_categories' not in ngos_df:
+        return np.empty(0, dtype=object)
+    accepted = ngos_df['accepted_categories'].fillna('').to_numpy(dtype=object)
+    return accepted if rows is None else accepted[rows]
+
+def _ngo_category_masks(accepted_values, category_bits):
+    """
+    Computes the accepted-category bitmask and category count of each NGO.
+
+    Args:
+        accepted_values (array-like): '|'-separated `accepted_categories` values.
+        category_bits (dict): category -> bit position; new categories get the next free bit.
+
+    Returns:
+        tuple: (masks, counts) as uint64 and int64 arrays
+    """
+    masks = np.zeros(len(accepted_values), dtype=np.uint64)
+    counts = np.zeros(len(accepted_values), dtype=np.int64)
+    for row, value in enumerate(accepted_values):
+        categories = value.split('|') if value else []
+        counts[row] = len(categories)
+        for category in categories:
+            if category not in category_bits:
+                if len(category_bits) >= 64:
+                    raise ValueError("NGO category index supports at most 64 distinct categories")
+                category_bits[category] = len(category_bits)
+            masks[row] |= np.uint64(1) << np.uint64(category_bits[category])
+    return masks, counts
+
+@dataclass
+class NGOIndex:
+    """
+    Snapshot of the NGO table and the indexes derived from it.
+
+    Each NGO gets a bitmask of its accepted categories and each category maps to the
+    sorted row positions of the NGOs accepting it, so compatible NGOs are found by exact
+    category lookup instead of a substring scan of `accepted_categories`. One haversine
+    BallTree per category serves radius-bounded lookups. Coordinates are kept both in
+    degrees and as contiguous radian arrays (`lat_rad`, `lon_rad`) for the distance kernels.
+
+    A snapshot is never modified once built: reloads build a new one that shares the
+    unchanged parts, so a request holding a snapshot sees consistent rows and scores.
+    """
+    ngos_df: pd.DataFrame
+    category_bits: dict
+    category_masks: np.ndarray
+    category_counts: np.ndarray
+    rows_by_category: dict
+    spatial_index: dict = field(repr=False)
+    lats: np.ndarray = field(repr=False)
+    lons: np.ndarray = field(repr=False)
+    lat_rad: np.ndarray = field(repr=False)
+    lon_rad: np.ndarray = field(repr=False)
+    capacity: np.ndarray = field(repr=False)
+    capacity_scores: np.ndarray = field(repr=False)
+    category_focus_scores: np.ndarray = field(repr=False)
+    records: list = field(repr=False)
+    version: int = 0
+
+    @classmethod
+    def build(cls, ngos_df, version=0):
+        """Builds the index for a whole NGO table."""
+        category_bits = {}
+        masks, counts = _ngo_category_masks(_accepted_categories(ngos_df), category_bits)
+        return cls._assemble(
+            ngos_df, category_bits, masks, counts, ngos_df.to_dict('records'),
+            rows_by_category={}, spatial_index={}, categories=list(category_bits), version=version
+        )
+
+    @classmethod
+    def _assemble(cls, ngos_df, category_bits, masks, counts, records,
+                  rows_by_category, spatial_index, categories, version):
+        """Completes a snapshot, recomputing the rows and BallTrees of `categories` only."""
+        if ngos_df.empty:
+            lats = np.empty(0)
+            lons = np.empty(0)
+        else:
+            lats = np.ascontiguousarray(ngos_df['latitude'].to_numpy(dtype=np.float64))
+            lons = np.ascontiguousarray(ngos_df['longitude'].to_numpy(dtype=np.float64))
+        lat_rad = np.radians(lats)
+        lon_rad = np.radians(lons)
+
+        for category in categories:
+            bit = np.uint64(1) << np.uint64(category_bits[category])
+            rows = np.flatnonzero(masks & bit).astype(np.intp)
+            if len(rows):
+                rows_by_category[category] = rows
+                coordinates = np.column_stack([lat_rad[rows], lon_rad[rows]])
+                spatial_index[category] = BallTree(coordinates, metric='haversine')
+            else:
+                rows_by_category.pop(category, None)
+                spatial_index.pop(category, None)
+
+        # Item-independent NGO scores used by the matching paths
+        min_required_capacity = 10  # Minimum kg capacity needed
+        capacity = (
+            ngos_df['capacity_kg'].to_numpy(dtype=np.float64)
+            if 'capacity_kg' in ngos_df else np.empty(0)
+        )
+        return cls(
+            ngos_df=ngos_df,
+            category_bits=category_bits,
+            category_masks=masks,
+            category_counts=counts,
+            rows_by_category=rows_by_category,
+            spatial_index=spatial_index,
+            lats=lats,
+            lons=lons,
+            lat_rad=lat_rad,
+            lon_rad=lon_rad,
+            capacity=capacity,
+            capacity_scores=np.minimum(1.0, (capacity - min_required_capacity) / 200),
+            category_focus_scores=1 / (1 + 0.2 * counts),
+            records=records,
+            version=version
+        )
+
+    def with_delta(self, new_ngos, delta):
+        """
+        Returns a new snapshot with a row-level NGO delta applied.
+
+        Bitmasks, category counts and records of surviving NGOs are carried over and only
+        changed rows are recomputed. BallTrees are rebuilt only for categories that gained,
+        lost or moved an NGO; the others are shared and remapped to the new row positions.
+        """
+        kept = delta.kept_old
+        n_kept = len(kept)
+        ngos_df = new_ngos.iloc[delta.merged_order].reset_index(drop=True)
+        changed_rows = np.r_[delta.updated, np.arange(n_kept, len(ngos_df))].astype(np.intp)
+
+        category_bits = dict(self.category_bits)
+        masks = np.zeros(len(ngos_df), dtype=np.uint64)
+        counts = np.zeros(len(ngos_df), dtype=np.int64)
+        masks[:n_kept] = self.category_masks[kept]
+        counts[:n_kept] = self.category_counts[kept]
+        masks[changed_rows], counts[changed_rows] = _ngo_category_masks(
+            _accepted_categories(ngos_df, changed_rows), category_bits
+        )
+
+        records = [self.records[row] for row in kept] + [None] * (len(ngos_df) - n_kept)
+        for row, record in zip(changed_rows, ngos_df.iloc[changed_rows].to_dict('records')):
+            records[row] = record
+
+        # Categories whose set of NGOs or NGO coordinates may have changed
+        affected_bits = int(np.bitwise_or.reduce(np.r_[
+            self.category_masks[delta.deleted_old], self.category_masks[kept[delta.updated]], masks[changed_rows]
+        ].astype(np.uint64)))
+        affected = [category for category, bit in category_bits.items() if affected_bits >> bit & 1]
+
+        rows_by_category = dict(self.rows_by_category)
+        if len(delta.deleted_old):
+            old_to_new = np.full(len(self.category_masks), -1, dtype=np.intp)
+            old_to_new[kept] = np.arange(n_kept)
+            for category, rows in rows_by_category.items():
+                rows_by_category[category] = old_to_new[rows]
+
+        return NGOIndex._assemble(
+            ngos_df, category_bits, masks, counts, records,
+            rows_by_category=rows_by_category, spatial_index=dict(self.spatial_index),
+            categories=affected, version=self.version + 1
+        )
+
+    def compatible_rows(self, category):
+        """Returns the sorted row positions of the NGOs accepting a category."""
+        return self.rows_by_category.get(category, np.empty(0, dtype=np.intp))
+
+    def query_within_radius(self, category, latitudes, longitudes, radii_km):
+        """
+        Finds the NGOs accepting a category within a per-point radius of many points.
+
+        Args:
+            category (str): The product category.
+            latitudes (np.ndarray): Query point latitudes in degrees.
+            longitudes (np.ndarray): Query point longitudes in degrees.
+            radii_km (np.ndarray): Search radius for each query point.
+
+        Returns:
+            tuple: (point_positions, ngo_rows, distances_km) for every point/NGO pair in range
+        """
+        tree = self.spatial_index.get(category)
+        if tree is None or len(latitudes) == 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0)
+
+        # Pad the tree radius slightly; the exact Haversine check below decides membership
+        points = np.radians(np.column_stack([latitudes, longitudes]))
+        neighbours = tree.query_radius(points, r=radii_km / EARTH_RADIUS_KM * (1 + 1e-9) + 1e-12)
+
+        counts = np.fromiter((len(n) for n in neighbours), dtype=np.intp, count=len(neighbours))
+        point_positions = np.repeat(np.arange(len(neighbours)), counts)
+        local_rows = np.concatenate(neighbours) if counts.sum() else np.empty(0, dtype=np.intp)
+        ngo_rows = self.rows_by_category[category][local_rows]
+
+        distances = haversine_distances_radians(
+            points[point_positions, 0], points[point_positions, 1],
+            self.lat_rad[ngo_rows], self.lon_rad[ngo_rows]
+        )
+        within = distances <= radii_km[point_positions]
+        return point_positions[within], ngo_rows[within], distances[within]
+
+    def find_within_radius(self, category, latitude, longitude, radius_km):
+        """Finds the NGOs accepting a category within `radius_km` of one location, by row."""
+        _, ngo_rows, distances = self.query_within_radius(
+            category,
+            np.array([latitude], dtype=np.float64),
+            np.array([longitude], dtype=np.float64),
+            np.array([radius_km], dtype=np.float64)
+        )
+        order = np.argsort(ngo_rows, kind='stable')
+        return ngo_rows[order], distances[order]
+
+class NGORegistry:
+    """
+    Holds the current `NGOIndex` of one NGO table.
+
+    Readers take `index` (an immutable snapshot) without locking; `reload` and
+    `replace` build a new snapshot and swap it in under a lock, so every consumer
+    of the registry sees the same rows and the same `version`.
+    """
+
+    def __init__(self, path: Optional[str] = None, ngos_df: Optional[pd.DataFrame] = None, version: int = 0):
+        """
+        Loads the NGO table at `path`, or wraps an in-memory `ngos_df` (which is never reloaded).
+        The first snapshot gets `version`.
+
+        Raises:
+            FileNotFoundError: If `path` does not exist.
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._fingerprint: Optional[Dict[str, Any]] = None
+        self._digest: Optional[str] = None
+        if ngos_df is None:
+            self._fingerprint = table_fingerprint(path)
+            ngos_df = read_table(path)
+        self._index = NGOIndex.build(ngos_df, version=version)
+
+    @property
+    def index(self) -> NGOIndex:
+        """The current NGO snapshot."""
+        return self._index
+
+    @property
+    def version(self) -> int:
+        """Version of the current snapshot; increases with every change."""
+        return self._index.version
+
+    @property
+    def ngos_df(self) -> pd.DataFrame:
+        return self._index.ngos_df
+
+    def replace(self, ngos_df: pd.DataFrame) -> NGOIndex:
+        """Replaces the whole NGO table and returns the new snapshot."""
+        with self._lock:
+            self._index = NGOIndex.build(ngos_df, version=self._index.version + 1)
+            return self._index
+
+    def reload(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Picks up changes to the NGO table on disk.
+
+        The table is re-read only when its mtime or size changed and its content hash
+        differs from the last load. Changes are applied as row-level inserts, updates
+        and deletes keyed by `ngo_id`, patching the category index and spatial trees
+        for the affected rows only; tables that cannot be diffed are rebuilt in full.
+
+        Args:
+            force (bool): Re-read and diff the table even if it looks unchanged.
+
+        Returns:
+            dict: The status ('unchanged', 'delta', 'full', 'missing' or 'in_memory')
+                and the number of inserted, updated and deleted rows
+        """
+        if self.path is None:
+            return {"status": "in_memory"}
+        with self._lock:
+            previous = self._fingerprint
+            try:
+                fingerprint = table_fingerprint(self.path)
+                if not force and fingerprint == previous:
+                    return {"status": "unchanged"}
+                digest = table_digest(self.path)
+                if not force and digest == self._digest:
+                    # Touched but not edited
+                    self._fingerprint = fingerprint
+                    return {"status": "unchanged"}
+                new_df = read_table(self.path)
+            except FileNotFoundError as e:
+                logger.error("Error reloading ngos: %s", e)
+                return {"status": "missing"}
+
+            current_df = self._index.ngos_df
+            delta = None
+            if (previous is not None and previous['path'] == fingerprint['path']
+                    and set(current_df.columns) == set(new_df.columns)):
+                delta = compute_table_delta(current_df, new_df, NGO_KEY)
+
+            if delta is None:
+                self._index = NGOIndex.build(new_df, version=self._index.version + 1)
+                result = {"status": "full", "rows": len(new_df)}
+            else:
+                if not delta.is_empty:
+                    self._index = self._index.with_delta(new_df, delta)
+                result = {"status": "delta", **delta.counts()}
+
+            self._fingerprint = fingerprint
+            self._digest = digest
+            logger.info("Reloaded ngos: %s", result)
+            return result
+
+# Registries loaded by this process, by absolute table path
+_registries: Dict[str, NGORegistry] = {}
+_registries_lock = threading.Lock()
+
+def get_ngo_registry(path: Optional[str] = None) -> NGORegistry:
+    """
+    Returns the process-wide registry of an NGO table, loading it on first use.
+
+    Args:
+        path (str, optional): NGO CSV or `.zwcol` table. Defaults to `NGO_FILE`.
+
+    Raises:
+        FileNotFoundError: If the table does not exist.
+    """
+    key = os.path.abspath(path or NGO_FILE)
+    registry = _registries.get(key)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(key)
+            if registry is None:
+                registry = _registries[key] = NGORegistry(path or NGO_FILE)
+    return registry
+
+def clear_ngo_registries() -> None:
+    """Forgets the loaded registries, so the next `get_ngo_registry` call re-reads its table."""
+    with _registries_lock:
+        _registries.clear()
@@ -0,0 +1,451 @@
+"""
+Zero Waste AI - Matching Service
+
+Local asyncio HTTP/JSON service around `RedistributionEngine`, built on the
+standard library only:
+
+    GET  /health
+    GET  /candidates?warning_level=warning&as_of=2025-06-01&limit=100
+    POST /match          {"product_id": "...", "top_k": 3, "as_of": "2025-06-01"}
+                         (or {"item": {...}} for an item that is not in the inventory)
+    POST /match/batch    {"product_ids": [...], "top_k": 3, "as_of": "2025-06-01"}
+    GET  /stats
+
+Concurrent /match requests that arrive within `BATCH_WINDOW_MS` of each other are
+coalesced into one vectorized `find_best_matches_batch` call. Run with:
+
+    python -m backend.service --port 8080
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from functools import partial
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from backend.engine import WARNING_PRIORITIES, RedistributionEngine
+from backend.logs import configure_logging
+from backend.storage import DATE_COLUMNS, parse_date_values
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+
+# How long a /match request waits for others to share its batch, and the batch size cap
+BATCH_WINDOW_MS = 5.0
+MAX_BATCH_SIZE = 256
+
+# Largest accepted request body
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+# Item fields needed to match an item passed inline in a /match request
+REQUIRED_ITEM_FIELDS = ('product_id', 'product_name', 'category', 'stock_date', 'expiry_date', 'latitude', 'longitude')
+
+logger = logging.getLogger(__name__)
+
+class HTTPError(Exception):
+    """An error reported to the client with an HTTP status code."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def _json_default(value: Any) -> Any:
+    """Converts NumPy, pandas and date values for `json.dumps`."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    return str(value)
+
+def _json_ready(value: Any) -> Any:
+    """
+    Replaces NaN, infinite and NaT values with None throughout a payload, so it
+    serializes as strict JSON (`NaN` is not valid JSON).
+    """
+    if isinstance(value, dict):
+        return {key: _json_ready(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_ready(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return _json_ready(value.tolist())
+    if isinstance(value, (float, np.floating)):
+        return float(value) if math.isfinite(value) else None
+    if value is pd.NaT or value is pd.NA:
+        return None
+    return value
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Converts a DataFrame to JSON-ready records, with missing values as null."""
+    return [
+        {key: (None if isinstance(value, float) and math.isnan(value) else value) for key, value in record.items()}
+        for record in df.to_dict('records')
+    ]
+
+def _parse_as_of(value: Optional[str]) -> Optional[date]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"Invalid as_of date: {value!r}")
+
+def _parse_count(value: Any, name: str) -> Optional[int]:
+    """Parses a non-negative integer parameter; errors name the parameter as the client sent it."""
+    if value is None:
+        return None
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"Invalid {name}: {value!r}")
+    if count < 0:
+        raise HTTPError(400, f"{name} must not be negative")
+    return count
+
+def _parse_body(body: bytes) -> Dict[str, Any]:
+    try:
+        payload = json.loads(body or b'{}')
+    except ValueError:
+        raise HTTPError(400, "Request body is not valid JSON")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "Request body must be a JSON object")
+    return payload
+
+class MatchBatcher:
+    """
+    Coalesces concurrent single-item match requests into vectorized batches.
+
+    The first request of a batch starts a `window_ms` timer; every request arriving
+    before it fires (up to `max_batch_size`) joins the same `find_best_matches_batch`
+    call, which runs on the executor so the event loop keeps accepting requests.
+    Requests are batched per as-of date, and each caller gets its own top_k slice.
+    If a batch fails, its items are retried one by one so an error only reaches the
+    requests that caused it.
+    """
+
+    def __init__(
+        self,
+        engine: RedistributionEngine,
+        executor: ThreadPoolExecutor,
+        window_ms: float = BATCH_WINDOW_MS,
+        max_batch_size: int = MAX_BATCH_SIZE
+    ):
+        self.engine = engine
+        self.executor = executor
+        self.window_s = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending: Dict[Optional[date], List[Tuple[Dict[str, Any], Optional[int], asyncio.Future]]] = {}
+        self._timers: Dict[Optional[date], asyncio.TimerHandle] = {}
+        self.batches = 0
+        self.batched_items = 0
+
+    async def match(
+        self, item: Dict[str, Any], top_k: Optional[int] = None, as_of: Optional[date] = None
+    ) -> Tuple[list, Dict[str, Any]]:
+        """Queues one item and waits for its (matches, stats) from the next batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._pending.setdefault(as_of, [])
+        queue.append((item, top_k, future))
+        if len(queue) >= self.max_batch_size:
+            self._flush(as_of)
+        elif len(queue) == 1:
+            self._timers[as_of] = loop.call_later(self.window_s, self._flush, as_of)
+        return await future
+
+    def _flush(self, as_of: Optional[date]) -> None:
+        timer = self._timers.pop(as_of, None)
+        if timer is not None:
+            timer.cancel()
+        requests = self._pending.pop(as_of, None)
+        if requests:
+            asyncio.get_running_loop().create_task(self._run_batch(requests, as_of))
+
+    async def _run_batch(self, requests, as_of: Optional[date]) -> None:
+        self.batches += 1
+        self.batched_items += len(requests)
+        try:
+            await self._match_requests(requests, as_of)
+        except Exception as e:
+            if len(requests) == 1:
+                _, _, future = requests[0]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            # Re-run the batch one item at a time so only the failing requests get the error
+            logger.warning("Match batch of %d items failed (%s); retrying item by item", len(requests), e)
+            for request in requests:
+                try:
+                    await self._match_requests([request], as_of)
+                except Exception as item_error:
+                    future = request[2]
+                    if not future.done():
+                        future.set_exception(item_error)
+
+    async def _match_requests(self, requests, as_of: Optional[date]) -> None:
+        """Matches queued requests in one engine call and resolves their futures."""
+        top_ks = [top_k for _, top_k, _ in requests]
+        batch_top_k = None if any(top_k is None for top_k in top_ks) else max(top_ks)
+        # Results are keyed by request position: inline items may repeat a product_id
+        items_df = pd.DataFrame([item for item, _, _ in requests])
+        items_df['product_id'] = np.arange(len(requests))
+
+        results = await asyncio.get_running_loop().run_in_executor(
+            self.executor,
+            partial(self.engine.find_best_matches_batch, items_df, top_k=batch_top_k, as_of=as_of)
+        )
+        for position, (_, top_k, future) in enumerate(requests):
+            if future.done():
+                continue
+            matches, stats = results[position]
+            future.set_result((matches if top_k is None else matches[:top_k], stats))
+
+class MatchingService:
+    """
+    HTTP/JSON front end for a shared `RedistributionEngine`.
+
+    Engine calls run on a thread pool (the engine is safe for concurrent readers),
+    and single-item matches go through a `MatchBatcher`.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[RedistributionEngine] = None,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        window_ms: float = BATCH_WINDOW_MS,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_workers: Optional[int] = None
+    ):
+        self.engine = engine or RedistributionEngine()
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or min(32, (os.cpu_count() or 1) + 4))
+        self.batcher = MatchBatcher(self.engine, self.executor, window_ms, max_batch_size)
+        self.requests_served = 0
+        self.errors = 0
+        self.started_at = time.time()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._routes = {
+            ('GET', '/health'): self._health,
+            ('GET', '/stats'): self._stats,
+            ('GET', '/candidates'): self._candidates,
+            ('POST', '/match'): self._match,
+            ('POST', '/match/batch'): self._match_batch
+        }
+
+    async def start(self) -> None:
+        """Starts listening; with port 0 the chosen port is stored in `port`."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Matching service listening on http://%s:%s", self.host, self.port)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def _run(self, func, *args, **kwargs):
+        """Runs a blocking engine call on the executor."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    # --- Endpoints ---
+
+    async def _health(self, query, body):
+        return {"status": "ok"}
+
+    async def _stats(self, query, body):
+        batcher = self.batcher
+        return {
+            "service": {
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "requests_served": self.requests_served,
+                "errors": self.errors,
+                "match_batches": batcher.batches,
+                "batched_items": batcher.batched_items,
+                "avg_batch_size": batcher.batched_items / batcher.batches if batcher.batches else 0
+            },
+            "engine": self.engine.stats,
+            "engine_metrics": self.engine.metrics(),
+            "match_cache": self.engine.match_cache_stats()
+        }
+
+    async def _candidates(self, query, body):
+        warning_level = query.get('warning_level', 'warning')
+        if warning_level not in WARNING_PRIORITIES:
+            raise HTTPError(400, f"Unknown warning_level: {warning_level!r}")
+        as_of = _parse_as_of(query.get('as_of'))
+        limit = _parse_count(query.get('limit'), 'limit')
+
+        candidates, summary = await self._run(self.engine.get_redistribution_candidates, warning_level, as_of=as_of)
+        if limit is not None:
+            candidates = candidates.head(limit)
+        return {"summary": summary, "candidates": _records(candidates)}
+
+    async def _match(self, query, body):
+        payload = _parse_body(body)
+        top_k = _parse_count(payload.get('top_k'), 'top_k')
+        as_of = _parse_as_of(payload.get('as_of'))
+
+        if 'item' in payload:
+            item = payload['item']
+            if not isinstance(item, dict):
+                raise HTTPError(400, "item must be a JSON object")
+            missing_fields = [name for name in REQUIRED_ITEM_FIELDS if name not in item]
+            if missing_fields:
+                raise HTTPError(400, f"Item is missing fields: {', '.join(missing_fields)}")
+            if not isinstance(item['category'], str):
+                raise HTTPError(400, f"Invalid category: {item['category']!r}")
+            for name in ('latitude', 'longitude'):
+                value = item[name]
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                    raise HTTPError(400, f"Invalid {name}: {value!r}")
+            item = dict(item)
+            for name in DATE_COLUMNS:
+                try:
+                    # Parse once here, like dates loaded from the inventory
+                    item[name] = parse_date_values([item[name]]).iloc[0]
+                except (TypeError, ValueError):
+                    raise HTTPError(400, f"Invalid {name}: {item[name]!r}")
+        elif 'product_id' in payload:
+            items_df, missing = self.engine.get_items([payload['product_id']])
+            if missing:
+                raise HTTPError(404, f"Product ID {payload['product_id']} not found in inventory")
+            item = items_df.to_dict('records')[0]
+        else:
+            raise HTTPError(400, "Request needs a product_id or an item")
+
+        matches, stats = await self.batcher.match(item, top_k=top_k, as_of=as_of)
+        return {"product_id": item['product_id'], "matches": matches, "stats": stats}
+
+    async def _match_batch(self, query, body):
+        payload = _parse_body(body)
+        product_ids = payload.get('product_ids')
+        if not isinstance(product_ids, list):
+            raise HTTPError(400, "product_ids must be a list")
+        top_k = _parse_count(payload.get('top_k', 3), 'top_k')
+        as_of = _parse_as_of(payload.get('as_of'))
+
+        items_df, missing = self.engine.get_items(product_ids)
+        results = await self._run(self.engine.find_best_matches_batch, items_df, top_k=top_k, as_of=as_of)
+        return {
+            "results": {
+                product_id: {"matches": matches, "stats": stats}
+                for product_id, (matches, stats) in results.items()
+            },
+            "missing": missing
+        }
+
+    # --- HTTP plumbing ---
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Any]:
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        path = url.path.rstrip('/') or '/'
+
+        handler = self._routes.get((method, path))
+        if handler is None:
+            if any(route_path == path for _, route_path in self._routes):
+                return 405, {"error": f"Method {method} not allowed for {path}"}
+            return 404, {"error": f"Unknown path {path}"}
+        try:
+            return 200, await handler(query, body)
+        except HTTPError as e:
+            return e.status, {"error": e.message}
+        except Exception as e:
+            logger.exception("Error handling %s %s", method, path)
+            return 500, {"error": f"Internal error: {e}"}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serves HTTP/1.1 requests on one connection, keeping it alive between requests."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode('latin-1').split()
+                length = headers.get('content-length', '0')
+                if len(parts) != 3 or not length.isdigit():
+                    status, payload, keep_alive = 400, {"error": "Malformed request"}, False
+                elif int(length) > MAX_BODY_BYTES:
+                    status, payload, keep_alive = 413, {"error": "Request body too large"}, False
+                else:
+                    method, target, version = parts
+                    body = await reader.readexactly(int(length)) if int(length) else b''
+                    status, payload = await self._dispatch(method.upper(), target, body)
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                self.requests_served += 1
+                self.errors += status >= 400
+                data = json.dumps(_json_ready(payload), default=_json_default, allow_nan=False).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the Zero Waste AI matching service.")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--inventory', help="Inventory CSV or .zwcol table")
+    parser.add_argument('--ngos', help="NGO CSV or .zwcol table")
+    parser.add_argument('--window-ms', type=float, default=BATCH_WINDOW_MS)
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--instrument', action='store_true', help="Record per-stage engine metrics")
+    parser.add_argument('--log-json', help="Write structured JSON log lines to this file")
+    parser.add_argument('--trace-items', action='store_true', help="Log every per-item matching message")
+    args = parser.parse_args(argv)
+
+    configure_logging(json_path=args.log_json, trace_items=args.trace_items)
+
+    service = MatchingService(
+        RedistributionEngine(args.inventory, args.ngos, instrument=args.instrument),
+        host=args.host,
+        port=args.port,
+        window_ms=args.window_ms,
+        max_batch_size=args.max_batch_size
+    )
+    try:
+        asyncio.run(service.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,425 @@
+"""
+Zero Waste AI - Sharded Engine Execution
+
+Runs batch matching for a `RedistributionEngine` on a process pool, one shard
+per region. Inventory is partitioned by `location` (or `store_id`); each shard
+is matched against only the NGOs that can lie within its categories' maximum
+distance, so most categories never look beyond their own city. Items of
+long-distance categories (above `LOCAL_MAX_DISTANCE_KM`, e.g. Pantry at 500 km)
+go to cross-shard fallback tasks that see every NGO.
+
+The NGO coordinate, category and score arrays are published once per NGO
+snapshot in a shared memory block that workers map read-only instead of
+receiving a pickled copy per task. Workers score, rank and build each item's
+finished (matches, stats) result, the same as
+`RedistributionEngine.find_best_matches_batch`; the parent only stores them in
+task order.
+
+    python -m backend.sharding --workers 8 --warning-level monitor
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.engine import MATCHING_WEIGHTS, RedistributionEngine, _build_block_results, _order_pairs
+from backend.logs import configure_logging
+from backend.registry import NGOIndex
+from backend.utils import haversine_distance_matrix_radians, haversine_distances
+
+# Categories with a larger max_distance_km are matched by the cross-shard fallback
+LOCAL_MAX_DISTANCE_KM = 200
+
+# Default inventory column shards are keyed on
+DEFAULT_SHARD_COLUMN = 'location'
+
+# Item x NGO distance matrix entries computed at once by a worker
+PAIR_BLOCK_SIZE = 1_000_000
+
+# Tasks per worker, so large regions are split and the pool stays balanced
+TASKS_PER_WORKER = 4
+
+# Slack added to the shard radius bound so float rounding never drops an in-range NGO
+SHARD_RADIUS_SLACK_KM = 1.0
+
+# NGO arrays published to the workers
+SHARED_NGO_FIELDS = (
+    'lat_rad', 'lon_rad', 'category_masks', 'capacity', 'capacity_scores', 'category_focus_scores'
+)
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class SharedNGOArrays:
+    """
+    Read-only NGO arrays of one `NGOIndex` snapshot in a shared memory block.
+
+    `layout` is the small picklable description (block name plus offset, dtype and
+    shape per field) that tasks carry; workers map the block with `attach_arrays`.
+    The NGO records are stored pickled in the `records` field, for `attach_records`.
+    """
+    shm: SharedMemory
+    layout: Dict[str, Any]
+
+    @classmethod
+    def publish(cls, ngo: NGOIndex) -> 'SharedNGOArrays':
+        arrays = {name: np.ascontiguousarray(getattr(ngo, name)) for name in SHARED_NGO_FIELDS}
+        arrays['records'] = np.frombuffer(pickle.dumps(ngo.records, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+        fields, offset = {}, 0
+        for name, values in arrays.items():
+            offset = -(-offset // 8) * 8  # Keep every array 8-byte aligned
+            fields[name] = (offset, values.dtype.str, values.shape)
+            offset += values.nbytes
+
+        shm = SharedMemory(create=True, size=max(offset, 1))
+        for name, values in arrays.items():
+            start, dtype, shape = fields[name]
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)[...] = values
+        return cls(shm=shm, layout={"name": shm.name, "fields": fields})
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+# Shared memory blocks mapped by this worker process, by name
+_attached: Dict[str, Tuple[SharedMemory, Dict[str, np.ndarray]]] = {}
+
+# NGO records of the mapped block, unpickled on first use
+_attached_records: Dict[str, list] = {}
+
+def attach_arrays(layout: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Maps a published NGO block in a worker, reusing the mapping across tasks."""
+    entry = _attached.get(layout['name'])
+    if entry is None:
+        # A new block means the NGO snapshot changed; drop mappings of older ones
+        for shm, _ in _attached.values():
+            shm.close()
+        _attached.clear()
+        _attached_records.clear()
+
+        # Pool workers share the parent's resource tracker, so the parent's unlink is the only one
+        shm = SharedMemory(name=layout['name'])
+        arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            for name, (offset, dtype, shape) in layout['fields'].items()
+        }
+        entry = _attached[layout['name']] = (shm, arrays)
+    return entry[1]
+
+def attach_records(layout: Dict[str, Any]) -> list:
+    """Returns the NGO records of a published block in a worker, unpickling them once."""
+    arrays = attach_arrays(layout)
+    records = _attached_records.get(layout['name'])
+    if records is None:
+        records = _attached_records[layout['name']] = pickle.loads(arrays['records'].tobytes())
+    return records
+
+@dataclass
+class ShardTask:
+    """
+    A block of items from one region and the NGO rows they may match.
+
+    Item arrays are aligned with `item_rows`, the items' positions in the evaluated batch.
+    `top_k` and `as_records` select the result format, as in `find_best_matches`.
+    """
+    layout: Dict[str, Any]
+    ngo_rows: np.ndarray
+    item_rows: np.ndarray
+    latitudes: np.ndarray
+    longitudes: np.ndarray
+    max_distances: np.ndarray
+    urgency_multipliers: np.ndarray
+    category_bits: np.ndarray
+    freshness: np.ndarray
+    warning_levels: np.ndarray
+    days_remaining: np.ndarray
+    top_k: Optional[int] = 3
+    as_records: bool = False
+    shard: Any = field(default=None)
+
+def match_shard(task: ShardTask) -> List[Tuple[Any, Dict[str, Any]]]:
+    """
+    Scores every in-range, category-compatible NGO for the items of a task and
+    builds their finished results.
+
+    Runs in a worker process. Distances and scores follow `_score_item_block`
+    exactly; the NGO candidates are filtered with dense distance blocks instead
+    of a BallTree, since a shard's NGO set is small. `MatchSet` results come back
+    without `ngo_records`, which the parent attaches, so records are never pickled
+    per item.
+
+    Returns:
+        list: One (matches, stats) tuple per item, aligned with `task.item_rows`
+    """
+    arrays = attach_arrays(task.layout)
+    pairs = []
+    for bit in np.unique(task.category_bits):
+        items = np.flatnonzero(task.category_bits == bit)
+        ngo_rows = task.ngo_rows[(arrays['category_masks'][task.ngo_rows] >> np.uint64(bit)) & np.uint64(1) == 1]
+        if len(ngo_rows) == 0:
+            continue
+
+        block = max(1, PAIR_BLOCK_SIZE // len(ngo_rows))
+        for start in range(0, len(items), block):
+            rows = items[start:start + block]
+            dist = haversine_distance_matrix_radians(
+                np.radians(task.latitudes[rows]), np.radians(task.longitudes[rows]),
+                arrays['lat_rad'][ngo_rows], arrays['lon_rad'][ngo_rows]
+            )
+            local_items, local_ngos = np.nonzero(dist <= task.max_distances[rows, None])
+            pair_items = rows[local_items]
+            pair_ngos = ngo_rows[local_ngos]
+            dist = dist[local_items, local_ngos]
+
+            distance_scores = 1 - (dist / task.max_distances[pair_items])
+            match_scores = task.urgency_multipliers[pair_items] * (
+                MATCHING_WEIGHTS['distance'] * distance_scores +
+                MATCHING_WEIGHTS['capacity'] * arrays['capacity_scores'][pair_ngos] +
+                MATCHING_WEIGHTS['category_focus'] * arrays['category_focus_scores'][pair_ngos]
+            )
+            pairs.append((pair_items, pair_ngos, dist, distance_scores, match_scores))
+
+    if pairs:
+        pair_items, pair_ngos, dist, distance_scores, match_scores = (np.concatenate(values) for values in zip(*pairs))
+        order = _order_pairs(pair_items, pair_ngos, match_scores)
+        pair_items, pair_ngos, dist, distance_scores, match_scores = (
+            pair_items[order], pair_ngos[order], dist[order], distance_scores[order], match_scores[order]
+        )
+    else:
+        pair_items, pair_ngos = np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        dist, distance_scores, match_scores = np.empty(0), np.empty(0), np.empty(0)
+
+    return _build_block_results(
+        pair_items, pair_ngos, dist, distance_scores, match_scores, len(task.item_rows),
+        arrays['capacity'], arrays['capacity_scores'], arrays['category_focus_scores'],
+        task.freshness, task.warning_levels, task.days_remaining,
+        task.top_k, task.as_records, [] if task.as_records else attach_records(task.layout)
+    )
+
+class ShardedMatcher:
+    """
+    Sharded, multi-process batch matching for a shared `RedistributionEngine`.
+
+    Results are identical to `find_best_matches_batch` and come back in item order
+    regardless of the number of workers. The process pool and the shared NGO block
+    live until `close` (or the end of a `with` block) and the block is republished
+    whenever the engine's NGO snapshot changes.
+    """
+
+    def __init__(
+        self,
+        engine: RedistributionEngine,
+        max_workers: Optional[int] = None,
+        shard_column: str = DEFAULT_SHARD_COLUMN,
+        local_max_distance_km: float = LOCAL_MAX_DISTANCE_KM
+    ):
+        self.engine = engine
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.shard_column = shard_column
+        self.local_max_distance_km = local_max_distance_km
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._shared: Optional[SharedNGOArrays] = None
+        self._shared_index: Optional[NGOIndex] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> 'ShardedMatcher':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shuts the process pool down and releases the shared NGO block."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            if self._shared is not None:
+                self._shared.close()
+                self._shared = None
+                self._shared_index = None
+
+    def _publish(self, ngo: NGOIndex) -> Dict[str, Any]:
+        """Returns the shared block layout for an NGO snapshot, publishing it if needed."""
+        if self._shared_index is not ngo:
+            if self._shared is not None:
+                self._shared.close()
+            self._shared = SharedNGOArrays.publish(ngo)
+            self._shared_index = ngo
+        return self._shared.layout
+
+    def plan_shards(self, items_df: pd.DataFrame, evaluation: Dict[str, Any], ngo: NGOIndex,
+                    layout: Dict[str, Any], top_k: Optional[int] = 3,
+                    as_records: bool = False) -> List[ShardTask]:
+        """
+        Partitions the matchable items into region tasks and cross-shard fallback tasks.
+
+        A region's NGO rows are those within its bounding circle (centroid plus the
+        distance to its farthest item) widened by its largest category radius, which
+        contains every NGO any of its items can reach.
+        """
+        categories = evaluation['categories']
+        category_bits = np.array([ngo.category_bits.get(category, -1) for category in categories], dtype=np.int64)
+        matchable = np.flatnonzero(
+            evaluation['eligible']
+            & np.array([len(ngo.compatible_rows(category)) > 0 for category in categories], dtype=bool)
+        )
+        if len(matchable) == 0:
+            return []
+
+        max_distances = evaluation['max_distances']
+        long_distance = max_distances[matchable] > self.local_max_distance_km
+        task_size = max(1, math.ceil(len(matchable) / (self.max_workers * TASKS_PER_WORKER)))
+
+        def make_tasks(rows, ngo_rows, shard):
+            return [
+                ShardTask(
+                    layout=layout,
+                    ngo_rows=ngo_rows,
+                    item_rows=block,
+                    latitudes=evaluation['latitudes'][block],
+                    longitudes=evaluation['longitudes'][block],
+                    max_distances=max_distances[block],
+                    urgency_multipliers=evaluation['urgency_multipliers'][block],
+                    category_bits=category_bits[block],
+                    freshness=evaluation['freshness'][block],
+                    warning_levels=evaluation['warning_levels'][block],
+                    days_remaining=evaluation['days_remaining'][block],
+                    top_k=top_k,
+                    as_records=as_records,
+                    shard=shard
+                )
+                for block in (rows[start:start + task_size] for start in range(0, len(rows), task_size))
+            ]
+
+        tasks = []
+        local_rows = matchable[~long_distance]
+        if self.shard_column in items_df:
+            codes, shard_keys = pd.factorize(items_df[self.shard_column].to_numpy()[local_rows], use_na_sentinel=False)
+        else:
+            codes, shard_keys = np.zeros(len(local_rows), dtype=np.intp), [None]
+
+        for code, key in enumerate(shard_keys):
+            rows = local_rows[codes == code]
+            if len(rows) == 0:
+                continue
+            latitudes = evaluation['latitudes'][rows]
+            longitudes = evaluation['longitudes'][rows]
+            center_lat, center_lon = latitudes.mean(), longitudes.mean()
+            radius = haversine_distances(center_lat, center_lon, latitudes, longitudes).max()
+            reach = radius + max_distances[rows].max() + SHARD_RADIUS_SLACK_KM
+            ngo_rows = np.flatnonzero(haversine_distances(center_lat, center_lon, ngo.lats, ngo.lons) <= reach)
+            tasks.extend(make_tasks(rows, ngo_rows, key))
+
+        # Long-distance categories can reach other regions' NGOs
+        fallback_rows = matchable[long_distance]
+        if len(fallback_rows):
+            tasks.extend(make_tasks(fallback_rows, np.arange(len(ngo.ngos_df), dtype=np.intp), 'cross_shard'))
+        return tasks
+
+    def find_best_matches(
+        self, items_df: pd.DataFrame, top_k: Optional[int] = 3, as_of=None, as_records: bool = False
+    ) -> Dict[Any, Tuple[Any, Dict[str, Any]]]:
+        """
+        Finds the best NGO matches for many items on the process pool.
+
+        Args:
+            items_df (pd.DataFrame): Items to redistribute, with the inventory columns.
+            top_k (int, optional): Number of matches to return per item. None returns all.
+            as_of (date or datetime, optional): The date to evaluate freshness at. Defaults to today.
+            as_records (bool): Return a `MatchSet` per item instead of a list of dicts.
+
+        Returns:
+            dict: product_id -> (matches, stats), in item order and in the same format
+                as `RedistributionEngine.find_best_matches_batch`
+        """
+        if items_df.empty:
+            return {}
+
+        engine = self.engine
+        ngo = engine._ngo_index
+        items_df = items_df.reset_index(drop=True)
+        product_ids = items_df['product_id'].to_numpy()
+        evaluation = engine._evaluate_items(items_df, as_of)
+
+        results = {}
+        engine._record_unmatched_items(ngo, evaluation, product_ids, as_records, results)
+
+        with self._lock:
+            tasks = self.plan_shards(items_df, evaluation, ngo, self._publish(ngo), top_k, as_records)
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            # map() yields in submission order, so the merge does not depend on scheduling
+            for task, block_results in zip(tasks, self._executor.map(match_shard, tasks)):
+                with engine.instrumentation.stage('serialization', len(task.item_rows)):
+                    for i, (matches, stats) in zip(task.item_rows, block_results):
+                        if as_records:
+                            matches.ngo_records = ngo.records
+                        results[product_ids[i]] = (matches, stats)
+
+        engine._log_batch_outcomes("Sharded matching", results, len(ngo.ngos_df))
+        return {product_id: results[product_id] for product_id in product_ids if product_id in results}
+
+    def match_candidates(
+        self, warning_level: str = 'warning', as_of=None, top_k: Optional[int] = 3
+    ) -> Tuple[pd.DataFrame, Dict[Any, Tuple[Any, Dict[str, Any]]]]:
+        """
+        Runs a full cycle: selects redistribution candidates and matches them on the pool.
+
+        Returns:
+            tuple: (candidates_df, results) with results as in `find_best_matches`
+        """
+        candidates, _ = self.engine.get_redistribution_candidates(warning_level, as_of=as_of)
+        if candidates.empty:
+            return candidates, {}
+        return candidates, self.find_best_matches(candidates, top_k=top_k, as_of=as_of)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Time a sharded matching cycle against the batch path.")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--shard-column', default=DEFAULT_SHARD_COLUMN, help="location or store_id")
+    parser.add_argument('--warning-level', default='warning')
+    parser.add_argument('--as-of', help="As-of date (YYYY-MM-DD)")
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--inventory', help="Inventory CSV or .zwcol table")
+    parser.add_argument('--ngos', help="NGO CSV or .zwcol table")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    engine = RedistributionEngine(args.inventory, args.ngos)
+    candidates, _ = engine.get_redistribution_candidates(args.warning_level, as_of=args.as_of)
+
+    started = time.perf_counter()
+    expected = engine.find_best_matches_batch(candidates, top_k=args.top_k, as_of=args.as_of)
+    batch_s = time.perf_counter() - started
+
+    with ShardedMatcher(engine, max_workers=args.workers, shard_column=args.shard_column) as matcher:
+        matcher.find_best_matches(candidates.head(1), top_k=args.top_k, as_of=args.as_of)  # Start the pool
+        started = time.perf_counter()
+        results = matcher.find_best_matches(candidates, top_k=args.top_k, as_of=args.as_of)
+        sharded_s = time.perf_counter() - started
+        workers = matcher.max_workers
+
+    print(json.dumps({
+        "items": len(candidates),
+        "workers": workers,
+        "batch_s": round(batch_s, 3),
+        "sharded_s": round(sharded_s, 3),
+        "speedup": round(batch_s / sharded_s, 2) if sharded_s else None,
+        "identical": {key: results[key][0] for key in results} == {key: expected[key][0] for key in expected}
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
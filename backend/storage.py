@@ -0,0 +1,318 @@
+"""
+Zero Waste AI - Columnar Storage Backend
+
+Stores inventory and NGO tables as a directory of typed NumPy column files
+(`<name>.zwcol/`) that can be memory-mapped, so processes start without
+re-parsing CSV text and scans only touch the columns they need:
+
+    <name>.zwcol/
+        manifest.json       # row count, column kinds, category labels, source CSV stamp
+        <column>.npy        # one array per column
+
+Convert the existing CSVs once with:
+
+    python -m backend.storage data/mock_inventory.csv data/mock_ngos.csv
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+COLUMNAR_SUFFIX = '.zwcol'
+MANIFEST_FILE = 'manifest.json'
+FORMAT_VERSION = 1
+
+# Columns stored as datetime64[ns]
+DATE_COLUMNS = ('stock_date', 'expiry_date')
+
+# Low-cardinality text columns stored as integer codes plus labels
+CATEGORICAL_COLUMNS = ('product_name', 'category', 'storage_type', 'store_id', 'location')
+
+# Float columns kept in float64 so distances match the CSV-loaded values exactly
+FLOAT64_COLUMNS = ('latitude', 'longitude')
+
+def columnar_path(csv_path: str) -> str:
+    """Return the columnar directory path used for a CSV file."""
+    root, _ = os.path.splitext(csv_path)
+    return root + COLUMNAR_SUFFIX
+
+def is_columnar(path: str) -> bool:
+    """Check whether a path is a columnar table directory."""
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+def _source_stamp(csv_path: str) -> Dict[str, Any]:
+    """Identify the CSV a columnar table was converted from."""
+    stat = os.stat(csv_path)
+    return {'path': os.path.abspath(csv_path), 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+def _read_manifest(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+def parse_date_values(values: Any) -> pd.Series:
+    """
+    Parse ISO date strings (or datetimes) into a naive datetime64[ns] Series.
+
+    Timezone-aware values keep their local wall time, like `datetime.fromisoformat`.
+    Already parsed datetime64 values are returned without re-parsing.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values, copy=False)
+    if not pd.api.types.is_datetime64_any_dtype(series):
+        series = pd.to_datetime(series, format='ISO8601')
+    if series.dt.tz is not None:
+        series = series.dt.tz_localize(None)
+    return series
+
+def parse_date_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse the `DATE_COLUMNS` of a table in place, so downstream code never sees ISO strings.
+
+    Returns:
+        The same DataFrame, with datetime64[ns] date columns.
+    """
+    for name in DATE_COLUMNS:
+        if name in df and not pd.api.types.is_datetime64_dtype(df[name]):
+            df[name] = parse_date_values(df[name])
+    return df
+
+def write_columnar(df: pd.DataFrame, path: str, source: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Write a DataFrame as a columnar table directory.
+
+    Date columns become datetime64[ns], categorical columns become int32 codes,
+    other floats become float32 (coordinates stay float64) and remaining text
+    becomes fixed-width unicode so every column can be memory-mapped.
+
+    Args:
+        df: The table to write.
+        path: Target `.zwcol` directory; replaced if it exists.
+        source: Optional stamp of the CSV the table was converted from.
+
+    Returns:
+        The path written.
+    """
+    staging = path + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    columns = []
+    for position, name in enumerate(df.columns):
+        series = df[name]
+        spec: Dict[str, Any] = {'name': name, 'file': f'{position:03d}.npy'}
+
+        if name in DATE_COLUMNS:
+            spec['kind'] = 'datetime'
+            values = parse_date_values(series).to_numpy(dtype='datetime64[ns]')
+        elif name in CATEGORICAL_COLUMNS:
+            categorical = pd.Categorical(series)
+            spec['kind'] = 'category'
+            spec['categories'] = [str(c) for c in categorical.categories]
+            values = categorical.codes.astype(np.int32)
+        elif pd.api.types.is_float_dtype(series):
+            spec['kind'] = 'float'
+            values = series.to_numpy(dtype=np.float64 if name in FLOAT64_COLUMNS else np.float32)
+        elif pd.api.types.is_integer_dtype(series) or pd.api.types.is_bool_dtype(series):
+            spec['kind'] = 'int'
+            values = series.to_numpy()
+        else:
+            spec['kind'] = 'string'
+            values = series.fillna('').astype(str).to_numpy(dtype=str)
+
+        np.save(os.path.join(staging, spec['file']), values, allow_pickle=False)
+        columns.append(spec)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'rows': len(df),
+        'columns': columns,
+        'source': source
+    }
+    with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+    return path
+
+def convert_csv_to_columnar(csv_path: str, out_path: Optional[str] = None) -> str:
+    """
+    One-time conversion of a CSV table to the columnar format.
+
+    Args:
+        csv_path: Source CSV file.
+        out_path: Target directory. Defaults to the CSV path with a `.zwcol` suffix.
+
+    Returns:
+        The path written.
+    """
+    return write_columnar(
+        pd.read_csv(csv_path),
+        out_path or columnar_path(csv_path),
+        source=_source_stamp(csv_path)
+    )
+
+def _load_column(path: str, spec: Dict[str, Any], mmap: bool, rows: Optional[slice] = None) -> Any:
+    """
+    Load one column, optionally memory-mapped and sliced to a row range.
+
+    Maps are copy-on-write: callers may modify the column in place without
+    touching the file.
+    """
+    values = np.load(os.path.join(path, spec['file']), mmap_mode='c' if mmap else None, allow_pickle=False)
+    if rows is not None:
+        values = values[rows]
+
+    if spec['kind'] == 'category':
+        return pd.Categorical.from_codes(np.asarray(values), categories=spec['categories'])
+    if spec['kind'] == 'string':
+        return np.asarray(values).astype(object)
+    return values
+
+def read_columnar(
+    path: str,
+    columns: Optional[Sequence[str]] = None,
+    mmap: bool = True,
+    rows: Optional[slice] = None
+) -> pd.DataFrame:
+    """
+    Read a columnar table.
+
+    Args:
+        path: The `.zwcol` directory.
+        columns: Optional subset of columns to load (column projection).
+        mmap: Memory-map the column files instead of reading them into memory.
+        rows: Optional slice of rows to load.
+
+    Returns:
+        DataFrame with typed datetime64, categorical and numeric columns.
+    """
+    manifest = _read_manifest(path)
+    specs = manifest['columns']
+    if columns is not None:
+        wanted = set(columns)
+        specs = [spec for spec in specs if spec['name'] in wanted]
+
+    # copy=False keeps one block per column instead of consolidating (copying) the
+    # columns into 2-D blocks, so memory-mapped columns stay backed by their files
+    return pd.DataFrame(
+        {spec['name']: _load_column(path, spec, mmap, rows) for spec in specs},
+        copy=False
+    )
+
+def _fresh_columnar_for(csv_path: str) -> Optional[str]:
+    """Return the converted table for a CSV if one exists and matches the CSV on disk."""
+    path = columnar_path(csv_path)
+    if not is_columnar(path) or not os.path.exists(csv_path):
+        return None
+    source = _read_manifest(path).get('source') or {}
+    current = _source_stamp(csv_path)
+    if source.get('mtime_ns') == current['mtime_ns'] and source.get('size') == current['size']:
+        return path
+    return None
+
+def resolve_table(path: str, prefer_columnar: bool = True) -> str:
+    """
+    Resolve the file actually read for a table path.
+
+    A CSV path resolves to its `.zwcol` sibling when that was converted from the
+    current version of the CSV; otherwise the path is returned unchanged.
+    """
+    if prefer_columnar and not is_columnar(path):
+        return _fresh_columnar_for(path) or path
+    return path
+
+def read_table(
+    path: str,
+    columns: Optional[Sequence[str]] = None,
+    prefer_columnar: bool = True,
+    parse_dates: bool = True
+) -> pd.DataFrame:
+    """
+    Read an inventory or NGO table from CSV or columnar storage.
+
+    Args:
+        path: CSV file or `.zwcol` directory.
+        columns: Optional subset of columns to load.
+        prefer_columnar: Read an up-to-date `.zwcol` sibling of a CSV instead of the CSV.
+        parse_dates: Parse CSV date columns into datetime64 (columnar tables store them parsed).
+
+    Returns:
+        The table as a DataFrame.
+    """
+    path = resolve_table(path, prefer_columnar)
+    if is_columnar(path):
+        return read_columnar(path, columns=columns)
+    df = pd.read_csv(path, usecols=columns)
+    return parse_date_columns(df) if parse_dates else df
+
+def iter_table_chunks(
+    path: str,
+    chunksize: int,
+    columns: Optional[Sequence[str]] = None,
+    prefer_columnar: bool = True,
+    parse_dates: bool = True
+) -> Iterator[pd.DataFrame]:
+    """
+    Read a table in chunks of `chunksize` rows from CSV or columnar storage.
+
+    Columnar tables are sliced from memory-mapped columns, so only the current
+    chunk is materialized. CSV date columns are parsed per chunk unless
+    `parse_dates` is False.
+    """
+    path = resolve_table(path, prefer_columnar)
+    if is_columnar(path):
+        total_rows = _read_manifest(path)['rows']
+        for start in range(0, total_rows, chunksize):
+            chunk = read_columnar(path, columns=columns, rows=slice(start, start + chunksize))
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            yield chunk
+    else:
+        with pd.read_csv(path, chunksize=chunksize, usecols=columns) as reader:
+            for chunk in reader:
+                yield parse_date_columns(chunk) if parse_dates else chunk
+
+def _table_files(path: str) -> List[str]:
+    """List the files making up a CSV or columnar table."""
+    if is_columnar(path):
+        return sorted(os.path.join(path, name) for name in os.listdir(path))
+    return [path]
+
+def table_fingerprint(path: str, prefer_columnar: bool = True) -> Dict[str, Any]:
+    """
+    Cheap change stamp of a table: the file actually read plus the mtime and size
+    of each of its files. Raises FileNotFoundError if the table does not exist.
+    """
+    path = resolve_table(path, prefer_columnar)
+    files = []
+    for file_path in _table_files(path):
+        stat = os.stat(file_path)
+        files.append([os.path.basename(file_path), stat.st_mtime_ns, stat.st_size])
+    return {'path': os.path.abspath(path), 'files': files}
+
+def table_digest(path: str, prefer_columnar: bool = True) -> str:
+    """Content hash of a table, used to tell real edits from touched files."""
+    digest = hashlib.blake2b(digest_size=16)
+    for file_path in _table_files(resolve_table(path, prefer_columnar)):
+        digest.update(os.path.basename(file_path).encode())
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def main(argv: List[str]) -> None:
+    """Convert each CSV given on the command line to the columnar format."""
+    if not argv:
+        print("Usage: python -m backend.storage <file.csv> [<file.csv> ...]")
+        return
+    for csv_path in argv:
+        out_path = convert_csv_to_columnar(csv_path)
+        print(f"Converted {csv_path} -> {out_path}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -5,6 +5,11 @@ Zero Waste AI - Backend Utilities
 from math import radians, sin, cos, sqrt, atan2
 from typing import Tuple
 
+import numpy as np
+
+# Mean Earth radius in kilometers
+EARTH_RADIUS_KM = 6371
+
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Calculate distance between two points on Earth using Haversine formula.
@@ -25,6 +30,80 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     
     return radius * c
 
+def haversine_distances(
+    lats1: np.ndarray,
+    lons1: np.ndarray,
+    lats2: np.ndarray,
+    lons2: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized Haversine distances between paired points (NumPy broadcasting rules apply).
+    Returns distances in kilometers.
+    """
+    # Convert decimal degrees to radians
+    return haversine_distances_radians(*(
+        np.radians(np.asarray(values, dtype=np.float64))
+        for values in (lats1, lons1, lats2, lons2)
+    ))
+
+def haversine_distances_radians(
+    lats1: np.ndarray,
+    lons1: np.ndarray,
+    lats2: np.ndarray,
+    lons2: np.ndarray
+) -> np.ndarray:
+    """
+    `haversine_distances` for coordinates already in radians, e.g. the
+    precomputed NGO arrays of `backend.registry.NGOIndex`.
+    Returns distances in kilometers.
+    """
+    # Haversine formula
+    dlat = lats2 - lats1
+    dlon = lons2 - lons1
+
+    a = np.sin(dlat/2)**2 + np.cos(lats1) * np.cos(lats2) * np.sin(dlon/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+
+    # Earth's radius in kilometers
+    radius = 6371
+
+    return radius * c
+
+def haversine_distance_matrix(
+    lats1: np.ndarray,
+    lons1: np.ndarray,
+    lats2: np.ndarray,
+    lons2: np.ndarray
+) -> np.ndarray:
+    """
+    Vectorized Haversine distances between every point in the first set
+    and every point in the second set.
+    Returns an (n1, n2) matrix of distances in kilometers.
+    """
+    return haversine_distances(
+        np.asarray(lats1, dtype=np.float64)[:, None],
+        np.asarray(lons1, dtype=np.float64)[:, None],
+        np.asarray(lats2, dtype=np.float64)[None, :],
+        np.asarray(lons2, dtype=np.float64)[None, :]
+    )
+
+def haversine_distance_matrix_radians(
+    lats1: np.ndarray,
+    lons1: np.ndarray,
+    lats2: np.ndarray,
+    lons2: np.ndarray
+) -> np.ndarray:
+    """
+    `haversine_distance_matrix` for coordinates already in radians.
+    Returns an (n1, n2) matrix of distances in kilometers.
+    """
+    return haversine_distances_radians(
+        np.asarray(lats1, dtype=np.float64)[:, None],
+        np.asarray(lons1, dtype=np.float64)[:, None],
+        np.asarray(lats2, dtype=np.float64)[None, :],
+        np.asarray(lons2, dtype=np.float64)[None, :]
+    )
+
 def estimate_co2_savings(distance_km: float) -> float:
     """
     Estimate CO2 emissions savings in kg for a given distance.
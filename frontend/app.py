@@ -3,7 +3,6 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
 import sys
 from pathlib import Path
 
@@ -14,7 +13,8 @@ if project_root not in sys.path:
 
 # Import custom modules
 from backend.engine import RedistributionEngine
-from ml.utils import analyze_item_risk, get_risk_recommendation
+from backend.logs import configure_logging
+from ml.utils import analyze_item_risk, days_until_expiry, get_risk_recommendation
 
 # Page config
 st.set_page_config(
@@ -26,10 +26,14 @@ st.set_page_config(
 # Initialize engine
 @st.cache_resource
 def get_engine():
+    configure_logging()
     return RedistributionEngine()
 
 engine = get_engine()
 
+# Apply inventory/NGO changes since the last run as row-level deltas
+engine.reload()
+
 # Sidebar
 st.sidebar.title("Zero Waste AI")
 st.sidebar.markdown("### Navigation")
@@ -38,12 +42,10 @@ page = st.sidebar.radio(
     ["Overview", "Inventory Analysis", "NGO Network", "Route Planning"]
 )
 
-# Load data
-@st.cache_data
+# Load data (shared with the engine so reloaded rows show up without re-reading the files;
+# NGOs come from the process-wide registry the engine reads from)
 def load_data():
-    inventory_df = pd.read_csv('data/mock_inventory.csv')
-    ngos_df = pd.read_csv('data/mock_ngos.csv')
-    return inventory_df, ngos_df
+    return engine.inventory_df, engine.ngo_registry.ngos_df
 
 inventory_df, ngos_df = load_data()
 
@@ -131,22 +133,14 @@ elif page == "Inventory Analysis":
     if selected_category != 'All':
         filtered_df = filtered_df[filtered_df['category'] == selected_category]
     
+    # Days until expiry for every item at once, from the dates parsed at load
+    if 'days_until_expiry' not in filtered_df:
+        # assign() returns a new frame, so a filtered slice is never written to
+        filtered_df = filtered_df.assign(days_until_expiry=days_until_expiry(filtered_df['expiry_date']))
+
     # Analyze items
     for _, item in filtered_df.iterrows():
-        # Ensure days_until_expiry is present
-        if 'days_until_expiry' not in item or pd.isnull(item['days_until_expiry']):
-            try:
-                stock_date = pd.to_datetime(item['stock_date'])
-                expiry_date = pd.to_datetime(item['expiry_date'])
-                days_until_expiry = (expiry_date - datetime.now()).days
-            except Exception:
-                days_until_expiry = None
-        else:
-            days_until_expiry = item['days_until_expiry']
-        
-        # Create a copy of item as dict and add days_until_expiry
         item_dict = item.to_dict()
-        item_dict['days_until_expiry'] = days_until_expiry
         
         st.subheader(f"{item['product_name']} ({item['category']})")
         
@@ -234,8 +228,8 @@ elif page == "Route Planning":
         
         item = candidates_df[candidates_df['product_name'] == selected_item].iloc[0]
         
-        # Find best matches
-        matches, stats = engine.find_best_matches(item.to_dict())
+        # Find best matches (only the top 3 are displayed)
+        matches, stats = engine.find_best_matches(item.to_dict(), top_k=3)
         
         if matches:
             # Create route map
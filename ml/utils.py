@@ -52,16 +52,39 @@ def calculate_storage_code(storage_type):
     storage_types = ['Ambient', 'Refrigerated', 'Frozen']
     return storage_types.index(storage_type) if storage_type in storage_types else -1
 
+def days_until_expiry(expiry_dates, as_of=None):
+    """
+    Whole days from `as_of` (default: now) until each expiry date.
+
+    Accepts a single date or an array/Series of them, parsed (datetime64, Timestamp)
+    or as ISO strings; parsed columns are used without re-parsing.
+    """
+    as_of = pd.Timestamp.now() if as_of is None else pd.Timestamp(as_of)
+    if isinstance(expiry_dates, (pd.Series, np.ndarray, list)):
+        expiry = pd.Series(expiry_dates, copy=False)
+        if not pd.api.types.is_datetime64_any_dtype(expiry):
+            expiry = pd.to_datetime(expiry, format='ISO8601')
+        return (expiry - as_of).dt.days
+    return (pd.Timestamp(expiry_dates) - as_of).days
+
 def analyze_item_risk(item_data):
-    """Analyze risk factors for an item."""
+    """
+    Analyze risk factors for an item.
+
+    Uses `days_until_expiry` if the item has it, otherwise derives it from the
+    (pre-parsed) `expiry_date`.
+    """
     model, scaler = load_models()
+    remaining_days = item_data.get('days_until_expiry')
+    if remaining_days is None or pd.isnull(remaining_days):
+        remaining_days = days_until_expiry(item_data['expiry_date'])
     
     risk_prob = predict_spoilage_risk(
         model,
         scaler,
         item_data['temperature_c'],
         item_data['humidity_percent'],
-        item_data['days_until_expiry'],
+        remaining_days,
         calculate_category_code(item_data['category']),
         calculate_storage_code(item_data['storage_type'])
     )
@@ -69,7 +92,7 @@ def analyze_item_risk(item_data):
     risk_factors = {
         'temperature_risk': max(0, abs(item_data['temperature_c'] - 20) / 40),
         'humidity_risk': abs(item_data['humidity_percent'] - 60) / 100,
-        'time_risk': max(0, 1 - item_data['days_until_expiry'] / 30),
+        'time_risk': max(0, 1 - remaining_days / 30),
         'model_risk': risk_prob
     }
     
@@ -0,0 +1,95 @@
+"""
+Regression tests for `backend.assignment.solve_capacitated_assignment`, checked
+against an exhaustive solver on small instances.
+"""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from backend.assignment import _greedy_complete, solve_capacitated_assignment
+
+def _exact_best(edge_items, edge_ngos, edge_scores, item_weights, ngo_capacities):
+    """Best total score over every capacity-feasible assignment (each item: one edge or none)."""
+    options = [[-1] + list(np.flatnonzero(edge_items == i)) for i in range(len(item_weights))]
+    best = 0.0
+    for choice in itertools.product(*options):
+        load = np.zeros(len(ngo_capacities))
+        total = 0.0
+        for item, e in enumerate(choice):
+            if e >= 0:
+                load[edge_ngos[e]] += item_weights[item]
+                total += edge_scores[e]
+        if (load <= ngo_capacities + 1e-9).all():
+            best = max(best, total)
+    return best
+
+def _random_instance(rng, n_items, n_ngos, equal_weights):
+    pairs = [(i, j) for i in range(n_items) for j in range(n_ngos) if rng.random() < 0.7]
+    edge_items = np.array([i for i, _ in pairs], dtype=np.intp)
+    edge_ngos = np.array([j for _, j in pairs], dtype=np.intp)
+    edge_scores = rng.uniform(0.1, 1.0, len(pairs))
+    if equal_weights:
+        item_weights = np.full(n_items, 10.0)
+        ngo_capacities = rng.integers(1, 4, n_ngos) * 10.0
+    else:
+        item_weights = rng.integers(1, 40, n_items).astype(np.float64)
+        ngo_capacities = rng.integers(10, 60, n_ngos).astype(np.float64)
+    return edge_items, edge_ngos, edge_scores, item_weights, ngo_capacities
+
+def _check_feasible(assigned_edge, edge_items, edge_ngos, item_weights, ngo_capacities):
+    chosen = assigned_edge >= 0
+    assert (edge_items[assigned_edge[chosen]] == np.flatnonzero(chosen)).all()
+    load = np.bincount(edge_ngos[assigned_edge[chosen]], weights=item_weights[chosen], minlength=len(ngo_capacities))
+    assert (load <= ngo_capacities + 1e-9).all()
+
+def _total(assigned_edge, edge_scores):
+    return edge_scores[assigned_edge[assigned_edge >= 0]].sum()
+
+def test_no_usable_edge_leaves_every_item_unassigned():
+    assigned_edge, info = solve_capacitated_assignment(
+        np.array([0, 1]), np.array([0, 0]), np.array([0.9, 0.8]),
+        item_weights=np.array([5000.0, 5000.0]), ngo_capacities=np.array([100.0])
+    )
+    assert assigned_edge.tolist() == [-1, -1]
+    assert info["method"] == "none"
+
+@pytest.mark.parametrize("weight", [0.0, -5.0, np.nan])
+def test_non_positive_weights_are_rejected(weight):
+    with pytest.raises(ValueError, match="1 items"):
+        solve_capacitated_assignment(
+            np.array([0, 1]), np.array([0, 0]), np.array([0.9, 0.8]),
+            item_weights=np.array([10.0, weight]), ngo_capacities=np.array([100.0])
+        )
+
+def test_weighted_items_skip_past_an_item_that_does_not_fit():
+    # One 40 kg NGO: the two light items together beat the heavy best-scoring one
+    args = (np.array([0, 1, 2]), np.array([0, 0, 0]), np.array([0.65, 0.81, 0.96]),
+            np.array([5.0, 25.0, 40.0]), np.array([40.0]))
+    assigned_edge, _ = solve_capacitated_assignment(*args)
+    assert _total(assigned_edge, args[2]) == pytest.approx(_exact_best(*args))
+
+@pytest.mark.parametrize("seed", range(40))
+def test_equal_weights_are_within_epsilon_of_the_optimum(seed):
+    rng = np.random.default_rng(seed)
+    instance = _random_instance(rng, n_items=6, n_ngos=3, equal_weights=True)
+    epsilon = 1e-4
+    assigned_edge, _ = solve_capacitated_assignment(*instance, epsilon=epsilon)
+    _check_feasible(assigned_edge, instance[0], instance[1], instance[3], instance[4])
+    assert _total(assigned_edge, instance[2]) >= _exact_best(*instance) - len(instance[3]) * epsilon - 1e-9
+
+@pytest.mark.parametrize("seed", range(40))
+def test_weighted_plan_is_feasible_and_never_worse_than_greedy(seed):
+    rng = np.random.default_rng(1000 + seed)
+    edge_items, edge_ngos, edge_scores, item_weights, ngo_capacities = instance = _random_instance(
+        rng, n_items=6, n_ngos=2, equal_weights=False
+    )
+    assigned_edge, _ = solve_capacitated_assignment(*instance)
+    _check_feasible(assigned_edge, edge_items, edge_ngos, item_weights, ngo_capacities)
+
+    greedy_edge = np.full(len(item_weights), -1, dtype=np.intp)
+    _greedy_complete(edge_items, edge_ngos, edge_scores, item_weights, ngo_capacities.copy(), greedy_edge)
+    total = _total(assigned_edge, edge_scores)
+    assert total >= _total(greedy_edge, edge_scores) - 1e-9
+    assert total <= _exact_best(*instance) + 1e-9
@@ -0,0 +1,92 @@
+"""
+Regression tests for `backend.engine.FreshnessCrossingIndex`, checked against full
+freshness scoring of the inventory on every day of a range.
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.engine import (
+    CATEGORY_CONSTRAINTS, CROSSING_LEVELS, DEFAULT_CONSTRAINTS, WARNING_PRIORITIES,
+    RedistributionEngine, _epoch_day
+)
+from backend.registry import NGORegistry
+
+# Known categories with short and long shelf lives, plus one using the default constraints
+CATEGORIES = ['Meat', 'Dairy', 'Bakery', 'Fruit', 'FrozenDessert', 'Pantry', 'Spices']
+
+def _inventory(rng, n_items):
+    today = np.datetime64(date.today(), 'D')
+    stock = today - rng.integers(0, 40, n_items)
+    shelf_life = rng.integers(0, 120, n_items)
+    shelf_life[:5] = [0, 0, -3, 1, 365]  # No, negative, one-day and year-long shelf lives
+    return pd.DataFrame({
+        'product_id': [f"PROD-{1001 + i}" for i in range(n_items)],
+        'product_name': 'Item',
+        'category': rng.choice(CATEGORIES, n_items),
+        'stock_date': [f"{day}T08:00:00" for day in stock],
+        'expiry_date': [f"{day}T20:00:00" for day in stock + shelf_life],
+        'location': 'Mumbai',
+        'latitude': 19.07,
+        'longitude': 72.87,
+        'temperature_c': 4.0,
+        'humidity_percent': 60
+    })
+
+def _engine(tmp_path, seed):
+    path = tmp_path / 'inventory.csv'
+    _inventory(np.random.default_rng(seed), 300).to_csv(path, index=False)
+    ngos_df = pd.DataFrame({
+        'ngo_id': ['NGO-101'], 'ngo_name': ['NGO'], 'location': ['Mumbai'], 'latitude': [19.07],
+        'longitude': [72.87], 'capacity_kg': [100], 'accepted_categories': ['Meat|Dairy']
+    })
+    return RedistributionEngine(str(path), ngo_registry=NGORegistry(ngos_df=ngos_df), match_cache_size=0)
+
+def _brute_force_rows(scored, level):
+    """Rows at `level` or worse (or no longer redistributable) by scoring every item."""
+    if level == 'ineligible':
+        constraints = [CATEGORY_CONSTRAINTS.get(category, DEFAULT_CONSTRAINTS) for category in scored['category']]
+        min_freshness = np.array([c['min_freshness'] for c in constraints], dtype=np.float64)
+        min_days = np.array([c['min_days'] for c in constraints], dtype=np.int64)
+        return np.flatnonzero(
+            (scored['freshness'].to_numpy() < min_freshness) | (scored['days_remaining'].to_numpy() < min_days)
+        )
+    priorities = scored['warning_level'].map(WARNING_PRIORITIES).to_numpy()
+    return np.flatnonzero(priorities <= WARNING_PRIORITIES[level])
+
+@pytest.mark.parametrize("seed", range(3))
+def test_crossing_rows_match_full_scoring(tmp_path, seed):
+    engine = _engine(tmp_path, seed)
+    snapshot = engine._inventory
+    crossings = engine.crossing_index()
+    all_rows = np.arange(len(snapshot.df))
+    today = _epoch_day()
+
+    previous = None
+    for day in range(today - 5, today + 130):
+        scored = engine._score_rows(snapshot, all_rows, day)
+        at_day = {level: _brute_force_rows(scored, level) for level in CROSSING_LEVELS}
+        for level in CROSSING_LEVELS:
+            assert np.sort(crossings.rows_at(level, day)).tolist() == at_day[level].tolist()
+            if previous is not None:
+                # Levels are never left, so the crossings of one day are the new rows at the level
+                assert np.sort(crossings.rows_crossing(level, day - 1, day)).tolist() == sorted(
+                    set(at_day[level]) - set(previous[level])
+                )
+        previous = at_day
+
+@pytest.mark.parametrize("seed", range(3))
+def test_candidates_from_crossings_match_full_scoring(tmp_path, seed):
+    engine = _engine(tmp_path, seed)
+    snapshot = engine._inventory
+    all_rows = np.arange(len(snapshot.df))
+    today = _epoch_day()
+
+    for day in range(today - 5, today + 130, 3):
+        scored = engine._score_rows(snapshot, all_rows, day)
+        for level in WARNING_PRIORITIES:
+            candidates, _ = engine._candidates_from_crossings(snapshot, level, day)
+            pd.testing.assert_frame_equal(candidates, engine._select_candidates(scored, level))
@@ -0,0 +1,108 @@
+"""
+Regression tests for row-level delta reloads (`compute_table_delta` applied through
+`RedistributionEngine.reload`), checked against an engine built from scratch.
+"""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.engine import CROSSING_LEVELS, RedistributionEngine
+from backend.registry import NGORegistry
+
+CATEGORIES = ['Meat', 'Dairy', 'Bakery', 'Fruit', 'Pantry']
+
+# Days after today the engines are compared at (0 takes the refresh path, others the crossing index)
+AS_OF_OFFSETS = (0, 2, 5)
+
+def _inventory(rng, n_items, first_id):
+    today = np.datetime64(date.today(), 'D')
+    stock = today - rng.integers(1, 15, n_items)
+    return pd.DataFrame({
+        'product_id': [f"PROD-{first_id + i}" for i in range(n_items)],
+        'product_name': 'Item',
+        'category': rng.choice(CATEGORIES, n_items),
+        'stock_date': [f"{day}T08:00:00" for day in stock],
+        'expiry_date': [f"{day}T20:00:00" for day in stock + rng.integers(2, 30, n_items)],
+        'store_id': 'MUM-01',
+        'location': 'Mumbai',
+        'latitude': 19.07 + rng.uniform(-0.5, 0.5, n_items),
+        'longitude': 72.87 + rng.uniform(-0.5, 0.5, n_items),
+        'temperature_c': 4.0,
+        'humidity_percent': 60,
+        'quantity_kg': rng.integers(1, 20, n_items).astype(float)
+    })
+
+def _ngos(rng, n_ngos, first_id):
+    return pd.DataFrame({
+        'ngo_id': [f"NGO-{first_id + i}" for i in range(n_ngos)],
+        'ngo_name': 'NGO',
+        'location': 'Mumbai',
+        'latitude': 19.07 + rng.uniform(-0.6, 0.6, n_ngos),
+        'longitude': 72.87 + rng.uniform(-0.6, 0.6, n_ngos),
+        'capacity_kg': rng.integers(20, 300, n_ngos),
+        'accepted_categories': ['|'.join(rng.choice(CATEGORIES, 2, replace=False)) for _ in range(n_ngos)]
+    })
+
+def _edit(rng, df, new_rows, columns):
+    """Deletes and updates some rows in place and appends `new_rows`, in the order a delta keeps them."""
+    df = df.drop(index=rng.choice(df.index, 3, replace=False)).reset_index(drop=True)
+    updated = rng.choice(df.index, 4, replace=False)
+    replacements = new_rows.iloc[:len(updated)]
+    df.loc[updated, columns] = replacements[columns].to_numpy()
+    return pd.concat([df, new_rows.iloc[len(updated):]], ignore_index=True)
+
+def _engine(inventory_path, ngo_path):
+    return RedistributionEngine(str(inventory_path), ngo_registry=NGORegistry(str(ngo_path)), match_cache_size=0)
+
+def _snapshot_views(engine, as_of):
+    """Candidates, matches and upcoming crossings of an engine at one date."""
+    views = {}
+    for level in ('critical', 'warning', 'monitor'):
+        candidates, _ = engine.get_redistribution_candidates(level, as_of=as_of)
+        views[level] = candidates.reset_index(drop=True)
+        if not candidates.empty:
+            views[level, 'matches'] = engine.find_best_matches_batch(candidates, top_k=None, as_of=as_of)
+    for level in CROSSING_LEVELS:
+        views[level, 'crossings'] = engine.get_upcoming_crossings(level, days=7, as_of=as_of).reset_index(drop=True)
+    return views
+
+@pytest.mark.parametrize("seed", range(4))
+def test_delta_reload_matches_a_fresh_engine(tmp_path, seed):
+    rng = np.random.default_rng(seed)
+    inventory_path, ngo_path = tmp_path / 'inventory.csv', tmp_path / 'ngos.csv'
+    inventory_df, ngos_df = _inventory(rng, 60, 1001), _ngos(rng, 12, 101)
+    inventory_df.to_csv(inventory_path, index=False)
+    ngos_df.to_csv(ngo_path, index=False)
+
+    engine = _engine(inventory_path, ngo_path)
+    dates = [date.today() + timedelta(days=offset) for offset in AS_OF_OFFSETS]
+    for as_of in dates:
+        # Fill the freshness columns, crossing index and candidate caches the delta must patch
+        _snapshot_views(engine, as_of)
+
+    _edit(
+        rng, inventory_df, _inventory(rng, 10, 5001),
+        ['category', 'stock_date', 'expiry_date', 'latitude', 'longitude']
+    ).to_csv(inventory_path, index=False)
+    _edit(
+        rng, ngos_df, _ngos(rng, 6, 501),
+        ['latitude', 'longitude', 'capacity_kg', 'accepted_categories']
+    ).to_csv(ngo_path, index=False)
+
+    result = engine.reload(force=True)
+    assert result['inventory']['status'] == 'delta'
+    assert result['ngos']['status'] == 'delta'
+    assert result['inventory']['updated'] > 0 and result['ngos']['updated'] > 0
+
+    fresh = _engine(inventory_path, ngo_path)
+    for as_of in dates:
+        reloaded, expected = _snapshot_views(engine, as_of), _snapshot_views(fresh, as_of)
+        assert reloaded.keys() == expected.keys()
+        for key, value in expected.items():
+            if isinstance(value, pd.DataFrame):
+                pd.testing.assert_frame_equal(reloaded[key], value, check_like=True)
+            else:
+                assert reloaded[key] == value
@@ -0,0 +1,118 @@
+"""
+Regression tests for `backend.redistribution.Redistributor.replan`, checked against
+fresh plans and the invariants of the capacity ledger.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.redistribution import Redistributor
+from backend.registry import NGORegistry
+
+AS_OF = datetime(2025, 7, 10)
+
+def _ngos(capacities):
+    """NGOs around Mumbai that all accept Meat, one per capacity."""
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({
+        'ngo_id': [f"NGO-{101 + i}" for i in range(len(capacities))],
+        'ngo_name': [f"NGO {i}" for i in range(len(capacities))],
+        'location': 'Mumbai',
+        'latitude': 19.07 + rng.uniform(-0.2, 0.2, len(capacities)),
+        'longitude': 72.87 + rng.uniform(-0.2, 0.2, len(capacities)),
+        'capacity_kg': capacities,
+        'accepted_categories': 'Meat|Dairy'
+    })
+
+def _items(n_items, first_id=1001, seed=0):
+    """High-priority Meat items expiring within a few days of `AS_OF`."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'product_id': [f"PROD-{first_id + i}" for i in range(n_items)],
+        'product_name': 'Chicken',
+        'category': 'Meat',
+        'stock_date': '2025-07-05T08:00:00',
+        'expiry_date': [f"2025-07-{11 + int(d):02d}T08:00:00" for d in rng.integers(0, 4, n_items)],
+        'location': 'Mumbai',
+        'latitude': 19.07 + rng.uniform(-0.2, 0.2, n_items),
+        'longitude': 72.87 + rng.uniform(-0.2, 0.2, n_items),
+        'temperature_c': rng.choice([4.0, 30.0], n_items),
+        'humidity_percent': 60,
+        'quantity_kg': rng.integers(5, 15, n_items).astype(float)
+    })
+
+def _redistributor(tmp_path, items_df, ngos_df):
+    path = tmp_path / 'inventory.csv'
+    items_df.to_csv(path, index=False)
+    redistributor = Redistributor(str(path), None, ngo_registry=NGORegistry(ngos_df=ngos_df))
+    redistributor.current_date = AS_OF
+    return redistributor
+
+def _assignments(plan_df):
+    return dict(zip(plan_df['item_id'], (match['ngo_id'] for match in plan_df['best_match'])))
+
+def _check_ledger(redistributor, plan_df):
+    """No NGO is overbooked and the ledger holds exactly the planned items' loads."""
+    ledger = redistributor._plan_state.ledger
+    assert len(ledger.overbooked_rows()) == 0
+    assert len(ledger) == len(plan_df)
+    for item_id, ngo_id, quantity_kg in zip(
+        plan_df['item_id'], (match['ngo_id'] for match in plan_df['best_match']), plan_df['quantity_kg']
+    ):
+        assert ledger.reservation(item_id) == (ledger.row_of(ngo_id), pytest.approx(quantity_kg))
+    reserved = np.zeros(len(ledger.capacity))
+    for item_id in plan_df['item_id']:
+        row, kg = ledger.reservation(item_id)
+        reserved[row] += kg
+    assert ledger.reserved == pytest.approx(reserved)
+    assert (ledger.reserved <= ledger.capacity + 1e-9).all()
+
+@pytest.mark.parametrize("seed", range(5))
+def test_zero_capacity_replan_matches_a_fresh_plan(tmp_path, seed):
+    # Ample capacity elsewhere, so evicted items never compete with kept reservations
+    items_df, ngos_df = _items(12, seed=seed), _ngos([500.0] * 5)
+    redistributor = _redistributor(tmp_path, items_df, ngos_df)
+    plan_df, _ = redistributor.get_redistribution_plan()
+    busiest = pd.Series([match['ngo_id'] for match in plan_df['best_match']]).value_counts().index[0]
+
+    replanned_df, summary = redistributor.replan(ngo_capacities={busiest: 0})
+    assert summary['replanned_items'] > 0
+    _check_ledger(redistributor, replanned_df)
+
+    fresh = _redistributor(tmp_path, items_df, ngos_df)
+    fresh.set_ngo_capacities({busiest: 0})
+    fresh_df, fresh_summary = fresh.get_redistribution_plan()
+
+    assert busiest not in _assignments(replanned_df).values()
+    assert _assignments(replanned_df) == _assignments(fresh_df)
+    assert summary['capacity'] == fresh_summary['capacity']
+    assert summary['items_without_capacity'] == fresh_summary['items_without_capacity']
+
+@pytest.mark.parametrize("seed", range(5))
+def test_stock_and_capacity_changes_never_overbook(tmp_path, seed):
+    rng = np.random.default_rng(100 + seed)
+    items_df, ngos_df = _items(16, seed=seed), _ngos([25.0, 30.0, 20.0, 35.0])
+    redistributor = _redistributor(tmp_path, items_df, ngos_df)
+    plan_df, _ = redistributor.get_redistribution_plan()
+    _check_ledger(redistributor, plan_df)
+
+    # Heavier loads for some planned items
+    grown = items_df[items_df['product_id'].isin(plan_df['item_id'][:3])].assign(quantity_kg=18.0)
+    plan_df, _ = redistributor.replan(updated_items=grown)
+    _check_ledger(redistributor, plan_df)
+
+    # Sold or dispatched items free their capacity
+    removed = rng.choice(items_df['product_id'].to_numpy(), 4, replace=False)
+    plan_df, _ = redistributor.replan(removed_item_ids=removed)
+    _check_ledger(redistributor, plan_df)
+    assert not set(removed) & set(plan_df['item_id'])
+
+    # An NGO shrinks below its reservations while new stock arrives
+    plan_df, _ = redistributor.replan(
+        updated_items=_items(6, first_id=2001, seed=seed + 50),
+        ngo_capacities={ngos_df['ngo_id'].iloc[int(rng.integers(len(ngos_df)))]: 5.0}
+    )
+    _check_ledger(redistributor, plan_df)